@@ -1,10 +1,88 @@
 # PyParasol
 # For more information on PyParasol and for a full API, refer to https://github.com/ParasolJS/pyparasol
 
+from combine_csv import DEFAULT_JOIN_MEMORY_BYTES
+from combine_csv import JOIN_TYPES
+from combine_csv import PARSE_POOLS
 from combine_csv import combine_csv
+from combine_csv import get_header_list
+from combine_csv import select_columns
+from columnar_data import COLUMNAR_DECODER_SCRIPT
+from columnar_data import EMBEDDED_DECODER_SCRIPT
+from columnar_data import assemble_columnar
+from columnar_data import data_fingerprint
+from columnar_data import encode_column_blocks
+from columnar_data import encode_columnar
+from columnar_data import encode_embedded_payload
+from columnar_data import read_data_csv
+from columnar_data import to_data_frame
+from columnar_data import write_columnar_data
+from columnar_data import write_columnar_file
+from columnar_data import write_data_csv
+from dashboard_host import DEFAULT_CACHE_BYTES
+from dashboard_host import DEFAULT_WORKERS
+from dashboard_host import make_dashboard_server
+from data_grid import DEFAULT_PAGE_ROWS
+from data_grid import PAGED_GRID_SCRIPT
+from data_grid import RowPager
+from data_stages import CLUSTER_REFIT_SHARE
+from data_stages import SAMPLING_STRATEGIES
+from data_stages import add_weighted_sums
+from data_stages import append_weighted_sums
+from data_stages import downsample_rows
+from data_stages import epsilon_boxes
+from data_stages import epsilon_nondominated_mask
+from data_stages import extend_weighted_sums
+from data_stages import find_column_positions
+from data_stages import kmeans_clusters
+from data_stages import nearest_clusters
+from data_stages import nondominated_mask
+from data_stages import nondominated_ranks
+from data_stages import numeric_matrix
+from data_stages import objective_matrix
+from compile_cache import CompileCache
+from compile_stats import CAPTURE_MODES
+from compile_stats import CompileStats
+from compile_stats import total_file_bytes
+from parsed_data_cache import ParsedDataCache
+from selection import SELECTION_KINDS
+from selection import SELECTION_SCRIPT
+from selection import SelectionStore
+from live_tail import APPEND_ROWS_SCRIPT
+from live_tail import DEFAULT_TAIL_INTERVAL
+from live_tail import CsvTail
+from live_tail import TailWatcher
+from os.path import abspath
+from os.path import basename
+from os.path import dirname
+from os.path import exists
+from os.path import getsize
+from os.path import join
+from os.path import normpath
+from os.path import splitext
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from csv import writer
 from http.server import SimpleHTTPRequestHandler
+from json import dumps
+from logging import Logger
+from traceback import print_exc
+from multiprocessing import get_all_start_methods
+from multiprocessing import get_context
+from os import cpu_count
+from numpy import isnan
+from numpy import zeros
+from pandas import DataFrame
+from pandas import concat
+from parasol_server import EVENTS_PATH
+from parasol_server import MemoryFileStore
+from parasol_server import ParasolServerHandle
+from parasol_server import ROWS_PATH
+from parasol_server import SELECTION_PATH
+from parasol_server import make_server
 from webbrowser import open as open_website
 from socketserver import TCPServer
+from threading import Thread
 
 
 # this class contains all the options for a single plot, and a method for writing all the plot specific attributes.
@@ -12,17 +90,27 @@ from socketserver import TCPServer
 #   the PyParasol class.
 # information about plot attributes can be found at https://github.com/ParasolJS/parasol-es/wiki/API-Reference
 class _ParasolPlot:
-    def __init__(self, file_name, plot_id):
+    def __init__(self, file_name, plot_id, data_frame=None):
         # only plot data information gets set to defaults
         # styling attributes remain None unless changed
         self.file_name = file_name
         self.plot_id = plot_id
+        # data given in memory instead of a file, and its encoded columns once it has been compiled
+        self.data_frame = data_frame
+        self.encoded_columns = None
         self.plot_title = ""
         self.axes_layout = []
         self.columns_to_hide = []
         self.variables_to_scale_list = []
         self.variables_scale_limit_list = []
         self.variables_to_flip_list = []
+        # objective columns used to filter out dominated rows
+        self.objectives = []
+        self.objective_senses = []
+        self.objective_epsilons = None
+        self.front_rank_column = None
+        # column the rows of this plot's data are matched on when several data sets are combined
+        self.key_column = None
 
         # styling attributes
         self.alpha = None
@@ -95,11 +183,11 @@ class PyParasol:
         self.setGridStatus(attach_grid_status)
         # setting linked status
         self.setLinkedStatus(link_plots_status)
-        # setting output html file name
-        self.setHTMLFileName(output_html_file_name)
 
         # general attributes
         self.__attachGrid = None
+        # whether the grid asks the local server for the rows it shows instead of holding every row
+        self.__paged_grid = False
         self.__html_file_name = None
         # linking plots data
         self.__link_plots = None
@@ -108,19 +196,92 @@ class PyParasol:
         self.__number_of_cluster_colors = None
         self.__plots_to_cluster_list = None
         self.__variables_to_cluster = None
+        self.__cluster_precompute = False
+        self.__cluster_seed = None
         # weighted sums variables
         self.__weighted_variable_list = None
         self.__weighted_weight_list = None
         self.__weighted_plots_to_add_weights = None
+        # weighted sums worked out when compiling, a list of [sum name, variable list, weight list, plot list]
+        self.__precomputed_weighted_sums = []
 
         # the final data file name used only to verify that file exists
         self.__final_data_file_name = None
+        # format of the data file loaded by the browser, csv or binary columnar data
+        self.__data_format = "csv"
+        self.__float_precision = 64
+        # whether the html file has the styling, scripts and data inside it
+        self.__self_contained = False
+        # compressed data written into a self contained html file, set while compiling
+        self.__embedded_data_payload = None
+        # whether columns that no plot uses are left out of the output data
+        self.__column_projection = True
+        # how the rows of several data sets are joined when plots set a key column
+        self.__join_type = "outer"
+        self.__join_memory_bytes = DEFAULT_JOIN_MEMORY_BYTES
+        # number of data files parsed at the same time when they are combined, and the kind of pool they run on
+        self.__parse_workers = 1
+        self.__parse_pool = "thread"
+        # row limit data for drawing a sample of very large datasets
+        self.__max_rows = None
+        self.__sampling_strategy = None
+        self.__stratify_columns = None
+        self.__sampling_seed = None
+        # how many rows were drawn out of how many, set while compiling
+        self.__sampling_report = None
+        # ranges of the weighted sums and the clusters the data stages worked out, set while compiling and kept in the
+        #   cache manifest so rows appended to the data files can be compiled with them
+        self.__stage_models = {}
+
+        # data given in memory is encoded into one data file, kept in this store once show() has made a server
+        self.__memory_data = False
+        self.__memory_files = None
+        # whether the page listens to the local server for new data, set by show() when running in the background
+        self.__live_reload = False
+        # whether the page adds rows appended to the data files, set by show() when tailing the data files
+        self.__live_tail = False
+        # whether the page posts its brushes and marked rows to the local server, set by show()
+        self.__post_selection = False
+        # the selection the page posted last, and the data it selects rows of
+        self.__selection = SelectionStore(self.__selection_data__)
+        self.__served_data = None
+        # the data before rows were sampled out of it and the positions of the rows drawn, kept while compiling if
+        #   the page posts its selection
+        self.__unsampled_data = None
+
+        # stats of the compile running now and the report of the last one, passed to the stats hook if there is one
+        self.__compile_stats = None
+        self.__compile_report = None
+        self.__stats_hook = None
+        self.__stats_capture_modes = []
+
+        # compile cache, None unless caching is turned on with setCacheStatus()
+        self.__compile_cache = None
+        self.__cache_manifest_file_name = None
+        # start of the names of the data files written when compiling, None for the default names
+        self.__data_file_prefix = None
+        # data files already parsed by other parasol applications, None to parse them every compile
+        self.__parsed_data_cache = None
+
+        # setting output html file name, after its default above so the default doesn't replace it
+        self.setHTMLFileName(output_html_file_name)
 
     # Adding csv file with data you want to be displayed as its own parallel plot.
     # plot name is what the header name will be above the plot on the Parasol application.
     # if no plot title is specified, there won't be a title for the plot.
     # the plot id is required and is how a user changes settings for that plot.
     # *****SETTING AXES LAYOUT WILL OVERRIDE SETTING COLUMNS TO HIDE************
+    # objectives are the columns used to remove dominated rows (rows another row beats in every objective) when
+    #   compiling. objective senses says for each objective if it is minimized ("min", the default) or maximized
+    #   ("max"), objective epsilons sets an epsilon box size per objective for epsilon-nondominance.
+    # if a front rank column name is given, no rows are removed and the pareto front number of every row is added
+    #   as a new column with that name instead.
+    # every plot draws the same rows, so with objectives on several plots a row on the front of any of them is kept.
+    #   if another plot has no objectives (or a front rank column), it shows every row and no rows are removed.
+    # instead of a file name, the data can be given in memory as a pandas DataFrame, a numpy structured array or a
+    #   dictionary of arrays. it is encoded the first time it is compiled and served straight from memory by show().
+    # if the plots have different data sets, a key column matches their rows on the key instead of their position.
+    #   every data set needs one, see setJoinType() for which keys are kept.
     def addPlot(self,
                 file_name,
                 plot_id,
@@ -132,11 +293,23 @@ class PyParasol:
                 brushed_color=None,
                 plot_alpha=None,
                 brushed_alpha=None,
-                reorderable_status=True
+                reorderable_status=True,
+                objectives=None,
+                objective_senses=None,
+                objective_epsilons=None,
+                front_rank_column=None,
+                key_column=None
                 ):
 
-        # creating new parasol plot item
-        new_plot = _ParasolPlot(file_name, str(plot_id))
+        # creating new parasol plot item, with its data if it was given in memory
+        if type(file_name) is str:
+            new_plot = _ParasolPlot(file_name, str(plot_id))
+        else:
+            data_frame = to_data_frame(file_name)
+            if data_frame is None:
+                print("set the data to a file name, a DataFrame, a numpy structured array or a dictionary of arrays")
+                return
+            new_plot = _ParasolPlot(None, str(plot_id), data_frame)
 
         # adding all attributes if they exist
         if plot_title is not None:
@@ -171,10 +344,34 @@ class PyParasol:
         brushed_alpha = self.__validate_alpha__(brushed_alpha)
         if brushed_alpha != 0:
             new_plot.alpha_on_brush = brushed_alpha
+        # objectives for removing dominated rows
+        if objectives is not None:
+            self.__set_plot_objectives__(new_plot, objectives, objective_senses, objective_epsilons,
+                                         front_rank_column)
+        # key column for joining data sets
+        if key_column is not None:
+            if type(key_column) != str:
+                print("set the key column to a valid column name")
+            else:
+                new_plot.key_column = key_column
 
         # adding new parasol plot item to the list
         self.__parasol_plot_list.append(new_plot)
 
+    # this function removes a plot, releasing its data if it was given in memory
+    # plots after it move up one place, so settings given for a list of plots should be set again
+    def removePlot(self, plot_id):
+        plot_index_list = self.__find_plot_index_from_id__(plot_id)
+        if plot_index_list == 0:
+            return
+        for plot_index in sorted(plot_index_list, reverse=True):
+            removed_plot = self.__parasol_plot_list.pop(plot_index)
+            removed_plot.data_frame = None
+            removed_plot.encoded_columns = None
+        # the served data has the removed data in it until the next compile
+        if self.__memory_files is not None:
+            self.__memory_files.remove(self.__data_file_name__("memory_data.bin"))
+
     # @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
     # @@@@@ PARASOL APPLICATION SETTINGS @@@@@@
     # @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
@@ -224,11 +421,14 @@ class PyParasol:
                 self.__parasol_plot_list[plot_id].alpha_on_brush = alpha_on_brushed
 
     # this function determines whether or not there will be a grid of data attached.
-    def setGridStatus(self, grid_status):
-        if type(grid_status) is not bool:
-            print('Set grid status to True or False')
+    # if paged is True, the grid only holds the rows in view and asks the local server started by show() for them a
+    #   page at a time, sorting on the server. this keeps the page fast for large datasets.
+    def setGridStatus(self, grid_status, paged=False):
+        if type(grid_status) is not bool or type(paged) is not bool:
+            print('Set grid status and paged to True or False')
             return
         self.__attachGrid = grid_status
+        self.__paged_grid = paged
 
     # this function allows the user to set the file name of the outputted html file.
     def setHTMLFileName(self, new_html_file_name):
@@ -273,7 +473,10 @@ class PyParasol:
     # this function sets the color clustering functionality.
     # plots to cluster needs to be entered as a list of integers associating plot number.
     # if no variables to cluster attribute is added, it will cluster all of them.
-    def setColorCluster(self, cluster_status, variables_to_cluster=None, number_colors=4, plot_id_list=None):
+    # if precompute is true, the clusters are found with k-means when compiling instead of in the browser, and the
+    #   cluster of every row is written as a "cluster" column. the seed makes the clusters (and colors) repeatable.
+    def setColorCluster(self, cluster_status, variables_to_cluster=None, number_colors=4, plot_id_list=None,
+                        precompute=False, seed=None):
         # validating inputs
         if type(cluster_status) is not bool:
             print('Set cluster status to True or False')
@@ -285,6 +488,9 @@ class PyParasol:
         except TypeError:
             print('set number of colors to a valid positive integer')
             return
+        if type(precompute) is not bool:
+            print('Set precompute to True or False')
+            return
 
         # validating variables to cluster if cluster status is true
         if cluster_status and variables_to_cluster is not None:
@@ -301,11 +507,17 @@ class PyParasol:
         self.__cluster_status = cluster_status
         self.__number_of_cluster_colors = number_colors
         self.__variables_to_cluster = variables_to_cluster
+        self.__cluster_precompute = precompute
+        self.__cluster_seed = seed
 
     # this function assigns weights to certain variables to make a weighted sums variable.
     # variable list is a list of the variables that will have a weight associated to them.
     # associated weights is the list of weights that correspond the variable list.
-    def assignWeightedSums(self, variable_list, associated_weights, plot_id_list=None):
+    # if precompute is true, the weighted sum is worked out when compiling and added to the data as a column named
+    #   sum name, instead of in the browser. every precomputed sum with a different name is kept, so several
+    #   weightings can be compared side by side.
+    def assignWeightedSums(self, variable_list, associated_weights, plot_id_list=None, precompute=False,
+                           sum_name="weighted sum"):
         variable_list = self.__validate_data_is_list_or_single__(variable_list, str)
         associated_weights = self.__validate_data_is_list_or_single__(associated_weights, float)
         if variable_list == 0 or associated_weights == 0:
@@ -314,6 +526,9 @@ class PyParasol:
         if len(variable_list) != len(associated_weights):
             print("variable list and associated weights list are not the same length")
             return
+        if precompute:
+            self.__add_precomputed_weighted_sum__(variable_list, associated_weights, plot_id_list, sum_name)
+            return
         self.__weighted_variable_list = variable_list
         self.__weighted_weight_list = associated_weights
         if plot_id_list is not None:
@@ -321,6 +536,19 @@ class PyParasol:
             if plot_id_list != 0:
                 self.__weighted_plots_to_add_weights = plot_id_list
 
+    # this function adds a weighted sum that is worked out when compiling, replacing any sum with the same name
+    def __add_precomputed_weighted_sum__(self, variable_list, associated_weights, plot_id_list, sum_name):
+        if type(sum_name) is not str:
+            print("set the sum name to a valid column name")
+            return
+        if plot_id_list is not None:
+            plot_id_list = self.__find_plot_index_from_id__(plot_id_list)
+            if plot_id_list == 0:
+                return
+        self.__precomputed_weighted_sums = [weighted_sum for weighted_sum in self.__precomputed_weighted_sums
+                                            if weighted_sum[0] != sum_name]
+        self.__precomputed_weighted_sums.append([sum_name, variable_list, associated_weights, plot_id_list])
+
     # this function assigns scales (lower and upper limits for axes) to a variable or list of variables.
     # you can enter variables as a list of variables or one variable name.
     # you can enter scale_list as one list [min, max] or a list of scale-lists: [[min1, max1], [min2, max2]].
@@ -360,6 +588,208 @@ class PyParasol:
                 self.__parasol_plot_list[plot_id].variables_to_scale_list += variable_list
                 self.__parasol_plot_list[plot_id].variables_scale_limit_list += scale_list
 
+    # this function sets the format of the data file that the browser loads.
+    # "csv" loads the combined csv file with d3.csv, this is the default.
+    # "binary" writes the combined data as a columnar binary file that the browser loads with fetch and typed
+    #   arrays instead of parsing text. numeric columns are stored as float_precision (32 or 64) bit floats and
+    #   text columns are dictionary encoded.
+    def setDataFormat(self, data_format, float_precision=64):
+        if data_format not in ["csv", "binary"]:
+            print('Set data format to "csv" or "binary"')
+            return
+        if float_precision not in [32, 64]:
+            print('Set float precision to 32 or 64')
+            return
+        self.__data_format = data_format
+        self.__float_precision = float_precision
+
+    # this function sets whether the html file is self contained.
+    # a self contained html file has parasol.css, d3.v5.min.js and parasol.standalone.js written inside it, and the
+    #   data embedded as gzip compressed columnar data, so it can be opened from disk without a local server.
+    # the data is decompressed by the browser with DecompressionStream.
+    def setSelfContained(self, self_contained_status):
+        if type(self_contained_status) is not bool:
+            print('Set self contained status to True or False')
+            return
+        self.__self_contained = self_contained_status
+
+    # this function sets whether columns that no plot uses are left out of the output data.
+    # when it is on (the default), only the columns a plot shows (its axes layout, or every column it doesn't
+    #   hide) and the columns used by clustering, weighted sums, objectives and sampling are read and written.
+    # it is always off when the data grid is attached, since the grid shows every column.
+    def setColumnProjection(self, projection_status):
+        if type(projection_status) is not bool:
+            print('Set column projection to True or False')
+            return
+        self.__column_projection = projection_status
+
+    # this function limits how many rows are drawn, for datasets too large to draw every line.
+    # when the data has more than max_rows rows, compile() draws a sample of max_rows rows with the chosen strategy:
+    #   "random" draws a uniform random sample.
+    #   "stratified" samples every stratum of the stratify columns in proportion to its size.
+    #   "extremes" keeps the rows with the minimum and maximum of every axis and fills the rest randomly.
+    # the full dataset is still written and linked from the page for download.
+    # setting max_rows to None turns sampling off.
+    def setRowLimit(self, max_rows, strategy="random", stratify_columns=None, seed=None):
+        if max_rows is None:
+            self.__max_rows = None
+            return
+        if type(max_rows) is not int or max_rows < 1:
+            print('set max rows to a valid positive integer')
+            return
+        if strategy not in SAMPLING_STRATEGIES:
+            print('set sampling strategy to one of ' + str(SAMPLING_STRATEGIES))
+            return
+        if stratify_columns is not None:
+            stratify_columns = self.__validate_data_is_list_or_single__(stratify_columns, str)
+            if stratify_columns == 0:
+                print("set stratify columns to a valid list of names, or a single name")
+                return
+        if strategy == "stratified" and stratify_columns is None:
+            print("set the columns to stratify on when using the stratified strategy")
+            return
+        self.__max_rows = max_rows
+        self.__sampling_strategy = strategy
+        self.__stratify_columns = stratify_columns
+        self.__sampling_seed = seed
+
+    # this function sets which keys are kept when the data sets of the plots are joined on their key columns
+    # "inner" keeps keys found in every data set, "left" the keys of the first plot's data set and "outer" (the
+    #   default) keys found in any of them, with empty cells for the data sets that don't have the key
+    # data files after the first that are bigger than max memory bytes together are sorted on disk and joined
+    #   without being loaded, the rows are then in key order instead of the order of the first data file
+    def setJoinType(self, join_type, max_memory_bytes=DEFAULT_JOIN_MEMORY_BYTES):
+        if join_type not in JOIN_TYPES:
+            print("set the join type to one of: " + ", ".join(JOIN_TYPES))
+            return
+        if type(max_memory_bytes) != int or max_memory_bytes < 1:
+            print("set max memory bytes to a positive integer")
+            return
+        self.__join_type = join_type
+        self.__join_memory_bytes = max_memory_bytes
+
+    # this function sets how many data files are parsed at the same time when they are combined by position
+    # files are parsed with the pandas C parser, reading only the columns that are used, and their rows are written
+    #   in the same order as parsing them one after another. "thread" pools parse every file in chunks so memory use
+    #   stays low, "process" pools parse whole files in worker processes.
+    def setParseWorkers(self, parse_workers, parse_pool="thread"):
+        if type(parse_workers) != int or parse_workers < 1:
+            print("set parse workers to a positive integer")
+            return
+        if parse_pool not in PARSE_POOLS:
+            print("set the parse pool to one of: " + ", ".join(PARSE_POOLS))
+            return
+        self.__parse_workers = parse_workers
+        self.__parse_pool = parse_pool
+
+    # this function sets the start of the names of the data files written when compiling, like
+    #   <prefix>_output_data.csv, so parasol applications compiled in the same folder don't write over each other
+    # set it to None for the default names
+    def setDataFilePrefix(self, data_file_prefix):
+        if data_file_prefix is not None and (type(data_file_prefix) != str or data_file_prefix == "" or
+                                             basename(data_file_prefix) != data_file_prefix):
+            print("set the data file prefix to a valid file name, without folders")
+            return
+        self.__data_file_prefix = data_file_prefix
+
+    # this function sets a parsed data cache shared with other parasol applications, so data files they have
+    #   already parsed aren't parsed again when compiling. set it to None to parse the data files every compile.
+    def setParsedDataCache(self, parsed_data_cache):
+        if parsed_data_cache is not None and not isinstance(parsed_data_cache, ParsedDataCache):
+            print("set the parsed data cache to a ParsedDataCache")
+            return
+        self.__parsed_data_cache = parsed_data_cache
+
+    # this function turns the compile cache on or off.
+    # when the cache is on, compile() skips all work if the data files and every setting are unchanged since the
+    #   last compile and the files it wrote are still there.
+    # hash_inputs also records a content hash of every data file, so a file that was touched but not changed
+    #   is still a cache hit.
+    # if no manifest file name is given, the manifest is written next to the html file as <html file name>.cache.json
+    def setCacheStatus(self, cache_status, hash_inputs=False, manifest_file_name=None):
+        if type(cache_status) is not bool or type(hash_inputs) is not bool:
+            print('Set cache status and hash inputs to True or False')
+            return
+        if manifest_file_name is not None and self.__validate_file_name__(manifest_file_name, 'json'):
+            print("cache manifest file name not valid")
+            return
+        if not cache_status:
+            self.__compile_cache = None
+            return
+        self.__cache_manifest_file_name = manifest_file_name
+        self.__compile_cache = CompileCache(manifest_file_name, hash_inputs)
+
+    # this function returns the cache hit and miss report, returns None if the cache is off
+    def getCacheReport(self):
+        if self.__compile_cache is None:
+            return None
+        return self.__compile_cache.report()
+
+    # this function sets what is done with the stats report of every compile
+    # the hook is called with the report after every compile, it can be a function or a logging.Logger (the report
+    #   is logged as json at info level, or at error level if compiling failed).
+    # capture turns on "cprofile" (a profile of the whole compile) and/or "tracemalloc" (traced memory peaks of
+    #   every stage and the top allocation sites), as one name or a list of names. both slow compiling down.
+    def setCompileStats(self, hook=None, capture=None):
+        if hook is not None and not callable(hook) and not isinstance(hook, Logger):
+            print("set the hook to a function or a logging.Logger")
+            return
+        if capture is None:
+            capture = []
+        capture = self.__validate_data_is_list_or_single__(capture, str)
+        if capture == 0 or any(capture_mode not in CAPTURE_MODES for capture_mode in capture):
+            print("set capture to one or more of: " + ", ".join(CAPTURE_MODES))
+            return
+        self.__stats_hook = hook
+        self.__stats_capture_modes = capture
+
+    # this function returns the stats report of the last compile, None if nothing has been compiled yet
+    # the report has the status, total seconds, the seconds of every stage (stages inside a stage are listed in
+    #   its "stages"), counts of rows and bytes, errors and the peak memory of the process
+    def getCompileReport(self):
+        return self.__compile_report
+
+    # this function returns the rows selected on the page opened by show(), as a DataFrame or an array of row positions
+    # kind is "brushed" for the rows inside the brushes, "marked" for the marked rows or "both" for either
+    # brushes select rows out of every row of the data, including rows sampled out of the page by setRowLimit()
+    # brushes on columns only the page has, like clusters and weighted sums, can't be worked out, so None is returned
+    def getSelection(self, kind="brushed", as_index=False):
+        if kind not in SELECTION_KINDS:
+            print('Set kind to one of: ' + ', '.join(SELECTION_KINDS))
+            return None
+        if type(as_index) is not bool:
+            print('Set as_index to True or False')
+            return None
+        try:
+            data_frame, selected_rows = self.__selection.selected_rows(kind)
+        except ValueError as error:
+            print(error)
+            return None
+        if as_index:
+            return selected_rows
+        return data_frame.iloc[selected_rows]
+
+    # this function adds a function that is called with the selection every time the page posts a new one
+    # kind and as_index are the same as for getSelection(). the function is called on a thread of the local server.
+    def addSelectionCallback(self, callback, kind="brushed", as_index=False):
+        if not callable(callback):
+            print('Selection callback must be a function')
+            return
+        if kind not in SELECTION_KINDS or type(as_index) is not bool:
+            print('Set kind to one of: ' + ', '.join(SELECTION_KINDS) + ' and as_index to True or False')
+            return
+        self.__selection.add_callback(lambda: callback(self.getSelection(kind, as_index)))
+
+    # this function returns the data the selection picks rows out of, and the positions of the rows drawn in it
+    # the positions are None when every row is drawn
+    def __selection_data__(self):
+        if self.__unsampled_data is not None:
+            return self.__unsampled_data[0], self.__unsampled_data[1]
+        # a self contained page has no server to post its selection to
+        if self.__served_data is None or self.__final_data_file_name is None or self.__self_contained:
+            return DataFrame(), None
+        return self.__served_data.data(), None
+
     # @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
     # @@@@@@@@ BUTTON OPTIONS @@@@@@@@@@
     # @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
@@ -465,6 +895,290 @@ class PyParasol:
         else:
             return id_index_list
 
+    # this function builds the plan of unique data files used by the plots
+    # file names that point to the same file are only listed once, in the order they were first added
+    # returns a dictionary with the unique file names and, for every plot, the index of its file in that list
+    # header lists and derived columns (columns added while compiling, with the plots they belong to) are filled
+    #   in by compile()
+    # data given in memory is a source of its own, its file name is None and memory plots has the plot that keeps
+    #   its encoded columns (None for files)
+    def __build_source_plan__(self):
+        source_plan = {'file_names': [], 'plot_sources': [], 'header_lists': [], 'derived_columns': [],
+                       'memory_plots': []}
+        source_index_by_path = {}
+        for plot in self.__parasol_plot_list:
+            if plot.data_frame is not None:
+                file_path = id(plot.data_frame)
+            else:
+                file_path = normpath(abspath(plot.file_name))
+            if file_path not in source_index_by_path:
+                source_index_by_path[file_path] = len(source_plan['file_names'])
+                source_plan['file_names'].append(plot.file_name)
+                source_plan['memory_plots'].append(plot if plot.data_frame is not None else None)
+            source_plan['plot_sources'].append(source_index_by_path[file_path])
+        return source_plan
+
+    # this function returns the key column of every data set in the source plan, None if rows are matched by
+    #   position (no plot sets a key column, or there is only one data set)
+    # prints an error and returns 0 if plots of the same data set set different keys or a data set has none
+    def __find_key_columns__(self, source_plan):
+        if len(source_plan['file_names']) < 2 or \
+                all(plot.key_column is None for plot in self.__parasol_plot_list):
+            return None
+        key_columns = [None] * len(source_plan['file_names'])
+        for plot_number, plot in enumerate(self.__parasol_plot_list):
+            if plot.key_column is None:
+                continue
+            source_number = source_plan['plot_sources'][plot_number]
+            if key_columns[source_number] not in [None, plot.key_column]:
+                print("plots of the same data have different key columns, set the same key column for them")
+                return 0
+            key_columns[source_number] = plot.key_column
+        if None in key_columns:
+            print("set a key column for the plots of every data set to join them")
+            return 0
+        return key_columns
+
+    # this function checks that every data set has its key column, prints an error and returns 0 if one doesn't
+    @staticmethod
+    def __validate_key_columns__(source_plan, key_columns):
+        for source_number, key_column in enumerate(key_columns):
+            if key_column not in source_plan['header_lists'][source_number]:
+                file_name = source_plan['file_names'][source_number]
+                print("key column " + key_column + " is not in " + (file_name if file_name is not None else
+                                                                     "the data given in memory"))
+                return 0
+        return 1
+
+    # this function checks that every objective of a plot is a column of the plot's data, prints an error and returns
+    #   0 if one isn't, since the senses and epsilons of the objectives are matched to the objectives by position
+    def __validate_objectives__(self, source_plan):
+        for plot_number, plot in enumerate(self.__parasol_plot_list):
+            header_list = source_plan['header_lists'][source_plan['plot_sources'][plot_number]]
+            for objective in plot.objectives:
+                if objective not in header_list:
+                    print("objective " + objective + " is not a column of the data of plot " + plot.plot_id)
+                    return 0
+        return 1
+
+    # this function validates and sets the objectives of a plot, prints an error and leaves them unset if not valid
+    def __set_plot_objectives__(self, plot, objectives, objective_senses, objective_epsilons, front_rank_column):
+        objectives = self.__validate_data_is_list_or_single__(objectives, str)
+        if objectives == 0:
+            print("set objectives to a valid list of names, or a single name")
+            return
+        if objective_senses is None:
+            objective_senses = ["min"] * len(objectives)
+        objective_senses = self.__validate_data_is_list_or_single__(objective_senses, str)
+        if objective_senses == 0 or len(objective_senses) != len(objectives) or \
+                any(sense not in ["min", "max"] for sense in objective_senses):
+            print('set objective senses to a list of "min" or "max" the same length as objectives')
+            return
+        if objective_epsilons is not None:
+            if type(objective_epsilons) != list:
+                objective_epsilons = [objective_epsilons]
+            if len(objective_epsilons) != len(objectives) or any(
+                    epsilon is not None and (type(epsilon) not in [int, float] or epsilon < 0)
+                    for epsilon in objective_epsilons):
+                print("set objective epsilons to a list of positive numbers (or None) the same length as objectives")
+                return
+        if front_rank_column is not None and type(front_rank_column) != str:
+            print("set the front rank column to a valid column name")
+            return
+        plot.objectives = objectives
+        plot.objective_senses = objective_senses
+        plot.objective_epsilons = objective_epsilons
+        plot.front_rank_column = front_rank_column
+
+    # this function works out which columns of every data file are used, so only those are read and written
+    # a plot uses its axes layout (or every column it doesn't hide), the variables it scales or flips and its
+    #   objectives. columns used by clustering, weighted sums and sampling are kept from every file that has them.
+    # returns the list of headers to keep for every data file, None where every column is kept
+    def __find_needed_columns__(self, source_plan):
+        header_lists = source_plan['header_lists']
+        if not self.__column_projection or self.__attachGrid:
+            return [None] * len(header_lists)
+        needed_columns = [set() for header_list in header_lists]
+        for plot_number, plot in enumerate(self.__parasol_plot_list):
+            source_number = source_plan['plot_sources'][plot_number]
+            if plot.axes_layout:
+                needed_columns[source_number].update(plot.axes_layout)
+            else:
+                needed_columns[source_number].update(header for header in header_lists[source_number]
+                                                     if header not in plot.columns_to_hide)
+            needed_columns[source_number].update(plot.variables_to_scale_list)
+            needed_columns[source_number].update(plot.variables_to_flip_list)
+            needed_columns[source_number].update(plot.objectives)
+
+        shared_columns = set()
+        if self.__cluster_status and self.__variables_to_cluster is not None:
+            shared_columns.update(self.__variables_to_cluster)
+        if self.__weighted_variable_list is not None:
+            shared_columns.update(self.__weighted_variable_list)
+        for weighted_sum in self.__precomputed_weighted_sums:
+            shared_columns.update(weighted_sum[1])
+        if self.__max_rows is not None and self.__stratify_columns is not None:
+            shared_columns.update(self.__stratify_columns)
+
+        column_lists = []
+        for header_list, source_columns in zip(header_lists, needed_columns):
+            kept_headers = [header for header in header_list
+                            if header in source_columns or header in shared_columns]
+            column_lists.append(None if len(kept_headers) == len(header_list) else kept_headers)
+        return column_lists
+
+    # this function says if any data stage that needs the whole dataset in memory is turned on
+    def __data_stages_needed__(self):
+        if self.__max_rows is not None:
+            return True
+        if self.__cluster_status and self.__cluster_precompute:
+            return True
+        for plot in self.__parasol_plot_list:
+            if plot.objectives:
+                return True
+        return False
+
+    # this function runs the data stages over the combined data and returns the data that will be drawn
+    # columns the stages add are recorded in the source plan's derived columns
+    def __run_data_stages__(self, data_frame, source_plan, full_data_file_name):
+        if any(plot.objectives for plot in self.__parasol_plot_list):
+            with self.__stage__('pareto'):
+                data_frame = self.__run_pareto_stage__(data_frame, source_plan)
+
+        # adding the weighted sums that are worked out when compiling
+        if self.__precomputed_weighted_sums:
+            with self.__stage__('weighted sums'):
+                self.__stage_models['sum_ranges'] = []
+                add_weighted_sums(data_frame, self.__get_weighted_sums__(source_plan),
+                                  self.__stage_models['sum_ranges'])
+
+        # finding the color clusters over every row that is left, before any rows are sampled out
+        if self.__cluster_status and self.__cluster_precompute:
+            with self.__stage__('clusters'):
+                data_frame = self.__run_cluster_stage__(data_frame, source_plan)
+
+        # drawing a sample of the rows if the data has more rows than the row limit
+        if self.__max_rows is not None:
+            with self.__stage__('sampling'):
+                kept_rows = downsample_rows(data_frame, self.__max_rows, self.__sampling_strategy,
+                                            self.__stratify_columns, self.__sampling_seed)
+            self.__sampling_report = {'rows_total': data_frame.shape[0], 'rows_shown': len(kept_rows),
+                                      'full_data_file': full_data_file_name}
+            # brushes posted by the page select rows out of every row, including those sampled out
+            if self.__post_selection:
+                self.__unsampled_data = [data_frame, kept_rows]
+            data_frame = data_frame.iloc[kept_rows]
+        return data_frame
+
+    # this function removes the dominated rows for every plot with objectives, or adds its front rank column
+    # every plot draws the same rows, so a row on the front of any plot that filters rows is kept. plots without
+    #   objectives, or with a front rank column, show every row, and with one of them no rows are removed.
+    def __run_pareto_stage__(self, data_frame, source_plan):
+        keep_rows = None
+        unfiltered_plot_ids = [plot.plot_id for plot in self.__parasol_plot_list
+                               if not plot.objectives or plot.front_rank_column is not None]
+        for plot_number, plot in enumerate(self.__parasol_plot_list):
+            if not plot.objectives:
+                continue
+            values = objective_matrix(data_frame, plot.objectives, plot.objective_senses)
+            if plot.front_rank_column is not None:
+                if plot.objective_epsilons is not None:
+                    values = epsilon_boxes(values, plot.objective_epsilons)
+                ranks = nondominated_ranks(values).astype(str)
+                # rows with missing objective values have no rank
+                ranks[ranks == '0'] = ''
+                data_frame.insert(data_frame.shape[1], plot.front_rank_column, ranks, allow_duplicates=True)
+                source_plan['derived_columns'].append([plot.front_rank_column, [plot_number]])
+                continue
+            if unfiltered_plot_ids:
+                continue
+            if plot.objective_epsilons is not None:
+                plot_keep_rows = epsilon_nondominated_mask(values, plot.objective_epsilons)
+            else:
+                plot_keep_rows = nondominated_mask(values)
+            keep_rows = plot_keep_rows if keep_rows is None else keep_rows | plot_keep_rows
+        if unfiltered_plot_ids and any(plot.objectives and plot.front_rank_column is None
+                                       for plot in self.__parasol_plot_list):
+            print("plot " + ", ".join(str(plot_id) for plot_id in unfiltered_plot_ids) + " shows every row, so no "
+                  "dominated rows are removed. set a front rank column on the plots with objectives to show their "
+                  "fronts instead")
+        if keep_rows is not None:
+            data_frame = data_frame[keep_rows]
+        return data_frame
+
+    # this function returns the precomputed weighted sums as [sum name, variable list, weight list]
+    # the sum columns are recorded in the source plan's derived columns with the plots that show them
+    def __get_weighted_sums__(self, source_plan):
+        weighted_sums = []
+        for sum_name, variable_list, weight_list, plot_list in self.__precomputed_weighted_sums:
+            if plot_list is None:
+                plot_list = self.__find_plot_index_from_id__(None)
+            source_plan['derived_columns'].append([sum_name, plot_list])
+            weighted_sums.append([sum_name, variable_list, weight_list])
+        return weighted_sums
+
+    # this function finds the color clusters with k-means and adds them as the "cluster" column
+    # if no variables to cluster were set, every numeric column of the clustered plots is used
+    # the cluster column is hidden on every plot, the same as clustering in the browser
+    def __run_cluster_stage__(self, data_frame, source_plan):
+        variables_to_cluster = self.__variables_to_cluster
+        if variables_to_cluster is None:
+            plots_to_cluster = self.__plots_to_cluster_list
+            if plots_to_cluster is None:
+                plots_to_cluster = self.__find_plot_index_from_id__(None)
+            variables_to_cluster = []
+            for plot_number in plots_to_cluster:
+                for header in source_plan['header_lists'][source_plan['plot_sources'][plot_number]]:
+                    if header not in variables_to_cluster:
+                        variables_to_cluster.append(header)
+        positions = find_column_positions(data_frame, variables_to_cluster)
+        values = numeric_matrix(data_frame, positions)
+        # columns without any numbers can't be clustered on
+        has_numbers = ~isnan(values).all(axis=0)
+        values = values[:, has_numbers]
+        if values.shape[1] == 0:
+            print("none of the variables to cluster has numbers, every row is put in cluster 0")
+            labels, clusters = zeros(data_frame.shape[0], dtype=int), None
+        else:
+            labels, clusters = kmeans_clusters(values, int(self.__number_of_cluster_colors), self.__cluster_seed)
+        data_frame.insert(data_frame.shape[1], 'cluster', labels.astype(str), allow_duplicates=True)
+        # the clusters are kept so rows appended later can be put in the cluster of their nearest center
+        if clusters is not None:
+            self.__stage_models['clusters'] = {
+                'columns': [str(data_frame.columns[position]) for position, kept in zip(positions, has_numbers)
+                            if kept],
+                'rows': len(values), 'means': clusters['means'].tolist(),
+                'deviations': clusters['deviations'].tolist(), 'centers': clusters['centers'].tolist()}
+        source_plan['derived_columns'].append(['cluster', []])
+        return data_frame
+
+    # this function returns a context manager that times a stage of the compile running now
+    def __stage__(self, stage_name):
+        if self.__compile_stats is None:
+            return nullcontext()
+        return self.__compile_stats.stage(stage_name)
+
+    # this function adds to a count of the stats report of the compile running now
+    def __count__(self, count_name, amount):
+        if self.__compile_stats is not None:
+            self.__compile_stats.add(count_name, amount)
+
+    # this function collects every setting that changes the compiled output, used to fingerprint a compile
+    def __get_compile_config__(self):
+        uncached_attributes = ['_PyParasol__compile_cache', '_PyParasol__cache_manifest_file_name',
+                               '_PyParasol__final_data_file_name', '_PyParasol__sampling_report',
+                               '_PyParasol__embedded_data_payload', '_PyParasol__memory_files',
+                               '_PyParasol__compile_stats', '_PyParasol__compile_report', '_PyParasol__stats_hook',
+                               '_PyParasol__stats_capture_modes', '_PyParasol__parse_workers',
+                               '_PyParasol__parse_pool', '_PyParasol__parsed_data_cache', '_PyParasol__selection',
+                               '_PyParasol__served_data', '_PyParasol__unsampled_data',
+                               '_PyParasol__stage_models']
+        compile_config = {}
+        for attribute_name, value in vars(self).items():
+            if attribute_name not in uncached_attributes:
+                compile_config[attribute_name] = value
+        return compile_config
+
     # this function is used to validate a variable is a hex color
     @staticmethod
     def __validate_color__(color_variable):
@@ -539,10 +1253,70 @@ class PyParasol:
     def __write_end_body_start_script__(self, final_data_file):
         final_html_lines = '</body>'
         final_html_lines += '\n\n<script>'
-        final_html_lines += "\nd3.csv('" + final_data_file + "')"
+        if self.__self_contained:
+            final_html_lines += COLUMNAR_DECODER_SCRIPT
+            final_html_lines += EMBEDDED_DECODER_SCRIPT
+            final_html_lines += "\nparasolDecodeEmbedded('" + self.__embedded_data_payload + "')"
+            final_html_lines += ".then(parasolDecodeColumnar)"
+        else:
+            if self.__page_data_format__() == "binary":
+                final_html_lines += COLUMNAR_DECODER_SCRIPT
+            final_html_lines += "\n" + self.__write_data_load_expression__("'" + final_data_file + "'")
         final_html_lines += ".then(function(data) {"
         return final_html_lines
 
+    # this function returns the format of the data file the page loads, data given in memory is always binary
+    def __page_data_format__(self):
+        if self.__memory_data:
+            return "binary"
+        return self.__data_format
+
+    # this function writes the javascript expression that loads a data file from the server, returning a promise
+    #   of the rows. data file expression is javascript that gives the file name
+    def __write_data_load_expression__(self, data_file_expression):
+        if self.__page_data_format__() == "binary":
+            return "fetch(" + data_file_expression + ")" + \
+                   ".then(function(response) { return response.arrayBuffer(); })" + \
+                   ".then(parasolDecodeColumnar)"
+        return "d3.csv(" + data_file_expression + ")"
+
+    # this function writes the lines that listen to the local server and load new data when it is recompiled
+    # a reload event swaps the data of every chart and the grid, a refresh event reloads the whole page
+    # clusters and weighted sums found in the browser are only worked out when the page loads, so pages using
+    #   them are reloaded completely
+    def __write_live_reload_lines__(self):
+        if not self.__live_reload or self.__self_contained:
+            return ""
+        browser_stages = (self.__cluster_status and not self.__cluster_precompute) or \
+            (self.__weighted_weight_list is not None and self.__weighted_variable_list is not None)
+        final_html_lines = "\nif (window.EventSource) {"
+        final_html_lines += "\n  var parasol_events = new EventSource('" + EVENTS_PATH + "');"
+        final_html_lines += "\n  parasol_events.addEventListener('refresh', function(event) { location.reload(); });"
+        if self.__live_tail:
+            final_html_lines += APPEND_ROWS_SCRIPT
+            final_html_lines += "\n  parasol_events.addEventListener('append', function(event) {"
+            final_html_lines += "\n    parasolAppendRows(ps, JSON.parse(event.data), " + \
+                                str(bool(self.__attachGrid)).lower() + ");"
+            final_html_lines += "\n  });"
+        if browser_stages:
+            final_html_lines += "\n  parasol_events.addEventListener('reload', function(event) { location.reload(); });"
+            final_html_lines += "\n}"
+            return final_html_lines
+        final_html_lines += "\n  parasol_events.addEventListener('reload', function(event) {"
+        final_html_lines += "\n    " + self.__write_data_load_expression__("event.data") + \
+                            ".then(function(new_data) {"
+        final_html_lines += "\n      new_data.forEach(function(d, i) { d.id = i; });"
+        final_html_lines += "\n      new_data = d3.csvParse(d3.csvFormat(new_data));"
+        final_html_lines += "\n      ps.resetSelections('both');"
+        final_html_lines += "\n      ps.state.data = new_data;"
+        final_html_lines += "\n      ps.charts.forEach(function(pc) { pc.data(new_data).render(); pc.brushReset(); });"
+        if self.__attachGrid:
+            final_html_lines += "\n      ps.gridUpdate({data: new_data});"
+        final_html_lines += "\n    });"
+        final_html_lines += "\n  });"
+        final_html_lines += "\n}"
+        return final_html_lines
+
     # this function writes the end of a function
     def __write_function_end__(self):
         final_html_lines = "\n});"
@@ -558,19 +1332,60 @@ class PyParasol:
         final_html_lines = '<!doctype html>\n<head>\n<meta content="text/html;charset=utf-8" http-equiv="Content-Type">'
         final_html_lines += '\n<meta content="utf-8" http-equiv="encoding">\n</head>'
         final_html_lines += '\n\n<title>' + self.__page_tab_title + '</title>'
-        final_html_lines += '\n\n<link rel="stylesheet" type="text/css" href="parasol.css" >'
-        final_html_lines += '\n<script src="d3.v5.min.js"></script>'
-        final_html_lines += '\n<script src="parasol.standalone.js"></script>'
+        if self.__self_contained:
+            final_html_lines += '\n\n<style>\n' + self.__read_asset__('parasol.css').replace('</style', '<\\/style') + \
+                                '\n</style>'
+            for script_file_name in ['d3.v5.min.js', 'parasol.standalone.js']:
+                final_html_lines += '\n<script>\n' + \
+                                    self.__read_asset__(script_file_name).replace('</script', '<\\/script') + \
+                                    '\n</script>'
+        else:
+            final_html_lines += '\n\n<link rel="stylesheet" type="text/css" href="parasol.css" >'
+            final_html_lines += '\n<script src="d3.v5.min.js"></script>'
+            final_html_lines += '\n<script src="parasol.standalone.js"></script>'
         final_html_lines += '\n\n<body>'
         final_html_lines += '\n<h1>' + self.__page_title + '</h1>\n'
         return final_html_lines
 
+    # this function writes the note under the page title saying how many rows are drawn when the data was sampled
+    def __write_sampling_note__(self):
+        if self.__sampling_report is None:
+            return ""
+        rows_total = self.__sampling_report['rows_total']
+        rows_shown = self.__sampling_report['rows_shown']
+        final_html_lines = "\n<p class='sampling-note'>Showing " + str(rows_shown) + " of " + str(rows_total) + \
+                           " rows (" + str(round(100 * rows_shown / max(rows_total, 1), 2)) + "%). "
+        # a self contained page doesn't link to the full data file, since it may be opened without it
+        if not self.__self_contained and self.__sampling_report['full_data_file'] is not None:
+            final_html_lines += "<a href='" + self.__sampling_report['full_data_file'] + \
+                                "' download>Download full dataset</a>"
+        final_html_lines += "</p>"
+        return final_html_lines
+
+    # this function writes the sampling ratio variable, the share of the rows that are drawn
+    def __write_sampling_variable__(self):
+        if self.__sampling_report is None:
+            return ""
+        sampling_ratio = self.__sampling_report['rows_shown'] / max(self.__sampling_report['rows_total'], 1)
+        final_html_lines = "\nvar sampling_ratio = " + str(sampling_ratio) + ";"
+        return final_html_lines
+
+    # this function reads one of the parasol asset files for a self contained html file
+    # the file is looked for in the current directory first, then next to this file
+    @staticmethod
+    def __read_asset__(asset_file_name):
+        asset_path = asset_file_name
+        if not exists(asset_path):
+            asset_path = join(dirname(abspath(__file__)), asset_file_name)
+        with open(asset_path, 'r', encoding='utf-8') as asset_file:
+            return asset_file.read()
+
     # this function writes the parasol variable lines of code
     def __write_parasol_variable__(self):
         final_html_lines = "\nvar ps = Parasol(data)('.parcoords')"
 
-        # adds attachgrid line if option is set to true
-        if self.__attachGrid:
+        # adds attachgrid line if option is set to true, a paged grid is attached after the parasol variable
+        if self.__attachGrid and not self.__page_grid_paged__():
             final_html_lines += "\n.attachGrid({container: '#grid'})"
 
         # adds linked line if option is set to true
@@ -588,17 +1403,44 @@ class PyParasol:
         final_html_lines += "\n.setAxesLayout(axes_layout)"
 
         final_html_lines += ";"
+
+        if self.__page_grid_paged__():
+            final_html_lines += PAGED_GRID_SCRIPT
+            final_html_lines += "\nparasolPagedGrid(ps, '#grid', '" + ROWS_PATH + "', " + str(DEFAULT_PAGE_ROWS) + ");"
+
+        # the page posts its selection to the local server if show() started one
+        if self.__post_selection and not self.__self_contained:
+            final_html_lines += SELECTION_SCRIPT
+            final_html_lines += "\nparasolPostSelection(ps, '" + SELECTION_PATH + "');"
         return final_html_lines
 
+    # this function says if the page has a paged grid, a self contained html file has no server to page from
+    def __page_grid_paged__(self):
+        return bool(self.__attachGrid) and self.__paged_grid and not self.__self_contained
+
     # this function writes all the attributes that are specific to plots
     # variables included: plot color, plot alpha
     def __write_specific_plot_attribute_lines__(self):
-        final_html_lines = ""
+        final_html_lines = self.__write_cluster_color_lines__()
         # loops through every plot that has been created
         for plot_id_number in self.__find_plot_index_from_id__(None):
             final_html_lines += self.__parasol_plot_list[plot_id_number].write_self_attributes(plot_id_number)
         return final_html_lines
 
+    # this function writes the lines coloring plots by the cluster column found when compiling
+    # plot colors are written after these lines, so setting a plot color still overrides the clusters
+    def __write_cluster_color_lines__(self):
+        if not self.__cluster_status or not self.__cluster_precompute:
+            return ""
+        plots_to_color = self.__plots_to_cluster_list
+        if plots_to_color is None:
+            plots_to_color = self.__find_plot_index_from_id__(None)
+        final_html_lines = ""
+        for plot_id_number in plots_to_color:
+            final_html_lines += "\nps.charts[" + str(plot_id_number) + "].color(function(d) " + \
+                                "{ return d3.schemeCategory10[Number(d['cluster']) % 10]; });"
+        return final_html_lines
+
     # this function writes the .linked attribute line if called
     def __write_linked_attribute_line__(self):
         final_html_line = ""
@@ -627,8 +1469,8 @@ class PyParasol:
 
     # this function writes the .cluster line if called
     def __write_cluster_attribute_line__(self):
-        # if status is set to false, returns nothing
-        if not self.__cluster_status:
+        # if status is set to false or the clusters were found when compiling, returns nothing
+        if not self.__cluster_status or self.__cluster_precompute:
             return ""
         final_html_line = "\n.cluster({k: " + str(self.__number_of_cluster_colors)
         # if there are display ids set, writes them
@@ -652,39 +1494,59 @@ class PyParasol:
         return final_html_lines
 
     # this function writes the axes_to_hide variable to display numerous plots of different data
-    def __write_axes_to_hide__(self, header_list):
-        final_html_lines = "\nvar axes_to_hide = {"
-        # for each plot, it adds the headers of every other data set besides itself
-        for plot_number in range(len(header_list)):
-            final_html_lines += "\n" + str(plot_number) + ": ["
-            # adds any headers to hide that were specified
-            for header_to_hide in self.__parasol_plot_list[plot_number].columns_to_hide:
-                final_html_lines += '"' + header_to_hide + '", '
-            # loops through every plots header list for each plot
-            for plot_headers_number in range(len(header_list)):
-                # skips iteration so the headers of a plot don't get added to the plots own axes-to-hide list
-                if plot_headers_number == plot_number:
-                    continue
-                # if two plots have the same data set, skips so all data doesn't get marked to hide
-                if self.__parasol_plot_list[plot_number].file_name ==\
-                        self.__parasol_plot_list[plot_headers_number].file_name:
-                    continue
-                # if the current header list isn't for the current plot, adds the header lists to axes to hide
-                for header in range(len(header_list[plot_headers_number])):
-                    final_html_lines += '"' + header_list[plot_headers_number][header] + '", '
-            final_html_lines += ']'
-            if plot_number != len(header_list) - 1:
-                final_html_lines += ','
-        final_html_lines += "\n};"
-        return final_html_lines
+    # the source plan maps every plot to its unique data file, so plots that share a file share its columns
+    # a plot hides the columns it was told to hide, the columns of every other data file that its own file doesn't
+    #   have, and columns added by the data stages for other plots
+    # the page only gets every column name once, and the columns every plot shows as indexes into the names. plots
+    #   that show the same columns share one list, so the size grows with the number of columns and not with plots
+    #   times columns. the hidden names of every plot are worked out in the page.
+    def __write_axes_to_hide__(self, source_plan):
+        plot_sources = source_plan['plot_sources']
+        header_lists = source_plan['header_lists']
+        derived_columns = source_plan['derived_columns']
+        # every column name once, in the order it is first found
+        axis_names = {}
+        for header_list in header_lists:
+            axis_names.update(dict.fromkeys(header_list))
+        axis_names.update(dict.fromkeys(column_name for column_name, column_plot_numbers in derived_columns))
+        for plot in self.__parasol_plot_list:
+            axis_names.update(dict.fromkeys(plot.columns_to_hide))
+        axis_indexes = {name: index for index, name in enumerate(axis_names)}
+        all_headers = set(header for header_list in header_lists for header in header_list)
+
+        visible_groups = {}
+        plot_groups = []
+        for plot_number, plot in enumerate(self.__parasol_plot_list):
+            hidden_names = all_headers.difference(header_lists[plot_sources[plot_number]])
+            hidden_names.update(plot.columns_to_hide)
+            hidden_names.update(column_name for column_name, column_plot_numbers in derived_columns
+                                if plot_number not in column_plot_numbers)
+            visible_indexes = tuple(axis_indexes[name] for name in axis_names if name not in hidden_names)
+            plot_groups.append(visible_groups.setdefault(visible_indexes, len(visible_groups)))
+
+        return ("\nvar axes_to_hide = (function(names, visibleGroups, plotGroups) {"
+                "\n  var hidden = {};"
+                "\n  plotGroups.forEach(function(group, plot) {"
+                "\n    var visible = new Set(visibleGroups[group]);"
+                "\n    hidden[plot] = names.filter(function(name, index) { return !visible.has(index); });"
+                "\n  });"
+                "\n  return hidden;"
+                "\n})(" + dumps(list(axis_names), separators=(',', ':')) + ",\n" +
+                dumps([list(visible_indexes) for visible_indexes in visible_groups], separators=(',', ':')) +
+                ",\n" + dumps(plot_groups, separators=(',', ':')) + ");")
 
     # this function writes the axes layout variable to specify order, which variables to display
-    def __write_axes_layout__(self):
+    # columns added by the data stages are added to the end of the layout of the plots they belong to
+    def __write_axes_layout__(self, source_plan):
         final_html_lines = "\nvar axes_layout = {"
         for plot in range(len(self.__parasol_plot_list)):
             if self.__parasol_plot_list[plot].axes_layout:
+                axes_layout = list(self.__parasol_plot_list[plot].axes_layout)
+                for column_name, column_plot_numbers in source_plan['derived_columns']:
+                    if plot in column_plot_numbers and column_name not in axes_layout:
+                        axes_layout.append(column_name)
                 final_html_lines += "\n" + str(plot) + ": "
-                final_html_lines += str(self.__parasol_plot_list[plot].axes_layout)
+                final_html_lines += str(axes_layout)
                 if plot != len(self.__parasol_plot_list) - 1:
                     final_html_lines += ","
 
@@ -738,20 +1600,27 @@ class PyParasol:
     # this is the master function for writing all parasol html file lines
     # some of the functions are always called even if they won't do anything based on user options
     #   in that case, the function simply returns a blank string ""
-    def __write_parasol_html_file__(self, header_list, final_data_file):
+    # every writer is timed as a stage of its own in the compile stats
+    def __write_parasol_html_file__(self, source_plan, final_data_file):
+        html_writers = [(self.__write_setup_settings__, []),
+                        (self.__write_sampling_note__, []),
+                        (self.__write_button_setup_lines__, []),
+                        (self.__write_plot_body_lines__, []),
+                        (self.__write_end_body_start_script__, [final_data_file]),
+                        (self.__write_axes_to_hide__, [source_plan]),
+                        (self.__write_axes_layout__, [source_plan]),
+                        (self.__write_sampling_variable__, []),
+                        (self.__write_weights_variable__, []),
+                        (self.__write_parasol_variable__, []),
+                        (self.__write_specific_plot_attribute_lines__, []),
+                        (self.__write_button_functions_master__, []),
+                        (self.__write_live_reload_lines__, []),
+                        (self.__write_function_end__, []),
+                        (self.__write_script_end__, [])]
         html_final = ""
-        html_final += self.__write_setup_settings__()
-        html_final += self.__write_button_setup_lines__()
-        html_final += self.__write_plot_body_lines__()
-        html_final += self.__write_end_body_start_script__(final_data_file)
-        html_final += self.__write_axes_to_hide__(header_list)
-        html_final += self.__write_axes_layout__()
-        html_final += self.__write_weights_variable__()
-        html_final += self.__write_parasol_variable__()
-        html_final += self.__write_specific_plot_attribute_lines__()
-        html_final += self.__write_button_functions_master__()
-        html_final += self.__write_function_end__()
-        html_final += self.__write_script_end__()
+        for html_writer, writer_arguments in html_writers:
+            with self.__stage__(html_writer.__name__):
+                html_final += html_writer(*writer_arguments)
 
         return html_final
 
@@ -760,20 +1629,119 @@ class PyParasol:
     # @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
 
     # this function starts the local server for the parallel plot and opens the web page
+    # the threaded server keeps connections alive, sends gzip compressed files, answers reloads with 304 not
+    #   modified and supports range requests. setting threaded to False uses the plain single threaded server.
+    # files listed in precompress file names are compressed before the server starts
+    # memory files is a MemoryFileStore of files the threaded server serves from memory
+    # row pager is a data_grid.RowPager that answers a paged grid, selection is a selection.SelectionStore that keeps
+    #   the selection the page posts. only the threaded server has them.
     @staticmethod
-    def startLocalServer(port=8000):
-        localhost_server = TCPServer(("", port), SimpleHTTPRequestHandler)
+    def startLocalServer(port=8000, threaded=True, precompress_file_names=None, memory_files=None, row_pager=None,
+                         selection=None):
+        if threaded:
+            localhost_server = make_server(port, precompress_file_names, memory_files, row_pager, selection)
+        else:
+            localhost_server = TCPServer(("", port), SimpleHTTPRequestHandler)
         localhost_server.serve_forever()
 
+    # this function hosts many compiled parasol applications from one server at the given port, each at
+    #   /name/html_file_name, with a page listing them at / and the counts of the server at /__parasol__/stats
+    # dashboards is a dictionary of names to compiled html files, or a list of html files named after the files
+    # workers is the number of connections served at the same time, dashboard requests is the most requests of one
+    #   dashboard served at the same time (half the workers by default), so one dashboard can't keep the others
+    #   waiting. compressed files are kept in a cache of at most cache bytes, dropping the least recently used.
+    # if background is True, the server runs on a background thread and is returned, call shutdown() on it to stop
+    @staticmethod
+    def hostDashboards(dashboards, port=8000, workers=DEFAULT_WORKERS, cache_bytes=DEFAULT_CACHE_BYTES,
+                       dashboard_requests=None, background=False):
+        try:
+            dashboard_server = make_dashboard_server(dashboards, port, workers, cache_bytes, dashboard_requests)
+        except ValueError as error:
+            print("can't host the dashboards: " + str(error))
+            return None
+        if background:
+            Thread(target=dashboard_server.serve_forever, daemon=True).start()
+            return dashboard_server
+        dashboard_server.serve_forever()
+
     # this function opens up the web page that's specified as the html file name, call after starting local server
     def displayWebpage(self, port=8000):
         open_website("http://localhost:" + str(port) + "/" + self.__html_file_name)
 
+    # this function says why the data files can't be tailed, returns None if they can
+    # new rows are added to the page as they are, so nothing may need the whole dataset to work out
+    def __find_tail_problem__(self):
+        if self.__self_contained:
+            return "a self contained html file has no server to send new rows"
+        if any(plot.data_frame is not None for plot in self.__parasol_plot_list):
+            return "data given in memory has no file to watch"
+        if self.__find_key_columns__(self.__build_source_plan__()) is not None:
+            return "rows joined on a key column can't be matched as they are appended"
+        if self.__data_stages_needed__() or self.__precomputed_weighted_sums:
+            return "row limits, objectives and precomputed clusters or weighted sums need the whole dataset"
+        if self.__cluster_status or self.__weighted_variable_list is not None:
+            return "clusters and weighted sums worked out in the browser need the whole dataset"
+        return None
+
+    # this function starts watching the data files for appended rows and sending them to the open page
+    def __start_tail__(self, server_handle, tail_interval):
+        source_plan = self.__build_source_plan__()
+        source_plan['header_lists'] = get_header_list(source_plan['file_names'])
+        tail_watcher = TailWatcher(source_plan['file_names'], self.__find_needed_columns__(source_plan),
+                                   server_handle.server.events.publish, tail_interval, server_handle.update)
+        server_handle.add_watcher(tail_watcher)
+
+    # this function returns the name of a data file written when compiling, with the data file prefix if it is set
+    def __data_file_name__(self, file_name):
+        if self.__data_file_prefix is None:
+            return file_name
+        return self.__data_file_prefix + "_" + file_name
+
+    # this function returns the row pager a paged grid asks for rows, None if the page has no paged grid
+    # the pager follows the data file the page loads, so it pages the new data after a recompile
+    def __make_row_pager__(self):
+        if not self.__page_grid_paged__():
+            return None
+        return self.__served_data
+
+    # this function returns the names of the files the compiled parasol application loads
+    def __get_served_file_names__(self):
+        return [self.__html_file_name, self.__final_data_file_name, 'parasol.css', 'd3.v5.min.js',
+                'parasol.standalone.js']
+
     # this functions is used to display the parallel plot once set up and styling has been finished
     # this function is the same as compile except it *ALSO* creates a local server and opens the parasol window
+    # if background is True, the server runs on a background thread and a server handle is returned straight away.
+    #   calling update() on the handle recompiles and the open page loads the new data without a manual refresh,
+    #   calling stop() on the handle stops the server.
+    # if tail is True, the server also runs in the background and the data files are checked for appended rows
+    #   every tail interval seconds, new rows are sent to the open page and drawn on top of the existing lines.
     def show(self,
-             port=8000
+             port=8000,
+             background=False,
+             tail=False,
+             tail_interval=DEFAULT_TAIL_INTERVAL
              ):
+        if type(background) is not bool or type(tail) is not bool:
+            print('Set background and tail to True or False')
+            return
+        if tail:
+            tail_problem = self.__find_tail_problem__()
+            if tail_problem is not None:
+                print("can't tail the data files: " + tail_problem)
+                return
+            background = True
+        # the page only listens for new data when there is a server left running to send it
+        self.__live_reload = background
+        self.__live_tail = tail
+        self.__post_selection = not self.__self_contained
+        # data given in memory is served from memory from now on, without writing it to a file
+        if self.__memory_files is None:
+            self.__memory_files = MemoryFileStore()
+        # the data the page loads, read when the grid or the selection needs it
+        if self.__served_data is None:
+            self.__served_data = RowPager(lambda: self.__final_data_file_name, self.__memory_files)
+
         # compiles the html and csv output files
         compile_success = self.compile()
 
@@ -781,21 +1749,464 @@ class PyParasol:
         if compile_success == 0:
             return
 
+        if background:
+            # the server handle serves on its own thread, so the web page is opened once it's running
+            localhost_server = make_server(port, self.__get_served_file_names__(), self.__memory_files,
+                                           self.__make_row_pager__(), self.__selection)
+            server_handle = ParasolServerHandle(localhost_server, self.compile, self.__html_file_name,
+                                                lambda: self.__final_data_file_name)
+            if tail:
+                self.__start_tail__(server_handle, tail_interval)
+            self.displayWebpage(port)
+            return server_handle
+
         # ensuring file exists
-        temp = open(self.__final_data_file_name, 'r')
-        temp.close()
+        if self.__memory_files.get(self.__final_data_file_name) is None:
+            temp = open(self.__final_data_file_name, 'r')
+            temp.close()
 
         # opens up web page first since any code following starting the server won't be run
         self.displayWebpage(port)
 
         # starts local server at specified port
-        self.startLocalServer(port)
+        self.startLocalServer(port, precompress_file_names=self.__get_served_file_names__(),
+                              memory_files=self.__memory_files, row_pager=self.__make_row_pager__(),
+                              selection=self.__selection)
 
         return
 
+    # this function compiles a parasol application with data given in memory
+    # every source is cut to the columns that are used and encoded to the columnar format. the encoded columns of
+    #   data given in memory are kept on its plot, so they are only encoded once. if a data stage changes the rows,
+    #   the combined data is encoded again instead.
+    # the data is kept in the memory files of the server if show() made one, otherwise it is written to a file
+    # the compile cache isn't used, since there are no files to check the data against
+    def __compile_memory_data__(self, source_plan, key_columns):
+        with self.__stage__('header scan'):
+            source_plan['header_lists'] = [
+                [str(header) for header in plot.data_frame.columns] if plot is not None else
+                get_header_list([file_name])[0]
+                for file_name, plot in zip(source_plan['file_names'], source_plan['memory_plots'])]
+            column_lists = self.__find_needed_columns__(source_plan)
+        if key_columns is not None:
+            if not self.__validate_key_columns__(source_plan, key_columns):
+                self.__compile_stats.error("key column missing from a data set")
+                return 0
+            column_lists = [column_list if column_list is None or key_column in column_list else
+                            column_list + [key_column] for column_list, key_column in zip(column_lists, key_columns)]
+        if not self.__validate_objectives__(source_plan):
+            self.__compile_stats.error("objective missing from a data set")
+            return 0
+        self.__sampling_report = None
+        self.__unsampled_data = None
+        self.__embedded_data_payload = None
+
+        if self.__data_stages_needed__() or self.__precomputed_weighted_sums or self.__self_contained or \
+                key_columns is not None:
+            with self.__stage__('data stages'):
+                with self.__stage__('read data'):
+                    source_frames = [self.__read_source_frame__(source_plan, source_number,
+                                                                column_lists[source_number])
+                                     for source_number in range(len(column_lists))]
+                    if key_columns is not None:
+                        data_frame = self.__join_source_frames__(source_plan, source_frames, key_columns)
+                    else:
+                        source_plan['header_lists'] = [list(source_frame.columns) for source_frame in source_frames]
+                        # sources with fewer rows are padded with empty cells, the same as combine_csv
+                        data_frame = concat([source_frame.reset_index(drop=True) for source_frame in source_frames],
+                                            axis=1)
+                self.__count__('rows', data_frame.shape[0])
+                data_frame = self.__run_data_stages__(data_frame, source_plan, None)
+            self.__count__('rows_shown', data_frame.shape[0])
+            if self.__self_contained:
+                with self.__stage__('embed data'):
+                    self.__embedded_data_payload = encode_embedded_payload(data_frame, self.__float_precision)
+            else:
+                with self.__stage__('write columnar data'):
+                    data_bytes = encode_columnar(data_frame, self.__float_precision)
+        else:
+            with self.__stage__('write columnar data'):
+                data_bytes = self.__assemble_memory_sources__(source_plan, column_lists)
+
+        output_data_file_name = self.__data_file_name__("memory_data.bin")
+        if self.__self_contained:
+            output_data_file_name = self.__html_file_name
+        elif self.__memory_files is not None:
+            self.__memory_files.set(output_data_file_name, data_bytes)
+        else:
+            with self.__stage__('file write'):
+                with open(output_data_file_name, 'wb') as output_file:
+                    output_file.write(data_bytes)
+
+        self.__final_data_file_name = output_data_file_name
+        with self.__stage__('html'):
+            html_file = self.__write_parasol_html_file__(source_plan, output_data_file_name)
+        with self.__stage__('file write'):
+            with open(self.__html_file_name, 'w') as html_output:
+                html_output.write(html_file)
+        self.__count__('output_bytes', len(html_file.encode('utf-8')) + (0 if self.__self_contained else
+                                                                          len(data_bytes)))
+        return 1
+
+    # this function returns the data of a source as a DataFrame, cut to the columns in the column list
+    # data given in memory, or parsed in the parsed data cache, isn't copied unless columns are left out
+    def __read_source_frame__(self, source_plan, source_number, column_list):
+        memory_plot = source_plan['memory_plots'][source_number]
+        if memory_plot is not None:
+            source_frame = memory_plot.data_frame
+        elif self.__parsed_data_cache is not None:
+            source_frame = self.__parsed_data_cache.get(source_plan['file_names'][source_number])
+        else:
+            source_frame = read_data_csv(source_plan['file_names'][source_number])
+        if column_list is None:
+            return source_frame
+        column_set = set(column_list)
+        return source_frame.iloc[:, [position for position, header in enumerate(source_frame.columns)
+                                     if header in column_set]]
+
+    # this function combines the data files from the parsed data cache, the same way combine_csv combines them
+    # returns the combined DataFrame and the combine stats
+    def __combine_parsed_sources__(self, source_plan, column_lists, key_columns):
+        if key_columns is not None:
+            column_lists = [column_list if column_list is None or key_column in column_list else
+                            column_list + [key_column] for column_list, key_column in zip(column_lists, key_columns)]
+        source_frames = [self.__read_source_frame__(source_plan, source_number, column_lists[source_number])
+                         for source_number in range(len(column_lists))]
+        if key_columns is not None:
+            combined_frame = self.__join_source_frames__(source_plan, source_frames, key_columns).fillna('')
+            return combined_frame, {'rows': combined_frame.shape[0]}
+        source_plan['header_lists'] = [list(source_frame.columns) for source_frame in source_frames]
+        # sources with fewer rows are padded with empty cells
+        combined_frame = concat([source_frame.reset_index(drop=True) for source_frame in source_frames],
+                                axis=1).fillna('')
+        return combined_frame, {'rows': combined_frame.shape[0],
+                                'file_rows': [source_frame.shape[0] for source_frame in source_frames]}
+
+    # this function joins the data sets on their key columns, the same way combine_csv joins data files in memory
+    # the key is renamed to the key of the first data set in every header list, and kept once in the data
+    def __join_source_frames__(self, source_plan, source_frames, key_columns):
+        key_name = key_columns[0]
+        source_frames = [source_frame.rename(columns={key_column: key_name})
+                         for source_frame, key_column in zip(source_frames, key_columns)]
+        # keys of data files are read as text, so keys of different types are all compared as text
+        if len(set(source_frame[key_name].dtype for source_frame in source_frames)) > 1:
+            source_frames = [source_frame.assign(**{key_name: source_frame[key_name].astype(str)})
+                             for source_frame in source_frames]
+        source_plan['header_lists'] = [list(source_frame.columns) for source_frame in source_frames]
+        # the other columns are numbered while they are joined, so columns that several data sets share keep their
+        #   names instead of getting suffixes, the same as combine_csv writes them
+        column_names = {}
+        numbered_frames = []
+        for source_frame in source_frames:
+            numbers = {}
+            for column_name in source_frame.columns:
+                if column_name != key_name:
+                    numbers[column_name] = len(column_names)
+                    column_names[len(column_names)] = column_name
+            numbered_frames.append(source_frame.set_axis([numbers.get(column_name, column_name) for column_name in
+                                                          source_frame.columns], axis=1))
+        data_frame = numbered_frames[0]
+        for source_frame in numbered_frames[1:]:
+            data_frame = data_frame.merge(source_frame, how=self.__join_type, on=key_name, sort=False)
+        data_frame.columns = [column_names.get(column_name, column_name) for column_name in data_frame.columns]
+        return data_frame.reset_index(drop=True)
+
+    # this function encodes every source to columns of the columnar format and puts them together
+    # the encoded columns of data given in memory are kept on its plot with the columns, precision and data fingerprint
+    #   they were encoded with, so they are encoded again if the data was changed in place. files are encoded again
+    #   every compile since they can change
+    # returns the bytes of the columnar data file
+    def __assemble_memory_sources__(self, source_plan, column_lists):
+        source_blocks = []
+        source_row_counts = []
+        for source_number, column_list in enumerate(column_lists):
+            memory_plot = source_plan['memory_plots'][source_number]
+            encoding_key = [column_list, self.__float_precision]
+            if memory_plot is not None:
+                encoding_key.append(data_fingerprint(memory_plot.data_frame))
+            if memory_plot is not None and memory_plot.encoded_columns is not None and \
+                    memory_plot.encoded_columns['key'] == encoding_key:
+                encoded_columns = memory_plot.encoded_columns
+            else:
+                source_frame = self.__read_source_frame__(source_plan, source_number, column_list)
+                encoded_columns = {'key': encoding_key, 'rows': int(source_frame.shape[0]),
+                                   'headers': [str(header) for header in source_frame.columns],
+                                   'blocks': encode_column_blocks(source_frame, self.__float_precision)}
+                if memory_plot is not None:
+                    memory_plot.encoded_columns = encoded_columns
+            source_plan['header_lists'][source_number] = encoded_columns['headers']
+            source_blocks.append(encoded_columns['blocks'])
+            source_row_counts.append(encoded_columns['rows'])
+
+        # sources with fewer rows than the others are encoded again padded with empty cells
+        number_of_rows = max(source_row_counts)
+        column_blocks = []
+        for source_number, blocks in enumerate(source_blocks):
+            if source_row_counts[source_number] < number_of_rows:
+                source_frame = self.__read_source_frame__(source_plan, source_number, column_lists[source_number])
+                blocks = encode_column_blocks(source_frame.reset_index(drop=True).reindex(range(number_of_rows)),
+                                              self.__float_precision)
+            column_blocks.extend(blocks)
+        return assemble_columnar(number_of_rows, column_blocks)
+
     # this function compiles the parasol html file and the output csv file
     # this function *DOES NOT* start a local server and run open a parasol window, it just creates it
+    # the stats report of the compile can be read with getCompileReport() and is passed to the stats hook
+    # returns 1 if compiling worked, 0 if it failed
     def compile(self, html_file_name=None):
+        self.__compile_stats = CompileStats(self.__stats_capture_modes)
+        self.__compile_stats.start()
+        status = "error"
+        try:
+            compile_result = self.__compile__(html_file_name)
+            status = "ok" if compile_result == 1 else "failed"
+        finally:
+            self.__compile_report = self.__compile_stats.finish(status)
+            self.__compile_stats = None
+            self.__send_compile_report__()
+        return compile_result
+
+    # this function compiles many parasol applications at the same time in worker processes
+    # every data file is parsed once, before the workers start, into a parsed data cache shared by all of them
+    #   (where processes can be forked, the workers share the parsed data without copying it)
+    # every application needs its own html file name. applications without a data file prefix get the name of
+    #   their html file as one, so their data files don't write over each other.
+    # returns the compile() result of every application in order, or None if nothing was compiled
+    @staticmethod
+    def compileBatch(parasol_list, workers=None, parsed_data_cache=None):
+        if type(parasol_list) != list or any(not isinstance(parasol, PyParasol) for parasol in parasol_list):
+            print("set the parasol list to a list of PyParasol objects")
+            return None
+        html_file_paths = [normpath(abspath(parasol.__html_file_name)) for parasol in parasol_list]
+        if len(set(html_file_paths)) != len(html_file_paths):
+            print("every parasol application in a batch needs its own html file name, set it with setHTMLFileName()")
+            return None
+        if workers is None:
+            workers = min(len(parasol_list), cpu_count() or 1)
+        if type(workers) != int or workers < 1:
+            print("set workers to a positive integer")
+            return None
+        if parsed_data_cache is None:
+            parsed_data_cache = ParsedDataCache()
+
+        for parasol in parasol_list:
+            if parasol.__data_file_prefix is None:
+                parasol.__data_file_prefix = splitext(basename(parasol.__html_file_name))[0]
+            parasol.__parsed_data_cache = parsed_data_cache
+        parsed_data_cache.load([plot.file_name for parasol in parasol_list for plot in parasol.__parasol_plot_list
+                                if plot.data_frame is None])
+
+        if workers == 1 or len(parasol_list) == 1:
+            _start_batch_worker(parasol_list)
+            batch_results = [_compile_batch_parasol(parasol_number) for parasol_number in range(len(parasol_list))]
+        else:
+            pool_context = get_context('fork') if 'fork' in get_all_start_methods() else None
+            with ProcessPoolExecutor(workers, mp_context=pool_context, initializer=_start_batch_worker,
+                                     initargs=(parasol_list,)) as executor:
+                batch_results = list(executor.map(_compile_batch_parasol, range(len(parasol_list))))
+
+        # the compile ran in another process, so its report and data file name are copied back
+        for parasol, batch_result in zip(parasol_list, batch_results):
+            parasol.__compile_report = batch_result['report']
+            parasol.__final_data_file_name = batch_result['data_file_name']
+        return [batch_result['result'] for batch_result in batch_results]
+
+    # this function returns the name of the data file loaded by the last compiled parasol application
+    def __get_final_data_file_name__(self):
+        return self.__final_data_file_name
+
+    # this function warns when rows were matched by position but the data files have different numbers of rows,
+    #   or when a key was found on several rows of a data set and its rows were repeated for every combination
+    def __warn_about_row_alignment__(self, source_plan, combine_stats):
+        file_rows = combine_stats.get('file_rows', [])
+        if len(set(file_rows)) > 1:
+            print("the data files have different numbers of rows (" +
+                  ", ".join(str(file_name) + ": " + str(row_count)
+                            for file_name, row_count in zip(source_plan['file_names'], file_rows)) +
+                  "), rows are matched by their position. set a key column in addPlot() to match them by key")
+            self.__count__('padded_rows', max(file_rows) - min(file_rows))
+        if combine_stats.get('duplicate_keys'):
+            print(str(combine_stats['duplicate_keys']) + " keys are on more than one row of a data set, "
+                  "a row is written for every combination of their rows")
+            self.__count__('duplicate_keys', combine_stats['duplicate_keys'])
+
+    # this function says if rows appended to the data files can be compiled onto the output of this compile
+    # rows joined on a key, sampled rows, embedded or binary data, and pareto fronts that rank every row or are found
+    #   for more than one plot need every row compiled again
+    def __append_compile_supported__(self, key_columns):
+        if key_columns is not None or self.__parsed_data_cache is not None or self.__max_rows is not None:
+            return False
+        if self.__self_contained or self.__data_format != "csv":
+            return False
+        objective_plots = [plot for plot in self.__parasol_plot_list if plot.objectives]
+        if any(plot.front_rank_column is not None or plot.objective_epsilons is not None for plot in objective_plots):
+            return False
+        return len(objective_plots) <= 1
+
+    # this function compiles the rows appended to the data files since the last compile without reading the rows
+    #   that were there before. the new rows are read from where the last compile stopped, merged the same way
+    #   combine_csv merges rows and added to the end of the combined data file. their weighted sums are scaled with
+    #   the ranges of the last compile and their clusters are the clusters of their nearest centers.
+    # rows kept by a pareto front are compiled again with the new rows, since a new row can dominate rows of the
+    #   front, so the work grows with the front and the new rows instead of with every row
+    # returns [data file name, data artifact file names, append state], or None if every row has to be compiled
+    def __append_compile__(self, source_plan, column_lists, manifest):
+        append_state = manifest['extra'].get('append_state')
+        if append_state is None:
+            return self.__append_fall_back__(source_plan, "the last compile can't be appended to")
+        header_lists = source_plan['header_lists']
+        derived_columns = list(source_plan['derived_columns'])
+
+        # reading the new rows of every data file, from the end of the rows the last compile read
+        tails = []
+        new_row_lists = []
+        with self.__stage__('read new rows'):
+            for file_name, column_list, entry in zip(source_plan['file_names'], column_lists, manifest['inputs']):
+                file_size = getsize(file_name)
+                tail = CsvTail(file_name, column_list, entry['append']['offset'] if entry.get('append') else file_size)
+                new_rows = []
+                while tail.offset < file_size:
+                    offset = tail.offset
+                    new_rows.extend(tail.read_new_rows())
+                    if tail.offset == offset:
+                        break
+                if tail.offset < file_size:
+                    return self.__append_fall_back__(source_plan, "a row of " + file_name + " isn't complete")
+                tails.append(tail)
+                new_row_lists.append(new_rows)
+        number_of_new_rows = len(new_row_lists[0])
+        if any(len(new_rows) != number_of_new_rows for new_rows in new_row_lists):
+            return self.__append_fall_back__(source_plan, "the data files got different numbers of rows")
+        merged_rows = [[cell for new_rows in new_row_lists for cell in new_rows[row_number]]
+                       for row_number in range(number_of_new_rows)]
+
+        combined_data_file_name = append_state['combined_data_file_name']
+        if combined_data_file_name is not None:
+            source_plan['header_lists'] = [select_columns(tail.header, tail.column_positions) for tail in tails]
+        header = [name for header_list in source_plan['header_lists'] for name in header_list]
+        data_file_name = combined_data_file_name if combined_data_file_name is not None else \
+            source_plan['file_names'][0]
+        number_of_rows = append_state['rows'] + number_of_new_rows if append_state['rows'] is not None else None
+        new_frame = DataFrame(merged_rows, columns=header, dtype=str)
+        self.__sampling_report = None
+        self.__unsampled_data = None
+        self.__embedded_data_payload = None
+        self.__stage_models = append_state['stage_models']
+
+        # working out the columns of the data stages, nothing is written until every stage worked
+        data_frame = None
+        if any(plot.objectives for plot in self.__parasol_plot_list):
+            with self.__stage__('data stages'):
+                with self.__stage__('read data'):
+                    front_frame = read_data_csv(self.__data_file_name__("output_data_view.csv")).iloc[:, :len(header)]
+                # the columns are numbered while they are joined, since data files can share column names
+                front_frame.columns = range(len(header))
+                new_frame.columns = range(len(header))
+                data_frame = concat([front_frame, new_frame], ignore_index=True)
+                data_frame.columns = header
+                self.__stage_models = {}
+                data_frame = self.__run_data_stages__(data_frame, source_plan, data_file_name)
+        elif self.__precomputed_weighted_sums or self.__data_stages_needed__():
+            with self.__stage__('data stages'):
+                if self.__precomputed_weighted_sums:
+                    with self.__stage__('weighted sums'):
+                        if not extend_weighted_sums(new_frame, self.__get_weighted_sums__(source_plan),
+                                                    self.__stage_models['sum_ranges']):
+                            return self.__append_fall_back__(source_plan, "new values are outside the weighted sum "
+                                                             "ranges", header_lists, derived_columns)
+                if self.__data_stages_needed__():
+                    clusters = self.__stage_models.get('clusters')
+                    if clusters is None or number_of_rows is None or \
+                            number_of_rows > clusters['rows'] * (1 + CLUSTER_REFIT_SHARE):
+                        return self.__append_fall_back__(source_plan, "the clusters have to be found again",
+                                                         header_lists, derived_columns)
+                    with self.__stage__('clusters'):
+                        labels = nearest_clusters(numeric_matrix(new_frame, find_column_positions(
+                            new_frame, clusters['columns'])), clusters)
+                        new_frame.insert(new_frame.shape[1], 'cluster', labels.astype(str), allow_duplicates=True)
+                        source_plan['derived_columns'].append(['cluster', []])
+
+        # adding the new rows to the end of the data files
+        data_artifact_file_names = []
+        with self.__stage__('write new rows'):
+            if combined_data_file_name is not None:
+                with open(combined_data_file_name, 'a', newline='') as output_file:
+                    writer(output_file, lineterminator='\n').writerows(merged_rows)
+                data_artifact_file_names.append(combined_data_file_name)
+            if data_frame is not None:
+                data_file_name = self.__data_file_name__("output_data_view.csv")
+                write_data_csv(data_frame, data_file_name)
+            elif self.__precomputed_weighted_sums or self.__data_stages_needed__():
+                data_file_name = self.__data_file_name__("output_data_view.csv")
+                with open(data_file_name, 'a', newline='') as output_file:
+                    new_frame.to_csv(output_file, index=False, header=False, lineterminator='\n')
+        self.__count__('new_rows', number_of_new_rows)
+        if number_of_rows is not None:
+            self.__count__('rows', number_of_rows)
+        if data_frame is not None:
+            self.__count__('rows_shown', data_frame.shape[0])
+        elif self.__data_stages_needed__():
+            self.__count__('rows_shown', number_of_rows)
+
+        file_rows = append_state['file_rows']
+        return [data_file_name, data_artifact_file_names,
+                {'combined_data_file_name': combined_data_file_name,
+                 'file_rows': [row_count + number_of_new_rows for row_count in file_rows]
+                 if file_rows is not None else None,
+                 'rows': number_of_rows, 'stage_models': self.__stage_models}]
+
+    # this function records why appended rows need a full compile, and puts back the parts of the source plan
+    #   that compiling the new rows changed
+    # returns None
+    def __append_fall_back__(self, source_plan, reason, header_lists=None, derived_columns=None):
+        if header_lists is not None:
+            source_plan['header_lists'] = header_lists
+            source_plan['derived_columns'] = derived_columns
+        self.__compile_cache.fall_back("appended rows need a full compile: " + reason)
+        return None
+
+    # this function writes the html file of a compile and records the compile in the cache manifest
+    # append state is what rows appended to the data files later can be compiled onto, None if they can't be
+    # returns 1
+    def __finish_compile__(self, source_plan, output_data_file_name, data_artifact_file_names, compile_config,
+                           append_state):
+        # writing the html file
+        self.__final_data_file_name = output_data_file_name
+        with self.__stage__('html'):
+            html_file = self.__write_parasol_html_file__(source_plan, output_data_file_name)
+
+        # writing the html file contents to the actual html file
+        with self.__stage__('file write'):
+            with open(self.__html_file_name, 'w') as html_output:
+                html_output.write(html_file)
+        written_file_names = [self.__html_file_name] + data_artifact_file_names
+        if output_data_file_name not in source_plan['file_names'] + written_file_names:
+            written_file_names.append(output_data_file_name)
+        self.__count__('output_bytes', total_file_bytes(written_file_names))
+
+        # recording this compile in the cache manifest
+        if self.__compile_cache is not None:
+            with self.__stage__('cache store'):
+                self.__compile_cache.store(source_plan['file_names'], compile_config, written_file_names,
+                                           {'data_file_name': output_data_file_name, 'append_state': append_state},
+                                           track_appends=append_state is not None)
+
+        return 1
+
+    # this function passes the stats report of the last compile to the stats hook
+    def __send_compile_report__(self):
+        if self.__stats_hook is None:
+            return
+        if isinstance(self.__stats_hook, Logger):
+            if self.__compile_report['status'] == "ok":
+                self.__stats_hook.info("compile report: %s", dumps(self.__compile_report))
+            else:
+                self.__stats_hook.error("compile report: %s", dumps(self.__compile_report))
+        else:
+            self.__stats_hook(self.__compile_report)
+
+    # this function does the compiling for compile(), timing every stage in the compile stats
+    def __compile__(self, html_file_name):
         # assigns new html file name if one is specified
         if html_file_name is not None:
             self.setHTMLFileName(html_file_name)
@@ -803,38 +2214,195 @@ class PyParasol:
         # if there is no data that has been added yet, exits program
         if len(self.__parasol_plot_list) == 0:
             print("no data files have been specified, will not compile")
+            self.__compile_stats.error("no data files have been specified")
             return 0
-        # checking to see if all files are the same
-        # also compiles list of all file names
-        all_files_are_same = True
-        file_name_list = []
-        temp_file_name = self.__parasol_plot_list[0].file_name
-        for plot_number in range(len(self.__parasol_plot_list)):
-            file_name_list.append(self.__parasol_plot_list[plot_number].file_name)
-            if self.__parasol_plot_list[plot_number].file_name != temp_file_name:
-                all_files_are_same = False
-
-        # setting up combined csv data file
-        # if all files are the same (or there is only one file), uses data file as output data
-        if all_files_are_same:
-            output_data_file_name = self.__parasol_plot_list[0].file_name
-            header_list = []
-            for plot_number in range(len(self.__parasol_plot_list)):
-                header_list.append([])
-        # if there are numerous data files, combines them
-        else:
-            output_data_file_name = "output_data.csv"
-            header_list = combine_csv(file_name_list, output_data_file_name)
-
-        # writing the html file
-        self.__final_data_file_name = output_data_file_name
-        html_file = self.__write_parasol_html_file__(header_list, output_data_file_name)
-
-        # writing the html file contents to the actual html file
+        # if no html file name is specified, sets to default
         if self.__html_file_name is None:
-            # if no html file name is specified, sets to default
             self.__html_file_name = "parasol.html"
-        with open(self.__html_file_name, 'w') as html_output:
-            html_output.write(html_file)
 
-        return 1
+        # building the plan of unique data files so every file is only read and written once
+        with self.__stage__('source plan'):
+            source_plan = self.__build_source_plan__()
+            key_columns = self.__find_key_columns__(source_plan)
+        if key_columns == 0:
+            self.__compile_stats.error("key columns not valid")
+            return 0
+        self.__count__('input_bytes', total_file_bytes(source_plan['file_names']))
+
+        # data given in memory is combined and encoded in memory, it isn't written through a csv file
+        self.__memory_data = any(plot is not None for plot in source_plan['memory_plots'])
+        if self.__memory_data:
+            return self.__compile_memory_data__(source_plan, key_columns)
+
+        # if nothing changed since the last compile, reuses its output files
+        compile_config = None
+        appendable = False
+        if self.__compile_cache is not None:
+            with self.__stage__('cache lookup'):
+                if self.__cache_manifest_file_name is None:
+                    self.__compile_cache.manifest_file_name = self.__html_file_name + '.cache.json'
+                compile_config = self.__get_compile_config__()
+                appendable = self.__append_compile_supported__(key_columns)
+                manifest = self.__compile_cache.lookup(source_plan['file_names'], compile_config, appendable)
+            # a sampled page posting its selection needs the rows that were sampled out, which aren't kept in files
+            if manifest is not None and self.__compile_cache.last_status == 'hit' and \
+                    not (self.__post_selection and self.__max_rows is not None and self.__unsampled_data is None):
+                self.__final_data_file_name = manifest['extra']['data_file_name']
+                return 1
+
+        # reading the headers of every data file and working out which of their columns are used
+        with self.__stage__('header scan'):
+            if self.__parsed_data_cache is not None:
+                source_plan['header_lists'] = [list(self.__parsed_data_cache.get(file_name).columns)
+                                               for file_name in source_plan['file_names']]
+            else:
+                source_plan['header_lists'] = get_header_list(source_plan['file_names'])
+            column_lists = self.__find_needed_columns__(source_plan)
+        if key_columns is not None and not self.__validate_key_columns__(source_plan, key_columns):
+            self.__compile_stats.error("key column missing from a data file")
+            return 0
+        if not self.__validate_objectives__(source_plan):
+            self.__compile_stats.error("objective missing from a data file")
+            return 0
+
+        # if rows were only appended to the data files since the last compile, only the new rows are compiled
+        if self.__compile_cache is not None and self.__compile_cache.last_status == 'append':
+            with self.__stage__('append rows'):
+                appended = self.__append_compile__(source_plan, column_lists, manifest)
+            if appended is not None:
+                output_data_file_name, data_artifact_file_names, append_state = appended
+                return self.__finish_compile__(source_plan, output_data_file_name, data_artifact_file_names,
+                                               compile_config, append_state)
+
+        # setting up combined csv data file
+        # data artifact file names keeps track of the intermediate data files written on the way
+        data_artifact_file_names = []
+        # the combined data, if it was combined from the parsed data cache instead of the data files
+        combined_frame = None
+        # number of rows every data file had when its rows were merged by position
+        file_rows = None
+        # if all plots use the same file (or there is only one plot) and every column is used, uses data file as
+        #   output data
+        if len(source_plan['file_names']) == 1 and column_lists[0] is None:
+            output_data_file_name = source_plan['file_names'][0]
+            if self.__parsed_data_cache is not None:
+                # a shallow copy, so columns added by the data stages aren't added to the cached data
+                combined_frame = self.__parsed_data_cache.get(output_data_file_name).copy(deep=False)
+        # if there are numerous data files or unused columns, combines them
+        elif self.__parsed_data_cache is not None:
+            output_data_file_name = self.__data_file_name__("output_data.csv")
+            with self.__stage__('combine'):
+                combined_frame, combine_stats = self.__combine_parsed_sources__(source_plan, column_lists,
+                                                                                key_columns)
+                write_data_csv(combined_frame, output_data_file_name)
+            self.__count__('rows', combine_stats['rows'])
+            self.__warn_about_row_alignment__(source_plan, combine_stats)
+        else:
+            output_data_file_name = self.__data_file_name__("output_data.csv")
+            combine_stats = {}
+            with self.__stage__('combine'):
+                source_plan['header_lists'] = combine_csv(source_plan['file_names'], output_data_file_name,
+                                                          column_lists=column_lists, stats=combine_stats,
+                                                          key_columns=key_columns, join_type=self.__join_type,
+                                                          max_memory_bytes=self.__join_memory_bytes,
+                                                          parse_workers=self.__parse_workers,
+                                                          parse_pool=self.__parse_pool)
+            self.__count__('rows', combine_stats['rows'])
+            self.__warn_about_row_alignment__(source_plan, combine_stats)
+            file_rows = combine_stats.get('file_rows')
+        combined_data_file_name = output_data_file_name
+
+        # running the data stages, the data is only loaded into memory if a stage that needs it is turned on
+        data_frame = None
+        self.__sampling_report = None
+        self.__unsampled_data = None
+        self.__stage_models = {}
+        if self.__data_stages_needed__():
+            with self.__stage__('data stages'):
+                with self.__stage__('read data'):
+                    data_frame = combined_frame if combined_frame is not None else \
+                        read_data_csv(output_data_file_name)
+                if 'rows' not in self.__compile_stats.counts:
+                    self.__count__('rows', data_frame.shape[0])
+                data_frame = self.__run_data_stages__(data_frame, source_plan, output_data_file_name)
+            self.__count__('rows_shown', data_frame.shape[0])
+        # weighted sums only need one row at a time, so without other stages the data is streamed in chunks
+        elif self.__precomputed_weighted_sums:
+            if output_data_file_name not in source_plan['file_names']:
+                data_artifact_file_names.append(output_data_file_name)
+            with self.__stage__('weighted sums'):
+                self.__stage_models['sum_ranges'] = []
+                append_weighted_sums(output_data_file_name, self.__data_file_name__("output_data_view.csv"),
+                                     self.__get_weighted_sums__(source_plan),
+                                     sum_ranges=self.__stage_models['sum_ranges'])
+            output_data_file_name = self.__data_file_name__("output_data_view.csv")
+
+        # embedding the data in a self contained html file
+        self.__embedded_data_payload = None
+        if self.__self_contained:
+            with self.__stage__('embed data'):
+                if data_frame is None:
+                    data_frame = combined_frame if combined_frame is not None else \
+                        read_data_csv(output_data_file_name)
+                self.__embedded_data_payload = encode_embedded_payload(data_frame, self.__float_precision)
+            if output_data_file_name not in source_plan['file_names']:
+                data_artifact_file_names.append(output_data_file_name)
+            output_data_file_name = self.__html_file_name
+
+        # writing the data that is drawn if a stage changed it, the full data file is kept for export
+        elif data_frame is not None and self.__data_format == "csv":
+            if output_data_file_name not in source_plan['file_names']:
+                data_artifact_file_names.append(output_data_file_name)
+            output_data_file_name = self.__data_file_name__("output_data_view.csv")
+            with self.__stage__('write data view'):
+                write_data_csv(data_frame, output_data_file_name)
+
+        # converting the data to the columnar binary format
+        elif self.__data_format == "binary":
+            binary_data_file_name = self.__data_file_name__("output_data.bin")
+            with self.__stage__('write columnar data'):
+                if data_frame is not None:
+                    write_columnar_data(data_frame, binary_data_file_name, self.__float_precision)
+                elif combined_frame is not None:
+                    write_columnar_data(combined_frame, binary_data_file_name, self.__float_precision)
+                else:
+                    write_columnar_file(output_data_file_name, binary_data_file_name, self.__float_precision)
+            if output_data_file_name not in source_plan['file_names']:
+                data_artifact_file_names.append(output_data_file_name)
+            output_data_file_name = binary_data_file_name
+
+        # recording what rows appended to the data files can be compiled onto, positionally merged files need the
+        #   same number of rows or the rows of the shorter ones were padded
+        append_state = None
+        if appendable and (file_rows is None or len(set(file_rows)) <= 1):
+            append_state = {'combined_data_file_name': combined_data_file_name
+                            if combined_data_file_name not in source_plan['file_names'] else None,
+                            'file_rows': file_rows, 'rows': self.__compile_stats.counts.get('rows'),
+                            'stage_models': self.__stage_models}
+
+        return self.__finish_compile__(source_plan, output_data_file_name, data_artifact_file_names, compile_config,
+                                       append_state)
+
+# parasol applications of the batch compiled by this process, set when a batch worker starts
+_batch_parasol_list = []
+
+
+# this function starts a batch worker with the parasol applications of the batch
+# forked workers get the list, and the parsed data cache in it, without it being copied
+# workers that are spawned get a pickled copy of it, with new locks in the parsed data cache and selection store
+def _start_batch_worker(parasol_list):
+    global _batch_parasol_list
+    _batch_parasol_list = parasol_list
+
+
+# this function compiles one parasol application of the batch
+# an exception doesn't stop the rest of the batch, the application's compile report has status "error"
+def _compile_batch_parasol(parasol_number):
+    parasol = _batch_parasol_list[parasol_number]
+    try:
+        compile_result = parasol.compile()
+    except Exception:
+        print_exc()
+        compile_result = 0
+    return {'result': compile_result, 'report': parasol.getCompileReport(),
+            'data_file_name': parasol.__get_final_data_file_name__()}
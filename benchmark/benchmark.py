@@ -0,0 +1,498 @@
+# PyParasol benchmark suite
+# generates synthetic datasets, measures wall time, peak memory and output bytes of every compile stage and of
+#   serving the compiled files, saves the results as json and compares two result files for regressions
+# run "python benchmark.py --help" for the commands
+
+from argparse import ArgumentParser
+from datetime import datetime
+from gzip import decompress
+from http.client import HTTPConnection
+from json import dump
+from json import dumps
+from json import load
+from json import loads
+from os import link
+from os import listdir
+from os import makedirs
+from os.path import abspath
+from os.path import dirname
+from os.path import exists
+from os.path import getsize
+from os.path import join
+from platform import platform
+from platform import python_version
+from shutil import copyfile
+from shutil import rmtree
+from subprocess import run
+from threading import Thread
+from time import perf_counter
+import resource
+import sys
+
+# the repository root, where the PyParasol modules are
+REPOSITORY_DIRECTORY = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, REPOSITORY_DIRECTORY)
+
+# version of the results file layout
+RESULTS_VERSION = 1
+# rows generated and written to a data file at a time
+GENERATE_CHUNK_ROWS = 100000
+# every this many columns, one column holds text categories instead of numbers
+CATEGORY_COLUMN_EVERY = 10
+# the words used in text columns
+CATEGORY_WORDS = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta']
+# the asset files copied next to a compiled application so it can be served
+ASSET_FILE_NAMES = ['parasol.css', 'd3.v5.min.js', 'parasol.standalone.js']
+
+# the dataset sizes of every scale, scenarios with more cells (rows times columns) than max cells are left out
+SCALES = {
+    'small': {'rows': [1000, 10000], 'columns': [5, 50], 'plots': [1, 10], 'max_cells': 10 ** 6},
+    'medium': {'rows': [1000, 100000, 1000000], 'columns': [5, 50, 500], 'plots': [1, 10, 50],
+               'max_cells': 5 * 10 ** 7},
+    'full': {'rows': [1000, 10000, 100000, 1000000, 10000000], 'columns': [5, 50, 500], 'plots': [1, 10, 50],
+             'max_cells': 10 ** 9}
+}
+# every file layout, shared puts every column in one file, distinct gives every plot a file of its own
+LAYOUTS = ['shared', 'distinct']
+# the measured stages, in the order they are run
+STAGES = ['combine', 'compile_csv', 'compile_binary', 'compile_cached', 'serve']
+
+# a stage is a regression when it gets this much worse, relative to the baseline
+DEFAULT_THRESHOLD = 0.10
+# differences smaller than these are noise and are never regressions
+MINIMUM_SECONDS_CHANGE = 0.05
+MINIMUM_RSS_CHANGE = 8 << 20
+# the share of every column's values a brush of the range query benchmark holds
+RANGE_QUERY_SHARES = [0.001, 0.01, 0.1, 0.5]
+# the numbers of columns brushed at once in the range query benchmark
+RANGE_QUERY_AXES = [1, 3]
+
+
+# this function returns the scenarios of a scale as dictionaries of rows, columns, plots and layout
+def build_scenarios(scale_name):
+    scale = SCALES[scale_name]
+    scenarios = []
+    for rows in scale['rows']:
+        for columns in scale['columns']:
+            if rows * columns > scale['max_cells']:
+                continue
+            for plots in scale['plots']:
+                # every plot needs a column of its own
+                if plots > columns:
+                    continue
+                for layout in LAYOUTS:
+                    # with one plot, both layouts are the same
+                    if plots == 1 and layout == 'distinct':
+                        continue
+                    scenarios.append({'rows': rows, 'columns': columns, 'plots': plots, 'layout': layout})
+    return scenarios
+
+
+# this function returns the name of a scenario, used as its directory name and to match results between runs
+def scenario_name(scenario):
+    return 'rows' + str(scenario['rows']) + '_columns' + str(scenario['columns']) + '_plots' + \
+           str(scenario['plots']) + '_' + scenario['layout']
+
+
+# this function splits the columns of a scenario between its plots
+# returns a list of column name lists, one for every plot
+def split_columns(scenario):
+    column_names = ['c' + str(column_number) for column_number in range(scenario['columns'])]
+    plots = scenario['plots']
+    return [column_names[plot_number::plots] for plot_number in range(plots)]
+
+
+# this function writes a csv file of random data with the given columns, in chunks of rows
+# columns at multiples of the category column spacing hold words, the rest hold numbers
+def write_random_csv(file_name, column_names, rows, seed):
+    import numpy
+    random_generator = numpy.random.default_rng(seed)
+    category_words = numpy.array(CATEGORY_WORDS)
+    with open(file_name, 'w', newline='') as csv_file:
+        csv_file.write(','.join(column_names) + '\n')
+        rows_left = rows
+        while rows_left > 0:
+            chunk_rows = min(rows_left, GENERATE_CHUNK_ROWS)
+            chunk_columns = []
+            for column_name in column_names:
+                if int(column_name[1:]) % CATEGORY_COLUMN_EVERY == CATEGORY_COLUMN_EVERY - 1:
+                    chunk_columns.append(category_words[random_generator.integers(0, len(CATEGORY_WORDS),
+                                                                                  chunk_rows)])
+                else:
+                    chunk_columns.append(numpy.char.mod('%.6g', random_generator.normal(size=chunk_rows)))
+            lines = chunk_columns[0]
+            for column in chunk_columns[1:]:
+                lines = numpy.char.add(numpy.char.add(lines, ','), column)
+            csv_file.write('\n'.join(lines.tolist()) + '\n')
+            rows_left -= chunk_rows
+
+
+# this function writes the data files of a scenario into its directory, unless they are already there
+# returns the list of data file names, one for every plot
+def generate_scenario_data(scenario, scenario_directory):
+    makedirs(scenario_directory, exist_ok=True)
+    plot_columns = split_columns(scenario)
+    if scenario['layout'] == 'shared':
+        file_names = ['data.csv'] * scenario['plots']
+        file_columns = {'data.csv': ['c' + str(column_number) for column_number in range(scenario['columns'])]}
+    else:
+        file_names = ['data_' + str(plot_number) + '.csv' for plot_number in range(scenario['plots'])]
+        file_columns = dict(zip(file_names, plot_columns))
+    for file_number, (file_name, column_names) in enumerate(file_columns.items()):
+        if not exists(join(scenario_directory, file_name)):
+            write_random_csv(join(scenario_directory, file_name), column_names, scenario['rows'], file_number)
+    return file_names
+
+
+# this function empties the directory a stage runs in and puts the data and asset files into it
+# data files are hard linked where the file system allows it, so they aren't copied every run
+# the files a stage makes are the only other files in its directory
+def prepare_stage_directory(stage_directory, scenario_directory, file_names):
+    if exists(stage_directory):
+        rmtree(stage_directory)
+    makedirs(stage_directory)
+    for file_name in set(file_names):
+        try:
+            link(join(scenario_directory, file_name), join(stage_directory, file_name))
+        except OSError:
+            copyfile(join(scenario_directory, file_name), join(stage_directory, file_name))
+    for asset_file_name in ASSET_FILE_NAMES:
+        copyfile(join(REPOSITORY_DIRECTORY, asset_file_name), join(stage_directory, asset_file_name))
+
+
+# this function returns the peak resident memory of this process in bytes
+# on linux the high water mark of the process's own memory is used, since the peak from getrusage can carry over
+#   the peak of the process that started it
+def peak_rss_bytes():
+    if exists('/proc/self/status'):
+        with open('/proc/self/status', 'r') as status_file:
+            for status_line in status_file:
+                if status_line.startswith('VmHWM:'):
+                    return int(status_line.split()[1]) * 1024
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos reports bytes
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+
+
+# this function returns the total size of the files made by a stage, the files there before it are left out
+def new_file_bytes(files_before):
+    return sum(getsize(file_name) for file_name in listdir('.') if file_name not in files_before)
+
+
+# this function makes the PyParasol application of a scenario
+def build_parasol(scenario, file_names):
+    from PyParasol import PyParasol
+    parasol = PyParasol(page_title=scenario_name(scenario))
+    for plot_number, (file_name, column_names) in enumerate(zip(file_names, split_columns(scenario))):
+        parasol.addPlot(file_name, plot_id='p' + str(plot_number), axes_layout=column_names)
+    return parasol
+
+
+# this function runs one stage of a scenario in the current directory and returns its measurements
+# it is run in a process of its own, so the peak memory is the peak of that stage alone
+def run_stage(stage, scenario, file_names):
+    files_before = set(listdir('.'))
+    # the memory of the interpreter and the imported modules is measured before the stage starts
+    from combine_csv import combine_csv
+    import PyParasol
+    baseline_rss = peak_rss_bytes()
+    measurement = {}
+
+    if stage == 'combine':
+        unique_file_names = list(dict.fromkeys(file_names))
+        start_time = perf_counter()
+        combine_csv(unique_file_names, 'combined.csv')
+        measurement['wall_seconds'] = perf_counter() - start_time
+    elif stage in ['compile_csv', 'compile_binary', 'compile_cached']:
+        parasol = build_parasol(scenario, file_names)
+        parasol.setHTMLFileName(stage + '.html')
+        if stage == 'compile_binary':
+            parasol.setDataFormat('binary')
+        if stage == 'compile_cached':
+            # the first compile fills the cache, only the second one is measured
+            parasol.setCacheStatus(True)
+            parasol.compile()
+            files_before = set(listdir('.'))
+        start_time = perf_counter()
+        compile_result = parasol.compile()
+        measurement['wall_seconds'] = perf_counter() - start_time
+        if compile_result == 0:
+            raise RuntimeError('compiling failed')
+        if stage == 'compile_cached':
+            measurement['cache_status'] = parasol.getCacheReport()['last_status']
+    elif stage == 'serve':
+        measurement.update(measure_serving(scenario, file_names))
+
+    if 'output_bytes' not in measurement:
+        measurement['output_bytes'] = new_file_bytes(files_before)
+    measurement['peak_rss_bytes'] = peak_rss_bytes()
+    measurement['baseline_rss_bytes'] = baseline_rss
+    return measurement
+
+
+# this function compiles a scenario, serves it with the threaded server and measures fetching every file the page
+#   loads, gzip compressed, uncompressed and revalidated with the entity tag
+def measure_serving(scenario, file_names):
+    from parasol_server import make_server
+    parasol = build_parasol(scenario, file_names)
+    parasol.setHTMLFileName('serve.html')
+    parasol.compile()
+    served_file_names = ['serve.html', parasol._PyParasol__final_data_file_name] + ASSET_FILE_NAMES
+    server = make_server(0)
+    server_thread = Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    connection = HTTPConnection('localhost', server.server_address[1])
+    measurement = {'gzip_seconds': 0.0, 'gzip_bytes': 0, 'plain_seconds': 0.0, 'plain_bytes': 0,
+                   'revalidate_seconds': 0.0}
+    try:
+        for served_file_name in served_file_names:
+            start_time = perf_counter()
+            connection.request('GET', '/' + served_file_name, headers={'Accept-Encoding': 'gzip'})
+            response = connection.getresponse()
+            body = response.read()
+            if response.getheader('Content-Encoding') == 'gzip':
+                decompress(body)
+            measurement['gzip_seconds'] += perf_counter() - start_time
+            measurement['gzip_bytes'] += len(body)
+            entity_tag = response.getheader('ETag')
+
+            start_time = perf_counter()
+            connection.request('GET', '/' + served_file_name)
+            body = connection.getresponse().read()
+            measurement['plain_seconds'] += perf_counter() - start_time
+            measurement['plain_bytes'] += len(body)
+
+            start_time = perf_counter()
+            connection.request('GET', '/' + served_file_name,
+                               headers={'Accept-Encoding': 'gzip', 'If-None-Match': entity_tag})
+            connection.getresponse().read()
+            measurement['revalidate_seconds'] += perf_counter() - start_time
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+    # the first fetch is what a browser opening the page pays
+    measurement['wall_seconds'] = measurement['gzip_seconds']
+    measurement['output_bytes'] = measurement['gzip_bytes']
+    return measurement
+
+
+# this function runs every stage of every scenario of a scale, each in a process of its own
+# returns the results dictionary
+def run_benchmarks(scale_name, work_directory, stages, repeat, scenario_filter=None):
+    results = {'version': RESULTS_VERSION, 'created': datetime.now().isoformat(timespec='seconds'),
+               'python': python_version(), 'platform': platform(), 'scale': scale_name, 'repeat': repeat,
+               'results': []}
+    for scenario in build_scenarios(scale_name):
+        name = scenario_name(scenario)
+        if scenario_filter is not None and scenario_filter not in name:
+            continue
+        scenario_directory = join(work_directory, name)
+        print('generating ' + name, flush=True)
+        file_names = generate_scenario_data(scenario, scenario_directory)
+        for stage in stages:
+            stage_directory = join(scenario_directory, 'stage_' + stage)
+            measurements = []
+            for repeat_number in range(repeat):
+                prepare_stage_directory(stage_directory, scenario_directory, file_names)
+                stage_process = run([sys.executable, abspath(__file__), 'stage', stage, dumps(scenario),
+                                     dumps(file_names)], cwd=stage_directory, capture_output=True, text=True)
+                if stage_process.returncode != 0:
+                    measurements = None
+                    print('  ' + stage + ' failed: ' + stage_process.stderr.strip().split('\n')[-1], flush=True)
+                    break
+                measurements.append(loads(stage_process.stdout.strip().split('\n')[-1]))
+            if measurements is None:
+                results['results'].append({'name': name, 'scenario': scenario, 'stage': stage, 'failed': True})
+                continue
+            # the fastest run is the least disturbed one, memory and bytes are kept at their highest
+            result = dict(min(measurements, key=lambda measurement: measurement['wall_seconds']))
+            result['peak_rss_bytes'] = max(measurement['peak_rss_bytes'] for measurement in measurements)
+            result.update({'name': name, 'scenario': scenario, 'stage': stage})
+            results['results'].append(result)
+            print('  ' + stage + ': ' + format(result['wall_seconds'], '.3f') + ' s, ' +
+                  format(result['peak_rss_bytes'] / (1 << 20), '.1f') + ' MB peak, ' +
+                  str(result['output_bytes']) + ' bytes', flush=True)
+    return results
+
+
+# this function compares two results dictionaries and returns a list of regressions and a list of comparison rows
+# wall time and peak memory regress when they grow by more than the threshold and the noise floor, output bytes
+#   regress when they grow by more than the threshold. stages that fail now but didn't before are regressions too.
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    baseline_results = {(result['name'], result['stage']): result for result in baseline['results']}
+    regressions = []
+    rows = []
+    for result in current['results']:
+        key = (result['name'], result['stage'])
+        if key not in baseline_results:
+            continue
+        baseline_result = baseline_results[key]
+        if result.get('failed'):
+            if not baseline_result.get('failed'):
+                regressions.append({'name': key[0], 'stage': key[1], 'metric': 'failed'})
+            continue
+        if baseline_result.get('failed'):
+            continue
+        for metric, minimum_change in [('wall_seconds', MINIMUM_SECONDS_CHANGE),
+                                       ('peak_rss_bytes', MINIMUM_RSS_CHANGE), ('output_bytes', 0)]:
+            old_value = baseline_result[metric]
+            new_value = result[metric]
+            ratio = new_value / old_value if old_value else float('inf') if new_value else 1.0
+            row = {'name': key[0], 'stage': key[1], 'metric': metric, 'baseline': old_value, 'current': new_value,
+                   'ratio': ratio}
+            rows.append(row)
+            if ratio > 1 + threshold and new_value - old_value > minimum_change:
+                regressions.append(row)
+    return regressions, rows
+
+
+# this function prints a comparison, the regressions are marked
+def print_comparison(regressions, rows, show_all):
+    regression_keys = set((row['name'], row['stage'], row['metric']) for row in regressions)
+    for row in rows:
+        is_regression = (row['name'], row['stage'], row['metric']) in regression_keys
+        if not show_all and not is_regression:
+            continue
+        print(('REGRESSION ' if is_regression else '           ') + row['name'] + ' ' + row['stage'] + ' ' +
+              row['metric'] + ': ' + format(row['baseline'], '.4g') + ' -> ' + format(row['current'], '.4g') +
+              ' (' + format(row['ratio'], '.2f') + 'x)')
+    for regression in regressions:
+        if regression['metric'] == 'failed':
+            print('REGRESSION ' + regression['name'] + ' ' + regression['stage'] + ': now fails')
+    print(str(len(regressions)) + ' regressions in ' + str(len(rows)) + ' compared measurements')
+
+
+# this function measures range queries of a range_index.RangeIndex against a numpy scan of every row
+# brushes hold a share of the values of every column they brush, the results of both are checked to be the same.
+#   appending is measured as a tenth of the rows added in ten parts, against building the index again.
+# returns the results dictionary
+def run_range_query_benchmark(rows, columns, queries, seed):
+    import numpy
+    from range_index import RangeIndex
+    random_generator = numpy.random.default_rng(seed)
+    values = [random_generator.random(rows) for _ in range(columns)]
+    results = {'version': RESULTS_VERSION, 'created': datetime.now().isoformat(timespec='seconds'),
+               'python': python_version(), 'platform': platform(), 'rows': rows, 'columns': columns,
+               'queries': queries, 'results': []}
+
+    start_time = perf_counter()
+    range_index = RangeIndex(rows)
+    for column_number in range(columns):
+        range_index.add_column(column_number, values[column_number])
+    results['build_seconds'] = perf_counter() - start_time
+    print('built the index of ' + str(rows) + ' rows and ' + str(columns) + ' columns in ' +
+          format(results['build_seconds'], '.3f') + ' s', flush=True)
+
+    for share in RANGE_QUERY_SHARES:
+        for axes in RANGE_QUERY_AXES:
+            if axes > columns:
+                continue
+            query_list = []
+            for _ in range(queries):
+                low = random_generator.random() * (1 - share)
+                brushed_columns = random_generator.choice(columns, axes, replace=False)
+                query_list.append({int(column_number): [low, low + share] for column_number in brushed_columns})
+            start_time = perf_counter()
+            index_results = [range_index.query(ranges) for ranges in query_list]
+            index_seconds = perf_counter() - start_time
+            start_time = perf_counter()
+            scan_results = []
+            for ranges in query_list:
+                mask = numpy.ones(rows, dtype=bool)
+                for column_number, (low, high) in ranges.items():
+                    mask &= (values[column_number] >= low) & (values[column_number] <= high)
+                scan_results.append(numpy.flatnonzero(mask))
+            scan_seconds = perf_counter() - start_time
+            if any(not numpy.array_equal(index_rows, scan_rows)
+                   for index_rows, scan_rows in zip(index_results, scan_results)):
+                raise RuntimeError('the index and the scan found different rows')
+            result = {'share': share, 'axes': axes, 'index_seconds': index_seconds / queries,
+                      'scan_seconds': scan_seconds / queries,
+                      'rows_found': sum(len(found) for found in index_results) / queries}
+            results['results'].append(result)
+            print('  share ' + str(share) + ', ' + str(axes) + ' axes: index ' +
+                  format(1000 * result['index_seconds'], '.3f') + ' ms, scan ' +
+                  format(1000 * result['scan_seconds'], '.3f') + ' ms, ' +
+                  format(result['scan_seconds'] / max(result['index_seconds'], 1e-9), '.1f') + 'x', flush=True)
+
+    appended_values = [random_generator.random(rows // 10) for _ in range(columns)]
+    start_time = perf_counter()
+    for part in numpy.array_split(numpy.arange(rows // 10), 10):
+        range_index.append({column_number: appended_values[column_number][part]
+                            for column_number in range(columns)})
+    results['append_seconds'] = perf_counter() - start_time
+    start_time = perf_counter()
+    rebuilt_index = RangeIndex(rows + rows // 10)
+    for column_number in range(columns):
+        rebuilt_index.add_column(column_number, numpy.concatenate([values[column_number],
+                                                                   appended_values[column_number]]))
+    results['rebuild_seconds'] = perf_counter() - start_time
+    print('appended ' + str(rows // 10) + ' rows in ten parts in ' + format(results['append_seconds'], '.3f') +
+          ' s, building the index again takes ' + format(results['rebuild_seconds'], '.3f') + ' s', flush=True)
+    return results
+
+
+# this function reads the command line and runs the command
+def main():
+    parser = ArgumentParser(description='PyParasol benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and save the results')
+    run_parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    run_parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    run_parser.add_argument('--repeat', type=int, default=3, help='runs of every stage, the fastest is kept')
+    run_parser.add_argument('--filter', default=None, help='only run scenarios with this text in their name')
+    run_parser.add_argument('--work-directory', default='benchmark_data',
+                            help='where the generated data is kept between runs')
+    run_parser.add_argument('--output', default='benchmark_results.json')
+
+    compare_parser = commands.add_parser('compare', help='compare two results files and flag regressions')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='relative growth that counts as a regression')
+    compare_parser.add_argument('--all', action='store_true', help='print every measurement, not only regressions')
+
+    range_parser = commands.add_parser('range-query', help='compare range index queries with a numpy scan')
+    range_parser.add_argument('--rows', type=int, default=1000000)
+    range_parser.add_argument('--columns', type=int, default=5)
+    range_parser.add_argument('--queries', type=int, default=20, help='queries of every brush share and axes')
+    range_parser.add_argument('--seed', type=int, default=0)
+    range_parser.add_argument('--output', default=None, help='save the results as json')
+
+    stage_parser = commands.add_parser('stage', help='run one stage in the current directory (used by run)')
+    stage_parser.add_argument('stage', choices=STAGES)
+    stage_parser.add_argument('scenario')
+    stage_parser.add_argument('file_names')
+
+    arguments = parser.parse_args()
+    if arguments.command == 'run':
+        results = run_benchmarks(arguments.scale, abspath(arguments.work_directory), arguments.stages,
+                                 max(arguments.repeat, 1), arguments.filter)
+        with open(arguments.output, 'w') as output_file:
+            dump(results, output_file, indent=1)
+        print('results saved to ' + arguments.output)
+    elif arguments.command == 'range-query':
+        results = run_range_query_benchmark(arguments.rows, arguments.columns, max(arguments.queries, 1),
+                                            arguments.seed)
+        if arguments.output is not None:
+            with open(arguments.output, 'w') as output_file:
+                dump(results, output_file, indent=1)
+            print('results saved to ' + arguments.output)
+    elif arguments.command == 'compare':
+        with open(arguments.baseline, 'r') as baseline_file:
+            baseline = load(baseline_file)
+        with open(arguments.current, 'r') as current_file:
+            current = load(current_file)
+        regressions, rows = compare_results(baseline, current, arguments.threshold)
+        print_comparison(regressions, rows, arguments.all)
+        sys.exit(1 if regressions else 0)
+    else:
+        print(dumps(run_stage(arguments.stage, loads(arguments.scenario), loads(arguments.file_names))))
+
+
+if __name__ == '__main__':
+    main()
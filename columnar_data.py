@@ -0,0 +1,249 @@
+from base64 import b64encode
+from gzip import compress
+from hashlib import sha256
+from json import dumps
+from json import loads
+from struct import pack
+from struct import unpack_from
+
+from numpy import dtype
+from numpy import float64
+from numpy import frombuffer
+from numpy import isnan
+from numpy import ndarray
+from pandas import Categorical
+from pandas import DataFrame
+from pandas import read_csv
+from pandas import to_numeric
+from pandas.api.types import is_bool_dtype
+from pandas.api.types import is_numeric_dtype
+from pandas.util import hash_pandas_object
+
+from combine_csv import get_header_list
+
+# the first four bytes of every columnar data file
+COLUMNAR_MAGIC = b'PPC1'
+# column blocks start on multiples of this many bytes so the browser can view them as typed arrays
+BLOCK_ALIGNMENT = 8
+
+# javascript that decodes a columnar data file (an ArrayBuffer) into the list of row objects Parasol expects
+# numeric cells are numbers, empty numeric cells are empty strings, the same as d3.csv would give
+COLUMNAR_DECODER_SCRIPT = """
+function parasolDecodeColumnar(buffer) {
+  var view = new DataView(buffer);
+  var magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+  if (magic !== 'PPC1') { throw 'Error: data file is not a PyParasol columnar file.'; }
+  var schemaLength = view.getUint32(4, true);
+  var schema = JSON.parse(new TextDecoder('utf-8').decode(new Uint8Array(buffer, 8, schemaLength)));
+  var littleEndian = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+  var arrayTypes = {float32: Float32Array, float64: Float64Array, uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array};
+  var getters = {float32: 'getFloat32', float64: 'getFloat64', uint8: 'getUint8', uint16: 'getUint16', uint32: 'getUint32'};
+  var columns = schema.columns.map(function(column) {
+    var ArrayType = arrayTypes[column.type];
+    var values;
+    if (littleEndian) {
+      values = new ArrayType(buffer, schema.data_offset + column.offset, schema.rows);
+    } else {
+      values = new ArrayType(schema.rows);
+      for (var i = 0; i < schema.rows; i++) {
+        values[i] = view[getters[column.type]](schema.data_offset + column.offset + i * ArrayType.BYTES_PER_ELEMENT, true);
+      }
+    }
+    return {name: column.name, values: values, categories: column.categories};
+  });
+  var data = new Array(schema.rows);
+  for (var row = 0; row < schema.rows; row++) {
+    var d = {};
+    for (var c = 0; c < columns.length; c++) {
+      var value = columns[c].values[row];
+      if (columns[c].categories) {
+        d[columns[c].name] = columns[c].categories[value];
+      } else {
+        d[columns[c].name] = isNaN(value) ? '' : value;
+      }
+    }
+    data[row] = d;
+  }
+  return data;
+}
+"""
+
+# javascript that turns the base64 text of a gzip compressed columnar data file embedded in a page back into
+#   an ArrayBuffer, using the browser's DecompressionStream
+EMBEDDED_DECODER_SCRIPT = """
+function parasolDecodeEmbedded(payload) {
+  var text = atob(payload);
+  var bytes = new Uint8Array(text.length);
+  for (var i = 0; i < text.length; i++) {
+    bytes[i] = text.charCodeAt(i);
+  }
+  var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+  return new Response(stream).arrayBuffer();
+}
+"""
+
+
+# this function reads a csv file written by combine_csv (or any csv with a header row) into a DataFrame of strings
+# column names are kept as they are in the file, even when two files had the same column name
+def read_data_csv(csv_file_name):
+    column_names = get_header_list([csv_file_name])[0]
+    data_frame = read_csv(csv_file_name, header=None, skiprows=1, dtype=str, keep_default_na=False,
+                          names=list(range(len(column_names))))
+    data_frame.columns = column_names
+    return data_frame
+
+
+# this function writes a DataFrame read with read_data_csv back to a csv data file
+def write_data_csv(data_frame, csv_file_name):
+    data_frame.to_csv(csv_file_name, index=False, lineterminator='\n')
+
+
+# this function turns data passed to addPlot into a DataFrame with string column names
+# accepts a DataFrame, a numpy structured array or a dictionary of arrays (or lists), returns None for anything else
+# a DataFrame is used as it is, without copying its data
+def to_data_frame(data):
+    if isinstance(data, DataFrame):
+        data_frame = data
+    elif isinstance(data, ndarray) and data.dtype.names is not None:
+        data_frame = DataFrame(data)
+    elif isinstance(data, dict):
+        try:
+            data_frame = DataFrame(data)
+        except ValueError:
+            return None
+    else:
+        return None
+    if any(type(column_name) is not str for column_name in data_frame.columns):
+        data_frame = data_frame.set_axis([str(column_name) for column_name in data_frame.columns], axis=1)
+    return data_frame
+
+
+# this function returns a fingerprint of the cells, column names and column types of a DataFrame
+# it changes when the DataFrame is changed in place, so data encoded from it can be kept until then
+# cells that can't be hashed, like lists, are hashed as text
+def data_fingerprint(data_frame):
+    try:
+        row_hashes = hash_pandas_object(data_frame, index=False)
+    except TypeError:
+        row_hashes = hash_pandas_object(data_frame.astype(str), index=False)
+    data_hash = sha256(row_hashes.to_numpy().tobytes())
+    data_hash.update(dumps([[str(column_name), str(column_type)] for column_name, column_type in
+                            data_frame.dtypes.items()]).encode('utf-8'))
+    return data_hash.hexdigest()
+
+
+# this function returns the smallest little-endian unsigned integer type that can hold every category code
+def get_code_type(number_of_categories):
+    if number_of_categories <= 0xff:
+        return '<u1', 'uint8'
+    if number_of_categories <= 0xffff:
+        return '<u2', 'uint16'
+    return '<u4', 'uint32'
+
+
+# this function encodes one column as a block of bytes
+# numeric columns become little-endian float blocks, anything else becomes a dictionary of categories
+#   and a block of category codes
+# columns that already hold numbers are encoded straight from their values, without going through text
+# returns the block bytes and the schema entry for the column
+def encode_column(column_name, column_values, float_precision=64):
+    if is_numeric_dtype(column_values) and not is_bool_dtype(column_values):
+        numeric_values = column_values.to_numpy(dtype=float64, na_value=float('nan'))
+        if float_precision == 32:
+            return numeric_values.astype('<f4').tobytes(), {'name': column_name, 'type': 'float32'}
+        return numeric_values.astype('<f8').tobytes(), {'name': column_name, 'type': 'float64'}
+    column_values = column_values.fillna('').astype(str)
+    is_empty = (column_values == '').to_numpy()
+    numeric_values = to_numeric(column_values.mask(is_empty), errors='coerce').to_numpy(dtype=float64)
+    # a column is numeric when every cell that isn't empty is a number
+    if not (isnan(numeric_values) & ~is_empty).any():
+        if float_precision == 32:
+            return numeric_values.astype('<f4').tobytes(), {'name': column_name, 'type': 'float32'}
+        return numeric_values.astype('<f8').tobytes(), {'name': column_name, 'type': 'float64'}
+    codes, categories = column_values.factorize()
+    code_type, code_type_name = get_code_type(len(categories))
+    schema_column = {'name': column_name, 'type': code_type_name, 'categories': [str(c) for c in categories]}
+    return codes.astype(code_type).tobytes(), schema_column
+
+
+# this function encodes every column of a DataFrame as a block of bytes
+# returns a list of (block bytes, schema entry) for the columns, in order
+def encode_column_blocks(data_frame, float_precision=64):
+    return [encode_column(str(data_frame.columns[column_number]), data_frame.iloc[:, column_number], float_precision)
+            for column_number in range(data_frame.shape[1])]
+
+
+# this function encodes a DataFrame into the columnar data format
+# the format is the magic bytes, a little-endian uint32 schema length, the json schema, and then
+#   one block per column, every block starting on an 8 byte boundary
+def encode_columnar(data_frame, float_precision=64):
+    return assemble_columnar(int(data_frame.shape[0]), encode_column_blocks(data_frame, float_precision))
+
+
+# this function puts encoded column blocks with the same number of rows together into the columnar data format
+def assemble_columnar(number_of_rows, column_blocks):
+    padded_blocks = []
+    schema_columns = []
+    offset = 0
+    for block, schema_column in column_blocks:
+        schema_column = dict(schema_column, offset=offset)
+        padding = (-len(block)) % BLOCK_ALIGNMENT
+        padded_blocks.append(block)
+        padded_blocks.append(b'\0' * padding)
+        schema_columns.append(schema_column)
+        offset += len(block) + padding
+
+    schema = {'rows': number_of_rows, 'columns': schema_columns, 'data_offset': 0}
+    # the data offset depends on the schema length, which depends on the data offset, so it is padded to settle
+    while True:
+        schema_bytes = dumps(schema, separators=(',', ':')).encode('utf-8')
+        data_offset = 8 + len(schema_bytes)
+        data_offset += (-data_offset) % BLOCK_ALIGNMENT
+        if schema['data_offset'] == data_offset:
+            break
+        schema['data_offset'] = data_offset
+    header = COLUMNAR_MAGIC + pack('<I', len(schema_bytes)) + schema_bytes
+    header += b' ' * (schema['data_offset'] - len(header))
+    return header + b''.join(padded_blocks)
+
+
+# this function writes a DataFrame to a columnar data file
+# returns the number of bytes written
+def write_columnar_data(data_frame, output_file_name, float_precision=64):
+    columnar_bytes = encode_columnar(data_frame, float_precision)
+    with open(output_file_name, 'wb') as output_file:
+        output_file.write(columnar_bytes)
+    return len(columnar_bytes)
+
+
+# this function decodes the bytes of a columnar data file into a DataFrame
+# numeric columns are float columns viewing the bytes without copying them, empty cells are NaN. other columns
+#   are categorical columns of their categories and codes.
+def decode_columnar(columnar_bytes):
+    if columnar_bytes[:4] != COLUMNAR_MAGIC:
+        raise ValueError("data is not a PyParasol columnar file")
+    schema_length = unpack_from('<I', columnar_bytes, 4)[0]
+    schema = loads(bytes(columnar_bytes[8:8 + schema_length]).decode('utf-8'))
+    type_codes = {'float32': '<f4', 'float64': '<f8', 'uint8': '<u1', 'uint16': '<u2', 'uint32': '<u4'}
+    columns = {}
+    for column in schema['columns']:
+        values = frombuffer(columnar_bytes, dtype=dtype(type_codes[column['type']]), count=schema['rows'],
+                            offset=schema['data_offset'] + column['offset'])
+        if 'categories' in column:
+            values = Categorical.from_codes(values.astype('int64'), column['categories'])
+        columns[len(columns)] = values
+    data_frame = DataFrame(columns, copy=False)
+    data_frame.columns = [column['name'] for column in schema['columns']]
+    return data_frame
+
+
+# this function converts a csv data file into a columnar data file
+# returns the number of bytes written
+def write_columnar_file(csv_file_name, output_file_name, float_precision=64):
+    return write_columnar_data(read_data_csv(csv_file_name), output_file_name, float_precision)
+
+
+# this function encodes a DataFrame as the base64 text of a gzip compressed columnar data file, for embedding
+#   the data in a page
+def encode_embedded_payload(data_frame, float_precision=64):
+    return b64encode(compress(encode_columnar(data_frame, float_precision), 9)).decode('ascii')
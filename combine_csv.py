@@ -1,6 +1,30 @@
+from concurrent.futures import ProcessPoolExecutor
 from csv import reader
-from pandas import DataFrame
-from pandas import concat
+from csv import writer
+from heapq import merge
+from itertools import groupby
+from itertools import product
+from os.path import getsize
+from os.path import join
+from queue import Queue
+from tempfile import TemporaryDirectory
+from threading import Semaphore
+from threading import Thread
+
+from numpy import full
+from pandas import read_csv
+from pandas.errors import ParserError
+
+# number of merged rows that are buffered before being written to the output file
+DEFAULT_CHUNK_SIZE = 10000
+# ways of joining the rows of several files on a key column
+JOIN_TYPES = ['inner', 'left', 'outer']
+# most bytes of data files that are joined in memory, bigger files are sorted on disk and merged
+DEFAULT_JOIN_MEMORY_BYTES = 256 << 20
+# kinds of worker pools data files can be parsed on
+PARSE_POOLS = ['thread', 'process']
+# number of parsed chunks of every file that are held while waiting to be written
+PARSED_CHUNKS_AHEAD = 2
 
 
 # this function gets a list of all lists of headers from each csv file inputted
@@ -8,59 +32,452 @@ from pandas import concat
 def get_header_list(csv_name_list):
     csv_header_list = []
     for csv_file_name in csv_name_list:
-        temp_header_list = []
         with open(csv_file_name, 'r', newline='') as current_csv_file:
-            header_line = current_csv_file.readline()
-            for header in header_line.split(','):
-                header = header.rstrip()
-                temp_header_list.append(header)
-            current_csv_file.close()
-            csv_header_list.append(temp_header_list)
+            csv_header_list.append(read_header(reader(current_csv_file)))
 
     return csv_header_list
 
 
+# this function reads the header row from an open csv reader
+# returns an empty list if the csv file is empty
+def read_header(csv_reader):
+    header_row = next(csv_reader, [])
+    return [header.rstrip() for header in header_row]
+
+
 # this function combines as many csv as are inputted and returns the data headers of each csv
 # it outputs the csv header list in the order that the csv file names were given
-def combine_csv(csv_name_list, output_csv_name):
-    # creating header list for return statement
-    # creates list of header lists in order of csv_name_list
-    csv_header_list = get_header_list(csv_name_list)
-
-    # adding the csv data into arrays
-    # csv data master is a list of all the 2d arrays of data from each individual csv file
-    # row_data keeps track of the number of rows that are in each csv file
-    row_data = []
-    csv_data_master = []
-    for csv_file_name in csv_name_list:
-        current_row_number = 0
-        current_data = []
-        csv_file_open = open(csv_file_name)
-        current_csv_file = reader(csv_file_open)
-        for row in current_csv_file:
-            current_data.append(row)
-            current_row_number += 1
-        csv_data_master.append(current_data)
-        row_data.append(current_row_number)
-
-    csv_data_master_pandas = []
-    for data in csv_data_master:
-        new_dataframe = DataFrame(data)
-        csv_data_master_pandas.append(new_dataframe)
-    # opening new output file
-    output_file = open(output_csv_name, 'w', newline='')
-    # adding all data next to eachother and adding to output csv file
-    data_final = concat(csv_data_master_pandas, axis=1)
-    print()
-    output_file.write(data_final.to_csv(index=False, index_label=False))
-    output_file.close()
-
-    # removing first line from file that was just created
-    with open(output_csv_name, 'r') as file_in:
-        data = file_in.read().splitlines(True)
-    with open(output_csv_name, 'w') as file_out:
-        file_out.writelines(data[1:])
+# every input file is opened once and read in lockstep, merged rows are written straight to the output file
+#   in chunks of chunk_size rows, so memory use depends on the chunk size and not on the size of the files.
+# files with fewer rows than the others are padded with empty cells, the same as a positional concatenation
+# column lists can give, for every file, the list of headers to keep (None keeps every column of that file),
+#   only those columns are written and returned in the header list
+# if a stats dictionary is given, the number of rows written is added to it as "rows", and the number of rows
+#   of every file as "file_rows" when rows are matched by position
+# key columns can give, for every file, the column its rows are matched on instead of their position. the key is
+#   written once, in the columns of the first file under its name, and that name replaces the key in the header
+#   list of every file. join type says which keys are kept: "inner" keys found in every file, "left" keys of the
+#   first file and "outer" keys of any file. keys are compared as text, and a key found on several rows of the
+#   same file gives a row for every combination, its count is added to stats as "duplicate_keys".
+# if the files after the first are no bigger than max memory bytes they are joined in memory and the rows keep the
+#   order of the first file (rows of keys missing from it come last), otherwise every file is sorted on disk and
+#   the rows are written in key order
+# with more than one parse worker, files matched by position are parsed at the same time with the pandas C parser,
+#   reading only their kept columns. a "thread" pool parses every file in chunks of chunk size rows, so memory still
+#   depends on the chunk size. a "process" pool parses whole files in worker processes, which uses more memory but
+#   doesn't share one interpreter. the rows are written in the same order either way.
+def combine_csv(csv_name_list, output_csv_name, chunk_size=DEFAULT_CHUNK_SIZE, column_lists=None, stats=None,
+                key_columns=None, join_type="outer", max_memory_bytes=DEFAULT_JOIN_MEMORY_BYTES, parse_workers=1,
+                parse_pool="thread"):
+    if chunk_size < 1:
+        chunk_size = DEFAULT_CHUNK_SIZE
+    if column_lists is None:
+        column_lists = [None] * len(csv_name_list)
+    if join_type not in JOIN_TYPES:
+        raise ValueError("join type must be one of: " + ", ".join(JOIN_TYPES))
+    if parse_pool not in PARSE_POOLS:
+        raise ValueError("parse pool must be one of: " + ", ".join(PARSE_POOLS))
+
+    csv_file_list = []
+    try:
+        for csv_file_name in csv_name_list:
+            csv_file_list.append(open(csv_file_name, 'r', newline=''))
+        csv_reader_list = [reader(csv_file) for csv_file in csv_file_list]
+
+        # the header row of every file sets the width of that file's block of columns in the output
+        csv_header_list = [read_header(csv_reader) for csv_reader in csv_reader_list]
+        row_width_list = [len(header) for header in csv_header_list]
+        key_positions = None
+        if key_columns is not None:
+            # a missing key is found from the headers, before any row is read
+            for csv_file_name, header, key_column in zip(csv_name_list, csv_header_list, key_columns):
+                if key_column not in header:
+                    raise ValueError("key column " + key_column + " is not in " + csv_file_name)
+            key_positions = [header.index(key_column) for header, key_column in zip(csv_header_list, key_columns)]
+            column_lists = [column_list if column_list is None or key_column in column_list else
+                            column_list + [key_column] for column_list, key_column in zip(column_lists, key_columns)]
+        column_positions_list = [find_column_positions(header, column_list)
+                                 for header, column_list in zip(csv_header_list, column_lists)]
+        csv_header_list = [select_columns(header, column_positions)
+                           for header, column_positions in zip(csv_header_list, column_positions_list)]
+
+        with open(output_csv_name, 'w', newline='') as output_file:
+            output_writer = writer(output_file, lineterminator='\n')
+            if key_positions is None:
+                output_writer.writerow([header for header_row in csv_header_list for header in header_row])
+                file_row_counts = []
+                rows_written = None
+                if parse_workers > 1 and len(csv_name_list) > 1:
+                    output_file.flush()
+                    rows_start = output_file.tell()
+                    try:
+                        rows_written = write_parsed_rows(csv_name_list, row_width_list, column_positions_list,
+                                                         output_file, chunk_size, file_row_counts, parse_workers,
+                                                         parse_pool)
+                    except ParserError:
+                        # rows the C parser can't read are left to the csv readers, from the first row
+                        output_file.seek(rows_start)
+                        output_file.truncate()
+                        file_row_counts = []
+                if rows_written is None:
+                    rows_written = write_merged_rows(csv_reader_list, row_width_list, output_writer, chunk_size,
+                                                     column_positions_list, file_row_counts)
+            else:
+                # the key is only kept in the columns of the first file
+                key_name = key_columns[0]
+                column_positions_list = [column_positions if column_positions is not None else
+                                         list(range(row_width))
+                                         for column_positions, row_width in zip(column_positions_list,
+                                                                                row_width_list)]
+                column_positions_list[1:] = [[position for position in column_positions if position != key_position]
+                                             for column_positions, key_position in
+                                             zip(column_positions_list[1:], key_positions[1:])]
+                output_writer.writerow(select_columns(csv_header_list[0], None) +
+                                       [header for header_row, key_column in zip(csv_header_list[1:],
+                                                                                  key_columns[1:])
+                                        for header in header_row if header != key_column])
+                csv_header_list = [[key_name if header == key_column else header for header in header_row]
+                                   for header_row, key_column in zip(csv_header_list, key_columns)]
+                join_stats = {'duplicate_keys': 0}
+                join_sources = [[csv_reader, row_width, key_position, column_positions]
+                                for csv_reader, row_width, key_position, column_positions in
+                                zip(csv_reader_list, row_width_list, key_positions, column_positions_list)]
+                if sum(getsize(csv_file_name) for csv_file_name in csv_name_list[1:]) <= max_memory_bytes:
+                    joined_rows = hash_join_rows(join_sources, join_type, join_stats)
+                    rows_written = write_rows(joined_rows, output_writer, chunk_size)
+                else:
+                    with TemporaryDirectory() as run_directory:
+                        joined_rows = sort_merge_join_rows(join_sources, join_type, join_stats, run_directory,
+                                                           max_memory_bytes)
+                        rows_written = write_rows(joined_rows, output_writer, chunk_size)
+    finally:
+        for csv_file in csv_file_list:
+            csv_file.close()
+
+    if stats is not None:
+        stats['rows'] = rows_written
+        if key_positions is None:
+            stats['file_rows'] = file_row_counts
+        else:
+            stats['duplicate_keys'] = join_stats['duplicate_keys']
     return csv_header_list
 
 
-# print(combine_csv(['data/cars.csv', 'data/people.csv', 'data/computers.csv'], 'output.csv'))
+# this function returns the positions of the columns to keep from a header, in the order of the header
+# returns None if every column is kept
+def find_column_positions(header, column_list):
+    if column_list is None:
+        return None
+    column_set = set(column_list)
+    return [position for position, name in enumerate(header) if name in column_set]
+
+
+# this function returns the cells of a row at the column positions, or the whole row if positions is None
+def select_columns(row, column_positions):
+    if column_positions is None:
+        return row
+    return [row[position] for position in column_positions]
+
+
+# this function reads every csv reader in lockstep and writes each merged row to the output writer
+# rows are padded or cut to the width of their file so the columns of every file stay aligned
+# if column positions are given for a file, only those columns of it are written
+# if a file row counts list is given, the number of rows of every file is added to it
+# returns the number of data rows that were written
+def write_merged_rows(csv_reader_list, row_width_list, output_writer, chunk_size=DEFAULT_CHUNK_SIZE,
+                      column_positions_list=None, file_row_counts=None):
+    if column_positions_list is None:
+        column_positions_list = [None] * len(csv_reader_list)
+    output_width_list = [row_width if column_positions is None else len(column_positions)
+                         for row_width, column_positions in zip(row_width_list, column_positions_list)]
+    active_reader_list = list(csv_reader_list)
+    reader_row_counts = [0] * len(csv_reader_list)
+    rows_written = 0
+    chunk = []
+    while True:
+        merged_row = []
+        rows_found = False
+        for reader_number, csv_reader in enumerate(active_reader_list):
+            row_width = row_width_list[reader_number]
+            row = None
+            if csv_reader is not None:
+                row = next(csv_reader, None)
+                if row is None:
+                    # file has run out of rows, its columns are padded from now on
+                    active_reader_list[reader_number] = None
+            if row is None:
+                merged_row.extend([''] * output_width_list[reader_number])
+                continue
+            rows_found = True
+            reader_row_counts[reader_number] += 1
+            if len(row) < row_width:
+                row.extend([''] * (row_width - len(row)))
+            column_positions = column_positions_list[reader_number]
+            if column_positions is None:
+                merged_row.extend(row[:row_width])
+            else:
+                merged_row.extend([row[position] for position in column_positions])
+        if not rows_found:
+            break
+        chunk.append(merged_row)
+        if len(chunk) >= chunk_size:
+            output_writer.writerows(chunk)
+            rows_written += len(chunk)
+            chunk = []
+    if chunk:
+        output_writer.writerows(chunk)
+        rows_written += len(chunk)
+    if file_row_counts is not None:
+        file_row_counts.extend(reader_row_counts)
+    return rows_written
+
+
+# this function reads a data file with the pandas C parser, as chunks of chunk size rows or as one DataFrame if
+#   chunk size is None
+# every cell is read as text, the same as the csv reader: rows are padded or cut to the row width, blank lines are
+#   empty rows, and only the columns at the column positions are kept (every column if positions is None)
+def read_csv_columns(csv_file_name, row_width, column_positions=None, chunk_size=None):
+    if column_positions is None:
+        column_positions = list(range(row_width))
+    return read_csv(csv_file_name, header=None, skiprows=1, names=list(range(row_width)), usecols=column_positions,
+                    dtype=str, keep_default_na=False, skip_blank_lines=False, chunksize=chunk_size)
+
+
+# this function parses a data file in chunks and puts every chunk in the queue
+# a chunk is only parsed while holding one of the parse slots, waiting for room in the queue doesn't hold one
+# the end of the file is marked with None, an exception is put in the queue instead of being raised
+def queue_parsed_chunks(csv_file_name, row_width, column_positions, chunk_size, chunk_queue, parse_slots):
+    try:
+        with read_csv_columns(csv_file_name, row_width, column_positions, chunk_size) as chunk_reader:
+            while True:
+                with parse_slots:
+                    chunk = next(chunk_reader, None)
+                chunk_queue.put(chunk)
+                if chunk is None:
+                    return
+    except Exception as error:
+        chunk_queue.put(error)
+
+
+# this function returns the parsed chunks of every data file side by side, None for files that ran out of rows
+# a thread pool parses every file in chunks on its own thread while the chunks before are written, with at most
+#   parse workers chunks parsed at once. a process pool parses whole files and they are cut into chunks of chunk size
+#   rows.
+def parsed_row_chunks(csv_name_list, row_width_list, column_positions_list, chunk_size, parse_workers, parse_pool):
+    if parse_pool == "process":
+        with ProcessPoolExecutor(parse_workers) as executor:
+            data_frames = list(executor.map(read_csv_columns, csv_name_list, row_width_list,
+                                            column_positions_list))
+        row_count = max(len(data_frame) for data_frame in data_frames)
+        for chunk_start in range(0, row_count, chunk_size):
+            yield [data_frame.iloc[chunk_start:chunk_start + chunk_size] if chunk_start < len(data_frame) else None
+                   for data_frame in data_frames]
+        return
+
+    parse_slots = Semaphore(parse_workers)
+    active_queues = [Queue(PARSED_CHUNKS_AHEAD) for csv_file_name in csv_name_list]
+    parse_threads = [Thread(target=queue_parsed_chunks, args=(csv_file_name, row_width, column_positions, chunk_size,
+                                                              chunk_queue, parse_slots), daemon=True)
+                     for csv_file_name, row_width, column_positions, chunk_queue in
+                     zip(csv_name_list, row_width_list, column_positions_list, active_queues)]
+    for parse_thread in parse_threads:
+        parse_thread.start()
+    try:
+        while True:
+            chunks = []
+            for queue_number, chunk_queue in enumerate(active_queues):
+                chunk = chunk_queue.get() if chunk_queue is not None else None
+                if chunk is None or isinstance(chunk, Exception):
+                    active_queues[queue_number] = None
+                if isinstance(chunk, Exception):
+                    raise chunk
+                chunks.append(chunk)
+            if all(chunk is None for chunk in chunks):
+                return
+            yield chunks
+    finally:
+        # files still being parsed are read to the end, so their threads aren't left waiting on a full queue
+        for chunk_queue in active_queues:
+            while chunk_queue is not None:
+                chunk = chunk_queue.get()
+                if chunk is None or isinstance(chunk, Exception):
+                    break
+        for parse_thread in parse_threads:
+            parse_thread.join()
+
+
+# this function writes the rows of every data file, parsed on parse workers and merged by position, to the output
+#   file. files with fewer rows than the others are padded with empty cells, the same as write_merged_rows
+# the number of rows of every file is added to the file row counts list
+# returns the number of data rows that were written
+def write_parsed_rows(csv_name_list, row_width_list, column_positions_list, output_file, chunk_size,
+                      file_row_counts, parse_workers, parse_pool):
+    output_width_list = [row_width if column_positions is None else len(column_positions)
+                         for row_width, column_positions in zip(row_width_list, column_positions_list)]
+    output_writer = writer(output_file, lineterminator='\n')
+    reader_row_counts = [0] * len(csv_name_list)
+    rows_written = 0
+    for chunks in parsed_row_chunks(csv_name_list, row_width_list, column_positions_list, chunk_size,
+                                    parse_workers, parse_pool):
+        chunk_rows = max(len(chunk) for chunk in chunks if chunk is not None)
+        merged_chunk = full((chunk_rows, sum(output_width_list)), '', dtype=object)
+        column_start = 0
+        for reader_number, chunk in enumerate(chunks):
+            column_end = column_start + output_width_list[reader_number]
+            if chunk is not None:
+                reader_row_counts[reader_number] += len(chunk)
+                merged_chunk[:len(chunk), column_start:column_end] = chunk.to_numpy()
+            column_start = column_end
+        output_writer.writerows(merged_chunk.tolist())
+        rows_written += chunk_rows
+    file_row_counts.extend(reader_row_counts)
+    return rows_written
+
+
+# this function writes rows to the output writer in chunks of chunk size rows
+# returns the number of rows that were written
+def write_rows(rows, output_writer, chunk_size=DEFAULT_CHUNK_SIZE):
+    rows_written = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            output_writer.writerows(chunk)
+            rows_written += len(chunk)
+            chunk = []
+    if chunk:
+        output_writer.writerows(chunk)
+        rows_written += len(chunk)
+    return rows_written
+
+
+# this function returns the rows of a join source as [key, kept cells] pairs
+# a join source is [csv reader, row width, key position, column positions], rows are padded to the row width
+def read_keyed_rows(join_source):
+    csv_reader, row_width, key_position, column_positions = join_source
+    for row in csv_reader:
+        if len(row) < row_width:
+            row.extend([''] * (row_width - len(row)))
+        yield row[key_position], [row[position] for position in column_positions]
+
+
+# this function returns the merged rows of one key, a row for every combination of the rows of every source
+# sources without rows for the key are padded, the key is written into the padded columns of the first source
+def join_key_rows(key, rows_by_source, padding_rows, first_key_position):
+    if rows_by_source[0] is None:
+        first_row = list(padding_rows[0])
+        first_row[first_key_position] = key
+        rows_by_source = [[first_row]] + rows_by_source[1:]
+    rows_by_source = [rows if rows is not None else [padding_row]
+                      for rows, padding_row in zip(rows_by_source, padding_rows)]
+    return [[cell for row in rows for cell in row] for rows in product(*rows_by_source)]
+
+
+# this function says if a key is kept by the join type, from the sources it was found in
+def is_key_joined(join_type, found_in_sources):
+    if join_type == "inner":
+        return all(found_in_sources)
+    if join_type == "left":
+        return found_in_sources[0]
+    return any(found_in_sources)
+
+
+# this function joins the rows of the join sources on their keys with a hash table of every source but the first
+# the first source is read once, in order, and matched against the tables
+# rows of keys that are missing from the first source come after, in the order they were first found
+def hash_join_rows(join_sources, join_type, join_stats):
+    padding_rows = [[''] * len(join_source[3]) for join_source in join_sources]
+    first_key_position = join_sources[0][3].index(join_sources[0][2])
+    tables = []
+    for join_source in join_sources[1:]:
+        table = {}
+        for key, row in read_keyed_rows(join_source):
+            table.setdefault(key, []).append(row)
+        join_stats['duplicate_keys'] += sum(1 for rows in table.values() if len(rows) > 1)
+        tables.append(table)
+
+    first_rows = {}
+    for key, row in read_keyed_rows(join_sources[0]):
+        if key in first_rows:
+            if first_rows[key] == 1:
+                join_stats['duplicate_keys'] += 1
+            first_rows[key] += 1
+        else:
+            first_rows[key] = 1
+        rows_by_source = [[row]] + [table.get(key) for table in tables]
+        if is_key_joined(join_type, [rows is not None for rows in rows_by_source]):
+            yield from join_key_rows(key, rows_by_source, padding_rows, first_key_position)
+
+    if join_type != "outer":
+        return
+    for table in tables:
+        for key in table:
+            if key in first_rows:
+                continue
+            # marks the key as written, so a key found in several tables is only written once
+            first_rows[key] = 0
+            yield from join_key_rows(key, [None] + [other_table.get(key) for other_table in tables], padding_rows,
+                                     first_key_position)
+
+
+# this function returns the [key, kept cells] rows of a join source in key order
+# rows are read in runs that fit in max run bytes, every run is sorted and written to the run directory, and the
+#   runs are merged while they are read back
+def sort_keyed_rows(join_source, source_number, run_directory, max_run_bytes):
+    run_file_names = []
+    run = []
+    run_bytes = 0
+    for key, row in read_keyed_rows(join_source):
+        run.append([key] + row)
+        run_bytes += len(key) + sum(len(cell) for cell in row) + len(row) + 1
+        if run_bytes >= max_run_bytes:
+            run_file_names.append(write_sorted_run(run, run_directory, source_number, len(run_file_names)))
+            run = []
+            run_bytes = 0
+    if run:
+        run_file_names.append(write_sorted_run(run, run_directory, source_number, len(run_file_names)))
+
+    run_files = [open(run_file_name, 'r', newline='') for run_file_name in run_file_names]
+    try:
+        for row in merge(*[reader(run_file) for run_file in run_files], key=lambda row: row[0]):
+            yield row[0], row[1:]
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+# this function sorts a run of rows on their key and writes it to a file in the run directory
+# returns the name of the run file
+def write_sorted_run(run, run_directory, source_number, run_number):
+    run.sort(key=lambda row: row[0])
+    run_file_name = join(run_directory, "run_" + str(source_number) + "_" + str(run_number) + ".csv")
+    with open(run_file_name, 'w', newline='') as run_file:
+        writer(run_file, lineterminator='\n').writerows(run)
+    return run_file_name
+
+
+# this function joins the rows of the join sources on their keys by sorting every source on disk and reading the
+#   sorted sources side by side, so only the rows of one key are held in memory at a time
+# rows are returned in key order
+def sort_merge_join_rows(join_sources, join_type, join_stats, run_directory, max_memory_bytes):
+    padding_rows = [[''] * len(join_source[3]) for join_source in join_sources]
+    first_key_position = join_sources[0][3].index(join_sources[0][2])
+    max_run_bytes = max(1, max_memory_bytes // len(join_sources))
+    key_groups = [groupby(sort_keyed_rows(join_source, source_number, run_directory, max_run_bytes),
+                          key=lambda keyed_row: keyed_row[0])
+                  for source_number, join_source in enumerate(join_sources)]
+    current_groups = [next(key_group, None) for key_group in key_groups]
+    while any(current_group is not None for current_group in current_groups):
+        key = min(current_group[0] for current_group in current_groups if current_group is not None)
+        rows_by_source = []
+        for source_number, current_group in enumerate(current_groups):
+            if current_group is None or current_group[0] != key:
+                rows_by_source.append(None)
+                continue
+            rows = [row for group_key, row in current_group[1]]
+            if len(rows) > 1:
+                join_stats['duplicate_keys'] += 1
+            rows_by_source.append(rows)
+            current_groups[source_number] = next(key_groups[source_number], None)
+        if is_key_joined(join_type, [rows is not None for rows in rows_by_source]):
+            yield from join_key_rows(key, rows_by_source, padding_rows, first_key_position)
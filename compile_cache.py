@@ -0,0 +1,241 @@
+from hashlib import sha256
+from json import dump
+from json import dumps
+from json import load
+from os import remove
+from os import stat
+from os.path import abspath
+from os.path import exists
+from os.path import getsize
+from os.path import normpath
+
+# version of the manifest layout, manifests written with a different version are ignored
+MANIFEST_VERSION = 1
+# size of the blocks read when hashing a file
+HASH_BLOCK_SIZE = 1 << 20
+# number of bytes before the recorded end of a file that are hashed to check that rows were only appended to it
+APPEND_CHECK_BYTES = 1 << 16
+
+
+# this function returns the sha256 hex digest of a file's contents, read in blocks
+# length only hashes that many bytes from the start of the file
+def hash_file(file_name, length=None):
+    file_hash = sha256()
+    with open(file_name, 'rb') as file_in:
+        while length is None or length > 0:
+            block = file_in.read(HASH_BLOCK_SIZE if length is None else min(HASH_BLOCK_SIZE, length))
+            if block == b'':
+                break
+            file_hash.update(block)
+            if length is not None:
+                length -= len(block)
+    return file_hash.hexdigest()
+
+
+# this function records the size and modification time of a file, and its content hash if asked for
+def file_signature(file_name, hash_contents=False):
+    file_stat = stat(file_name)
+    signature = {'size': file_stat.st_size, 'mtime': file_stat.st_mtime_ns}
+    if hash_contents:
+        signature['sha256'] = hash_file(file_name)
+    return signature
+
+
+# this function records the end of a file and a hash of the bytes just before it, so a file that only had rows
+#   appended can be told apart from a rewritten one without reading it again
+# if hash contents is set, a hash of the whole file is recorded too, so a later check reads every byte up to the end
+# returns None if the file doesn't end with a line ending, since its last row may still be being written
+def append_signature(file_name, hash_contents=False):
+    file_size = getsize(file_name)
+    with open(file_name, 'rb') as file_in:
+        file_in.seek(max(0, file_size - APPEND_CHECK_BYTES))
+        end_block = file_in.read(file_size - max(0, file_size - APPEND_CHECK_BYTES))
+    if not end_block.endswith(b'\n'):
+        return None
+    signature = {'offset': file_size, 'end_sha256': sha256(end_block).hexdigest()}
+    if hash_contents:
+        signature['prefix_sha256'] = hash_file(file_name, file_size)
+    return signature
+
+
+# this function checks that a file is the file of an append signature with complete rows added to its end
+# without hash contents only the bytes just before the recorded end are compared, so a file rewritten further back
+#   with the same end isn't noticed. with hash contents every byte up to the recorded end is compared, and a
+#   signature recorded without the hash of them never counts as appended.
+def is_appended(file_name, signature, hash_contents=False):
+    if not exists(file_name):
+        return False
+    file_size = getsize(file_name)
+    offset = signature['offset']
+    if file_size <= offset:
+        return False
+    if hash_contents and 'prefix_sha256' not in signature:
+        return False
+    with open(file_name, 'rb') as file_in:
+        file_in.seek(max(0, offset - APPEND_CHECK_BYTES))
+        end_block = file_in.read(offset - max(0, offset - APPEND_CHECK_BYTES))
+        file_in.seek(file_size - 1)
+        last_byte = file_in.read(1)
+    if last_byte != b'\n' or sha256(end_block).hexdigest() != signature['end_sha256']:
+        return False
+    return not hash_contents or hash_file(file_name, offset) == signature['prefix_sha256']
+
+
+# this function returns a fingerprint of a configuration made of plain python data
+# objects that aren't json types are fingerprinted by their attributes, or by their repr if they have none
+def config_fingerprint(config):
+    def encode_object(item):
+        if hasattr(item, '__dict__'):
+            return vars(item)
+        return repr(item)
+    config_text = dumps(config, sort_keys=True, default=encode_object)
+    return sha256(config_text.encode('utf-8')).hexdigest()
+
+
+# this class keeps a manifest of the inputs, configuration and artifacts of the last compile
+# a compile can be skipped when every input file and the configuration fingerprint still match the manifest
+#   and every artifact that was written is still on disk unchanged.
+# size and modification time are compared first, the content hash is only used when hash_contents is set
+#   and a file was touched without its size changing.
+# inputs can be stored with append signatures, then a lookup that allows appends reports input files that only had
+#   rows added to their end as an "append" instead of a miss, so the compile can add just the new rows.
+class CompileCache:
+    def __init__(self, manifest_file_name, hash_contents=False):
+        self.manifest_file_name = manifest_file_name
+        self.hash_contents = hash_contents
+        self.hits = 0
+        self.misses = 0
+        self.appends = 0
+        self.evicted = []
+        self.last_status = None
+        self.last_reason = None
+
+    # this function reads the manifest file, returns None if there is no usable manifest
+    def load_manifest(self):
+        if not exists(self.manifest_file_name):
+            return None
+        try:
+            with open(self.manifest_file_name, 'r') as manifest_file:
+                manifest = load(manifest_file)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION:
+            return None
+        return manifest
+
+    # this function checks a file against its recorded signature
+    def __signature_matches__(self, file_name, recorded_signature):
+        if not exists(file_name):
+            return False
+        current_signature = file_signature(file_name)
+        if current_signature['size'] != recorded_signature['size']:
+            return False
+        if current_signature['mtime'] == recorded_signature['mtime']:
+            return True
+        # the file was touched, only a matching content hash can still make it a hit
+        if self.hash_contents and 'sha256' in recorded_signature:
+            return hash_file(file_name) == recorded_signature['sha256']
+        return False
+
+    # this function records the result of a lookup for the cache report
+    def __record__(self, status, reason):
+        self.last_status = status
+        self.last_reason = reason
+        if status == 'hit':
+            self.hits += 1
+        elif status == 'append':
+            self.appends += 1
+        else:
+            self.misses += 1
+
+    # this function checks whether a compile with these inputs and configuration can be skipped
+    # returns the manifest on a hit, returns None on a miss
+    # if allow append is set, the manifest is also returned when some inputs only had rows appended since they were
+    #   stored with append signatures, and the last status is "append"
+    def lookup(self, input_file_names, config, allow_append=False):
+        manifest = self.load_manifest()
+        if manifest is None:
+            self.__record__('miss', 'no manifest')
+            return None
+        if manifest['config'] != config_fingerprint(config):
+            self.__record__('miss', 'configuration changed')
+            return None
+        if [normpath(abspath(file_name)) for file_name in input_file_names] != \
+                [entry['path'] for entry in manifest['inputs']]:
+            self.__record__('miss', 'input files changed')
+            return None
+        appended_file_names = []
+        for file_name, entry in zip(input_file_names, manifest['inputs']):
+            if self.__signature_matches__(file_name, entry['signature']):
+                continue
+            if allow_append and entry.get('append') is not None and is_appended(file_name, entry['append'],
+                                                                                  self.hash_contents):
+                appended_file_names.append(file_name)
+                continue
+            self.__record__('miss', 'input modified: ' + file_name)
+            return None
+        for entry in manifest['artifacts']:
+            if not self.__signature_matches__(entry['path'], entry['signature']):
+                self.__record__('miss', 'artifact missing or modified: ' + entry['path'])
+                return None
+        if appended_file_names:
+            self.__record__('append', 'rows appended: ' + ', '.join(appended_file_names))
+            return manifest
+        self.__record__('hit', 'inputs and configuration unchanged')
+        return manifest
+
+    # this function records that a lookup that found appended rows needed a full compile after all
+    def fall_back(self, reason):
+        if self.last_status == 'append':
+            self.appends -= 1
+            self.__record__('miss', reason)
+
+    # this function writes the manifest for a finished compile
+    # artifacts of the previous manifest that aren't produced anymore are deleted from disk
+    # extra is any additional json data to keep in the manifest, it is returned with the manifest on a hit
+    # if track appends is set, the inputs are stored with append signatures so later lookups can allow appends
+    def store(self, input_file_names, config, artifact_file_names, extra=None, track_appends=False):
+        self.evict_stale(input_file_names, artifact_file_names)
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'config': config_fingerprint(config),
+            'inputs': [{'path': normpath(abspath(file_name)),
+                        'signature': file_signature(file_name, self.hash_contents)}
+                       for file_name in input_file_names],
+            'artifacts': [{'path': file_name,
+                           'signature': file_signature(file_name, self.hash_contents)}
+                          for file_name in artifact_file_names],
+            'extra': extra if extra is not None else {}
+        }
+        if track_appends:
+            for file_name, entry in zip(input_file_names, manifest['inputs']):
+                entry['append'] = append_signature(file_name, self.hash_contents)
+        with open(self.manifest_file_name, 'w') as manifest_file:
+            dump(manifest, manifest_file, indent=1)
+        return manifest
+
+    # this function deletes the artifacts of the previous compile that the new compile doesn't write
+    # input files are never deleted, even if an earlier compile wrote them
+    def evict_stale(self, input_file_names, artifact_file_names):
+        manifest = self.load_manifest()
+        if manifest is None:
+            return
+        keep_paths = set(normpath(abspath(file_name)) for file_name in input_file_names + artifact_file_names)
+        for entry in manifest['artifacts']:
+            if normpath(abspath(entry['path'])) in keep_paths:
+                continue
+            if exists(entry['path']):
+                remove(entry['path'])
+                self.evicted.append(entry['path'])
+
+    # this function returns a report of the cache hits and misses so far
+    def report(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'appends': self.appends,
+            'last_status': self.last_status,
+            'last_reason': self.last_reason,
+            'evicted': list(self.evicted),
+            'manifest': self.manifest_file_name
+        }
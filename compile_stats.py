@@ -0,0 +1,126 @@
+from cProfile import Profile
+from contextlib import contextmanager
+from io import StringIO
+from os.path import exists
+from os.path import getsize
+from pstats import Stats
+from time import perf_counter
+import sys
+import tracemalloc
+
+# the resource module only exists on unix, elsewhere the peak resident memory isn't reported
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# the capture modes that can be turned on for a compile
+CAPTURE_MODES = ['cprofile', 'tracemalloc']
+# number of functions and allocation sites listed in a captured profile
+PROFILE_LINES = 25
+
+
+# this function returns the peak resident memory of this process in bytes, None where it can't be read
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos reports bytes
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+
+
+# this function returns the total size of the files in a list that exist, every file counted once
+def total_file_bytes(file_names):
+    return sum(getsize(file_name) for file_name in set(file_names) if file_name is not None and exists(file_name))
+
+
+# this class collects the timings, counts and memory of one compile into a report
+# stages are timed with the stage() context manager, stages inside another stage are listed under it
+# capture modes can add a cProfile profile of the whole compile and tracemalloc peaks for every stage
+class CompileStats:
+    def __init__(self, capture_modes=None):
+        self.capture_modes = capture_modes if capture_modes is not None else []
+        self.stages = []
+        self.counts = {}
+        self.errors = []
+        self.__open_stages = []
+        self.__start_time = None
+        self.__profile = None
+        self.__started_tracemalloc = False
+        self.__traced_peak = 0
+
+    # this function starts timing the compile, and the capture modes that are turned on
+    def start(self):
+        if 'tracemalloc' in self.capture_modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracemalloc = True
+        if 'cprofile' in self.capture_modes:
+            self.__profile = Profile()
+            self.__profile.enable()
+        self.__start_time = perf_counter()
+
+    # this function times a stage of the compile, and finds its traced memory peak if tracemalloc is on
+    # tracemalloc only keeps one peak, so it is handed to every open stage before it is reset for a new stage
+    @contextmanager
+    def stage(self, stage_name):
+        stage_report = {'name': stage_name, 'seconds': 0.0}
+        if self.__open_stages:
+            self.__open_stages[-1][0].setdefault('stages', []).append(stage_report)
+        else:
+            self.stages.append(stage_report)
+        tracing = tracemalloc.is_tracing() and 'tracemalloc' in self.capture_modes
+        traced_start = 0
+        if tracing:
+            self.__update_traced_peaks__()
+            traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        # every open stage is kept with its traced memory peak so far
+        open_stage = [stage_report, traced_start]
+        self.__open_stages.append(open_stage)
+        start_time = perf_counter()
+        try:
+            yield stage_report
+        finally:
+            stage_report['seconds'] = perf_counter() - start_time
+            if tracing:
+                self.__update_traced_peaks__()
+                stage_report['traced_peak_bytes'] = open_stage[1] - traced_start
+            self.__open_stages.pop()
+
+    # this function raises the traced memory peak of every open stage, and of the whole compile, to the current peak
+    def __update_traced_peaks__(self):
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        self.__traced_peak = max(self.__traced_peak, traced_peak)
+        for open_stage in self.__open_stages:
+            open_stage[1] = max(open_stage[1], traced_peak)
+
+    # this function adds to a count of the report, like rows or bytes
+    def add(self, count_name, amount):
+        self.counts[count_name] = self.counts.get(count_name, 0) + amount
+
+    # this function records an error that made the compile fail
+    def error(self, message):
+        self.errors.append(message)
+
+    # this function stops timing and the capture modes, and returns the report
+    # status is "ok" if compiling worked, "failed" if it returned 0 and "error" if it raised an exception
+    def finish(self, status):
+        total_seconds = perf_counter() - self.__start_time
+        report = {'status': status, 'total_seconds': total_seconds, 'stages': self.stages,
+                  'counts': dict(self.counts), 'errors': list(self.errors), 'peak_rss_bytes': peak_rss_bytes()}
+        if self.__profile is not None:
+            self.__profile.disable()
+            profile_text = StringIO()
+            Stats(self.__profile, stream=profile_text).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            report['profile'] = profile_text.getvalue()
+            self.__profile = None
+        if 'tracemalloc' in self.capture_modes and tracemalloc.is_tracing():
+            self.__update_traced_peaks__()
+            report['traced_peak_bytes'] = self.__traced_peak
+            report['allocations'] = [str(statistic) for statistic in
+                                     tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_LINES]]
+            if self.__started_tracemalloc:
+                tracemalloc.stop()
+        return report
@@ -0,0 +1,232 @@
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from http import HTTPStatus
+from http.server import HTTPServer
+from json import dumps
+from os.path import abspath
+from os.path import basename
+from os.path import dirname
+from os.path import exists
+from os.path import isfile
+from os.path import join
+from os.path import splitext
+from threading import BoundedSemaphore
+from threading import Lock
+from urllib.parse import quote
+from urllib.parse import unquote
+
+from parasol_server import CompressedFileCache
+from parasol_server import ParasolRequestHandler
+
+# the asset files every compiled parasol application loads, served from the asset directory when a dashboard's
+#   directory doesn't have them, so every dashboard shares one copy and one compressed variant
+ASSET_FILE_NAMES = ['parasol.css', 'd3.v5.min.js', 'parasol.standalone.js']
+# path of the json counts of the payload cache and of every dashboard
+STATS_PATH = "/__parasol__/stats"
+# number of connections served at the same time
+DEFAULT_WORKERS = 32
+# most bytes of compressed payloads kept in memory
+DEFAULT_CACHE_BYTES = 256 << 20
+# seconds the browser is told to wait before asking again when a dashboard has no room for its request
+RETRY_AFTER_SECONDS = 1
+# seconds an idle kept-alive connection holds its worker before it is closed, connections are closed after their
+#   request instead while other connections wait for a worker
+KEEP_ALIVE_SECONDS = 1
+
+
+# this function returns the dashboards to host as a dictionary of names to [directory, html file name]
+# dashboards is a dictionary of names to compiled html files, or a list of html files named after the files
+def find_dashboards(dashboards):
+    if isinstance(dashboards, dict):
+        named_files = list(dashboards.items())
+    else:
+        named_files = [[splitext(basename(html_file))[0], html_file] for html_file in dashboards]
+    found_dashboards = {}
+    for name, html_file in named_files:
+        name = str(name)
+        if name in found_dashboards:
+            raise ValueError("two dashboards are named " + name)
+        if name == '' or '/' in name or name.startswith('__'):
+            raise ValueError("dashboard name " + name + " can't be used in a url")
+        if not isfile(html_file):
+            raise ValueError("dashboard " + name + " has no html file " + str(html_file))
+        found_dashboards[name] = [dirname(abspath(html_file)), basename(html_file)]
+    return found_dashboards
+
+
+# this class serves many compiled parasol applications from one process, each under a path of its own name
+# every dashboard only gets a share of the requests served at the same time, so a dashboard with huge data files
+#   can't keep the others waiting. compressed payloads are kept in one cache of a fixed size for every dashboard.
+class DashboardRequestHandler(ParasolRequestHandler):
+    timeout = KEEP_ALIVE_SECONDS
+
+    # this function uses the payload cache of the server instead of the cache of the local server
+    def setup(self):
+        ParasolRequestHandler.setup(self)
+        self.compressed_files = self.server.payload_cache
+        self.__dashboard_name = None
+
+    # this function answers a request of the connection, and closes the connection after it if other connections are
+    #   waiting for a worker, so a kept-alive connection doesn't hold its worker while they wait
+    def handle_one_request(self):
+        ParasolRequestHandler.handle_one_request(self)
+        if self.server.has_waiting_connections():
+            self.close_connection = True
+
+    # this function answers GET requests for the dashboard index, the stats or a file of a dashboard
+    def do_GET(self):
+        self.__serve__(ParasolRequestHandler.do_GET)
+
+    # this function answers HEAD requests the same way as GET requests, without the body
+    def do_HEAD(self):
+        self.__serve__(ParasolRequestHandler.do_HEAD)
+
+    # this function answers a request if its dashboard has room for it, and with 503 Service Unavailable otherwise
+    def __serve__(self, serve_file):
+        request_path = unquote(self.path.split('?')[0].split('#')[0])
+        if request_path == '/':
+            self.__send_bytes__(self.__index_page__(), "text/html; charset=utf-8")
+            return
+        if request_path == STATS_PATH:
+            self.__send_bytes__(dumps(self.server.stats()).encode('utf-8'), "application/json")
+            return
+        dashboard_name, _, file_path = request_path.lstrip('/').partition('/')
+        if dashboard_name not in self.server.dashboards:
+            self.send_error(HTTPStatus.NOT_FOUND, "No dashboard named " + dashboard_name)
+            return
+        if file_path == '':
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", "/" + quote(dashboard_name) + "/" +
+                             quote(self.server.dashboards[dashboard_name][1]))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not self.server.start_request(dashboard_name):
+            # the connection is closed so its worker goes to a connection that is waiting
+            self.close_connection = True
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+            self.send_header("Retry-After", str(RETRY_AFTER_SECONDS))
+            self.send_header("Connection", "close")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.__dashboard_name = dashboard_name
+        try:
+            serve_file(self)
+        finally:
+            self.__dashboard_name = None
+            self.server.end_request(dashboard_name)
+
+    # this function returns the path of a requested file in the directory of its dashboard
+    # asset files missing from the dashboard's directory are taken from the asset directory
+    def translate_path(self, path):
+        directory = self.server.dashboards[self.__dashboard_name][0]
+        dashboard_path = '/' + unquote(path.split('?')[0].split('#')[0]).lstrip('/').partition('/')[2]
+        self.directory = directory
+        file_path = ParasolRequestHandler.translate_path(self, dashboard_path)
+        if not exists(file_path) and dashboard_path.lstrip('/') in ASSET_FILE_NAMES:
+            file_path = join(self.server.asset_directory, dashboard_path.lstrip('/'))
+        return file_path
+
+    # this function sends a whole response that was made in memory
+    def __send_bytes__(self, body, content_type):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    # this function returns the page listing every dashboard
+    def __index_page__(self):
+        page_lines = '<!doctype html>\n<title>Parasol dashboards</title>\n<h1>Parasol dashboards</h1>\n<ul>'
+        for dashboard_name, (_, html_file_name) in sorted(self.server.dashboards.items()):
+            page_lines += '\n<li><a href="/' + quote(dashboard_name) + '/' + quote(html_file_name) + '">' + \
+                          escape(dashboard_name) + '</a></li>'
+        page_lines += '\n</ul>\n'
+        return page_lines.encode('utf-8')
+
+
+# this class is a server hosting many dashboards, with a fixed pool of workers serving its connections
+# dashboards is a dictionary of names to [directory, html file name], see find_dashboards()
+# cache bytes bounds the compressed payloads kept in memory, dashboard requests is the most requests of one dashboard
+#   that are served at the same time (half the workers if it isn't set). files are only read when they are requested.
+class DashboardHTTPServer(HTTPServer):
+    allow_reuse_address = True
+
+    def __init__(self, server_address, dashboards, workers=DEFAULT_WORKERS, cache_bytes=DEFAULT_CACHE_BYTES,
+                 dashboard_requests=None, asset_directory=None):
+        HTTPServer.__init__(self, server_address, DashboardRequestHandler)
+        if dashboard_requests is None:
+            dashboard_requests = max(1, workers // 2)
+        self.dashboards = dashboards
+        self.workers = workers
+        self.dashboard_requests = dashboard_requests
+        self.asset_directory = asset_directory if asset_directory is not None else dirname(abspath(__file__))
+        self.payload_cache = CompressedFileCache(cache_bytes)
+        self.__request_slots = {name: BoundedSemaphore(dashboard_requests) for name in dashboards}
+        self.__counts = {name: {'requests': 0, 'rejected': 0, 'active': 0} for name in dashboards}
+        self.__counts_lock = Lock()
+        self.__waiting_connections = 0
+        self.__worker_pool = ThreadPoolExecutor(workers)
+
+    # this function hands a connection to the worker pool, connections wait there while every worker is busy
+    def process_request(self, request, client_address):
+        with self.__counts_lock:
+            self.__waiting_connections += 1
+        self.__worker_pool.submit(self.__serve_connection__, request, client_address)
+
+    # this function says if connections are waiting for a worker
+    def has_waiting_connections(self):
+        with self.__counts_lock:
+            return self.__waiting_connections > 0
+
+    # this function serves every request of a connection on a worker
+    def __serve_connection__(self, request, client_address):
+        with self.__counts_lock:
+            self.__waiting_connections -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    # this function takes room for another request of a dashboard without waiting for it, so a busy dashboard never
+    #   holds workers the other dashboards need
+    # returns False if the dashboard has no room
+    def start_request(self, dashboard_name):
+        if not self.__request_slots[dashboard_name].acquire(blocking=False):
+            with self.__counts_lock:
+                self.__counts[dashboard_name]['rejected'] += 1
+            return False
+        with self.__counts_lock:
+            self.__counts[dashboard_name]['requests'] += 1
+            self.__counts[dashboard_name]['active'] += 1
+        return True
+
+    # this function gives back the room a request of a dashboard had
+    def end_request(self, dashboard_name):
+        with self.__counts_lock:
+            self.__counts[dashboard_name]['active'] -= 1
+        self.__request_slots[dashboard_name].release()
+
+    # this function returns the counts of the payload cache and of the requests of every dashboard
+    def stats(self):
+        with self.__counts_lock:
+            dashboard_counts = {name: dict(counts) for name, counts in self.__counts.items()}
+        return {'workers': self.workers, 'dashboard_requests': self.dashboard_requests,
+                'cache': self.payload_cache.stats(), 'dashboards': dashboard_counts}
+
+    # this function closes the server and stops the workers once they finish their connections
+    def server_close(self):
+        HTTPServer.server_close(self)
+        self.__worker_pool.shutdown(wait=False)
+
+
+# this function makes a server hosting many dashboards at the given port, see DashboardHTTPServer
+# dashboards is a dictionary of names to compiled html files, or a list of html files named after the files
+def make_dashboard_server(dashboards, port=8000, workers=DEFAULT_WORKERS, cache_bytes=DEFAULT_CACHE_BYTES,
+                          dashboard_requests=None):
+    return DashboardHTTPServer(("", port), find_dashboards(dashboards), workers, cache_bytes, dashboard_requests)
@@ -0,0 +1,387 @@
+from base64 import b64decode
+from binascii import Error as Base64Error
+from collections import OrderedDict
+from os import stat
+from threading import Lock
+
+from numpy import argsort
+from numpy import concatenate
+from numpy import flatnonzero
+from numpy import float64
+from numpy import frombuffer
+from numpy import int32
+from numpy import isnan
+from numpy import uint8
+from numpy import unpackbits
+from pandas import to_numeric
+from pandas.api.types import is_bool_dtype
+from pandas.api.types import is_numeric_dtype
+
+from columnar_data import COLUMNAR_MAGIC
+from columnar_data import decode_columnar
+from columnar_data import read_data_csv
+
+# number of rows the page asks the server for at a time
+DEFAULT_PAGE_ROWS = 100
+# most rows sent for one request
+MAX_PAGE_ROWS = 1000
+# number of row filters kept, the oldest is forgotten when another one is added and the page posts it again
+MAX_ROW_FILTERS = 32
+
+# javascript that replaces the grid of a parasol application with a grid that only holds the rows it shows
+# rows are asked for from the local server a page at a time as the grid scrolls, and only the pages around the
+#   rows in view are kept. sorting by a column is done on the server.
+# the parasol bundle keeps its SlickGrid classes inside it, so attachGrid is called on no rows to make a grid whose
+#   constructor is used for the paged grid
+PAGED_GRID_SCRIPT = """
+function parasolPagedGrid(ps, container, rowsPath, pageRows) {
+  var config = ps.state;
+  var data = config.data;
+  config.data = [];
+  ps.attachGrid({container: container});
+  config.data = data;
+  var Grid = config.grid.constructor;
+  config.grid.destroy();
+
+  var pages = {};
+  var waiting = {};
+  var total = 0;
+  var sortColumn = null;
+  var descending = false;
+  var generation = 0;
+  // the server keeps the rows the grid shows as a filter the pages ask for by its token, null for every row
+  var rowFilter = null;
+  var filterMask = null;
+  var filterReady = true;
+  var columnsSet = false;
+  var rows = {
+    getLength: function() { return total; },
+    getItem: function(i) {
+      var page = pages[Math.floor(i / pageRows)];
+      return page ? page[i % pageRows] : {};
+    }
+  };
+  var grid = new Grid(container, rows, [], {enableCellNavigation: true, enableColumnReorder: true});
+  config.grid = grid;
+
+  function keepPages(first, last) {
+    Object.keys(pages).forEach(function(page) {
+      if (page < first - 1 || page > last + 1) { delete pages[page]; }
+    });
+  }
+  function loadPage(page) {
+    if (pages[page] || waiting[page] || !filterReady) { return; }
+    waiting[page] = true;
+    var requestGeneration = generation;
+    var url = rowsPath + '?start=' + (page * pageRows) + '&count=' + pageRows;
+    if (sortColumn !== null) {
+      url += '&sort=' + encodeURIComponent(sortColumn) + '&descending=' + (descending ? 1 : 0);
+    }
+    if (rowFilter !== null) { url += '&filter=' + encodeURIComponent(rowFilter); }
+    fetch(url).then(function(response) {
+      // the server forgot the filter, so it is posted again
+      if (response.status === 404 && rowFilter !== null) {
+        if (requestGeneration === generation) { postFilter(filterMask); }
+        return null;
+      }
+      return response.json();
+    }).then(function(message) {
+      if (message === null || requestGeneration !== generation) { return; }
+      delete waiting[page];
+      if (!columnsSet) {
+        columnsSet = true;
+        grid.setColumns(['id'].concat(message.columns).map(function(name) {
+          return {id: name, name: name, field: name, sortable: true};
+        }));
+      }
+      // columns worked out in the page, like clusters, aren't in the data file and are taken from the page's data
+      var pageColumns = grid.getColumns().map(function(column) { return column.field; }).filter(function(field) {
+        return field !== 'id' && message.columns.indexOf(field) === -1;
+      });
+      pages[page] = message.rows.map(function(row, r) {
+        var d = {id: String(message.ids[r])};
+        message.columns.forEach(function(name, c) { d[name] = row[c]; });
+        var pageRow = data[message.ids[r]] || {};
+        pageColumns.forEach(function(name) { d[name] = pageRow[name] === undefined ? '' : pageRow[name]; });
+        return d;
+      });
+      if (total !== message.total) {
+        total = message.total;
+        grid.updateRowCount();
+      }
+      var viewport = grid.getViewport();
+      keepPages(Math.floor(viewport.top / pageRows), Math.floor(viewport.bottom / pageRows));
+      var changed = [];
+      for (var i = page * pageRows; i < (page + 1) * pageRows; i++) { changed.push(i); }
+      grid.invalidateRows(changed);
+      grid.render();
+    });
+  }
+  function loadViewport() {
+    var viewport = grid.getViewport();
+    var last = Math.max(Math.floor(viewport.top / pageRows), Math.floor(viewport.bottom / pageRows));
+    for (var page = Math.floor(viewport.top / pageRows); page <= last; page++) { loadPage(page); }
+  }
+  function reload() {
+    generation++;
+    pages = {};
+    waiting = {};
+    grid.invalidateAllRows();
+    grid.render();
+    loadViewport();
+  }
+  // the rows to show are posted as a bit for every row of the data, lowest bit first
+  function postFilter(mask) {
+    generation++;
+    filterMask = mask;
+    filterReady = false;
+    var postGeneration = generation;
+    var text = '';
+    for (var i = 0; i < mask.length; i += 32768) {
+      text += String.fromCharCode.apply(null, mask.subarray(i, i + 32768));
+    }
+    fetch(rowsPath, {method: 'POST', headers: {'Content-Type': 'application/json'},
+                     body: JSON.stringify({rows: btoa(text)})})
+      .then(function(response) { return response.json(); }).then(function(message) {
+        if (postGeneration !== generation) { return; }
+        rowFilter = message.filter;
+        filterReady = true;
+        reload();
+      });
+  }
+  function showRows(shown) {
+    if (shown === null) {
+      rowFilter = null;
+      filterMask = null;
+      filterReady = true;
+      reload();
+      return;
+    }
+    var mask = new Uint8Array(Math.ceil(data.length / 8));
+    var count = 0;
+    shown.forEach(function(d) {
+      var id = +d.id;
+      if (!(mask[id >> 3] & (1 << (id & 7)))) {
+        mask[id >> 3] |= 1 << (id & 7);
+        count++;
+      }
+    });
+    if (count === data.length) {
+      showRows(null);
+    } else {
+      postFilter(mask);
+    }
+  }
+  function rowData(row) {
+    var item = rows.getItem(row);
+    return item.id === undefined ? null : data[+item.id];
+  }
+
+  grid.onViewportChanged.subscribe(loadViewport);
+  grid.onSort.subscribe(function(e, args) {
+    sortColumn = args.sortCol.field;
+    descending = !args.sortAsc;
+    reload();
+  });
+  grid.onMouseEnter.subscribe(function(e) {
+    var d = rowData(grid.getCellFromEvent(e).row);
+    if (d) { ps.linked.forEach(function(pc) { pc.highlight([d]); }); }
+  });
+  grid.onMouseLeave.subscribe(function() {
+    ps.linked.forEach(function(pc) { pc.unhighlight(); });
+  });
+  grid.onClick.subscribe(function(e, args) {
+    var d = rowData(args.row);
+    if (d) {
+      ps.linked.forEach(function(pc) { pc.mark([d]); });
+      config.marked = ps.linked[0].marked();
+    }
+  });
+  // parasol updates the grid with the brushed rows or new columns, the same way as its own grid the paged grid
+  //   shows the brushed rows (every row if nothing is brushed) and the marked rows, asking the server for them
+  ps.gridUpdate = function(args) {
+    args = args || {};
+    data = config.data;
+    if (args.columns) {
+      columnsSet = true;
+      grid.setColumns(args.columns);
+    }
+    var shown = args.data || null;
+    if (shown === null) {
+      shown = config.selections();
+      if (shown.length === 0) { shown = null; }
+    }
+    if (shown !== null && config.marked.length) { shown = shown.concat(config.marked); }
+    showRows(shown);
+    return ps;
+  };
+  reload();
+  return grid;
+}
+"""
+
+
+# this class answers the requests of a paged grid for rows of the data file a parasol application loads
+# the data file is read the first time rows are asked for, and again when it changes. the order of a column is
+#   worked out the first time the grid is sorted by it and kept until the data changes, so every page after that
+#   only picks its rows out of the order.
+# data file name is a function returning the name of the data file, memory files is the store of the local server
+#   for data given in memory
+class RowPager:
+    def __init__(self, data_file_name, memory_files=None):
+        self.__data_file_name = data_file_name
+        self.__memory_files = memory_files
+        self.__data_frame = None
+        self.__signature = None
+        self.__sort_orders = {}
+        self.__row_filters = OrderedDict()
+        self.__next_filter = 0
+        self.__lock = Lock()
+
+    # this function returns the pager without its lock and the data it read, so it can be pickled for a worker process
+    #   that can't be forked. the data is read again the first time rows are asked for.
+    def __getstate__(self):
+        state = dict(vars(self))
+        del state['_RowPager__lock']
+        state['_RowPager__data_frame'] = None
+        state['_RowPager__signature'] = None
+        state['_RowPager__sort_orders'] = {}
+        state['_RowPager__row_filters'] = OrderedDict()
+        return state
+
+    # this function gives a pager that was unpickled a lock of its own
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self.__lock = Lock()
+
+    # this function returns a page of rows as a dictionary of the total number of rows, the start row, the column
+    #   names, the id (the row number in the page's data) of every row, and the rows as lists of cells
+    # sort column sorts the rows by a column before the page is cut out of them, descending reverses the order
+    # row filter is the token of a filter from add_filter, only its rows are paged. a filter that was forgotten or was
+    #   made for data that has changed since raises a LookupError.
+    def page(self, start=0, count=DEFAULT_PAGE_ROWS, sort_column=None, descending=False, row_filter=None):
+        with self.__lock:
+            data_frame = self.__load__()
+            if sort_column is not None and sort_column not in data_frame.columns:
+                raise ValueError("no column named " + sort_column)
+            filter_entry = None
+            if row_filter is not None:
+                filter_entry = self.__row_filters.get(row_filter)
+                if filter_entry is None or filter_entry['signature'] != self.__signature:
+                    raise LookupError("no row filter " + row_filter)
+            number_of_rows = data_frame.shape[0] if filter_entry is None else len(filter_entry['row_ids'])
+            start = min(max(0, start), number_of_rows)
+            end = min(number_of_rows, start + min(max(0, count), MAX_PAGE_ROWS))
+            if sort_column is None:
+                row_ids = list(range(start, end)) if filter_entry is None else \
+                    filter_entry['row_ids'][start:end].tolist()
+            else:
+                row_ids = self.__sorted_ids__(data_frame, sort_column, descending, start, end, filter_entry)
+        page_frame = data_frame.iloc[row_ids]
+        columns = [self.__cells__(page_frame.iloc[:, column_number]) for column_number in
+                   range(page_frame.shape[1])]
+        return {'total': number_of_rows, 'start': start, 'columns': [str(name) for name in data_frame.columns],
+                'ids': row_ids, 'rows': [list(row) for row in zip(*columns)]}
+
+    # this function keeps the rows the grid shows and returns the token pages of them are asked for with
+    # mask bytes has a bit for every row of the data, lowest bit first, set for the rows to show. the latest
+    #   MAX_ROW_FILTERS filters are kept.
+    def add_filter(self, mask_bytes):
+        with self.__lock:
+            number_of_rows = self.__load__().shape[0]
+            if len(mask_bytes) != (number_of_rows + 7) // 8:
+                raise ValueError("a row filter needs a bit for each of the " + str(number_of_rows) + " rows")
+            row_mask = unpackbits(frombuffer(mask_bytes, dtype=uint8), count=number_of_rows,
+                                  bitorder='little').astype(bool)
+            token = str(self.__next_filter)
+            self.__next_filter += 1
+            self.__row_filters[token] = {'signature': self.__signature, 'row_mask': row_mask,
+                                         'row_ids': self.__small_ids__(flatnonzero(row_mask)), 'sort_orders': {}}
+            while len(self.__row_filters) > MAX_ROW_FILTERS:
+                self.__row_filters.popitem(last=False)
+            return {'filter': token, 'total': len(self.__row_filters[token]['row_ids'])}
+
+    # this function keeps a row filter posted by the page as base64 text, see add_filter
+    def add_encoded_filter(self, encoded_mask):
+        if type(encoded_mask) is not str:
+            raise ValueError("rows must be base64 text")
+        try:
+            mask_bytes = b64decode(encoded_mask, validate=True)
+        except Base64Error:
+            raise ValueError("rows must be base64 text")
+        return self.add_filter(mask_bytes)
+
+    # this function returns the data the page loads as a DataFrame, reading it again if the data file changed
+    # the DataFrame is shared with the pager, so it must not be changed
+    def data(self):
+        with self.__lock:
+            return self.__load__()
+
+    # this function returns the data, reading it again if the data file changed
+    def __load__(self):
+        file_name = self.__data_file_name()
+        memory_file = self.__memory_files.get(file_name) if self.__memory_files is not None else None
+        if memory_file is not None:
+            signature = [file_name, memory_file['tag']]
+        else:
+            file_stat = stat(file_name)
+            signature = [file_name, file_stat.st_size, file_stat.st_mtime_ns]
+        if signature != self.__signature:
+            if memory_file is not None:
+                self.__data_frame = decode_columnar(memory_file['bytes'])
+            else:
+                with open(file_name, 'rb') as file_in:
+                    is_columnar = file_in.read(len(COLUMNAR_MAGIC)) == COLUMNAR_MAGIC
+                if is_columnar:
+                    with open(file_name, 'rb') as file_in:
+                        self.__data_frame = decode_columnar(file_in.read())
+                else:
+                    self.__data_frame = read_data_csv(file_name)
+            self.__signature = signature
+            self.__sort_orders = {}
+        return self.__data_frame
+
+    # this function returns the ids of the rows from start to end once the data is sorted by a column
+    # empty cells of numeric columns come last in either direction
+    # with a filter, the rows of the filter are picked out of the order of every row once and kept with the filter
+    def __sorted_ids__(self, data_frame, sort_column, descending, start, end, filter_entry=None):
+        if sort_column not in self.__sort_orders:
+            self.__sort_orders[sort_column] = self.__sort_order__(data_frame[sort_column])
+        order, number_of_empty = self.__sort_orders[sort_column]
+        if filter_entry is not None:
+            if sort_column not in filter_entry['sort_orders']:
+                kept = filter_entry['row_mask'][order]
+                filter_entry['sort_orders'][sort_column] = [order[kept],
+                                                            int(kept[len(order) - number_of_empty:].sum())]
+            order, number_of_empty = filter_entry['sort_orders'][sort_column]
+        if descending:
+            number_of_values = len(order) - number_of_empty
+            order = concatenate([order[:number_of_values][::-1], order[number_of_values:]])
+        return order[start:end].tolist()
+
+    # this function returns the row ids of a column in ascending order, and how many empty cells are at the end
+    # a column that only has numbers (and empty cells) is sorted as numbers, anything else is sorted as text
+    @staticmethod
+    def __sort_order__(column):
+        if is_numeric_dtype(column) and not is_bool_dtype(column):
+            values = column.to_numpy(dtype=float64, na_value=float('nan'))
+        else:
+            text_values = column.astype(str)
+            is_empty = (text_values == '').to_numpy()
+            values = to_numeric(text_values.mask(is_empty), errors='coerce').to_numpy(dtype=float64)
+            if (isnan(values) & ~is_empty).any():
+                return RowPager.__small_ids__(argsort(text_values.to_numpy(), kind='stable')), 0
+        # numpy puts nan last
+        return RowPager.__small_ids__(argsort(values, kind='stable')), int(isnan(values).sum())
+
+    # this function returns row ids as 32 bit integers when they fit, to halve the memory of a kept order
+    @staticmethod
+    def __small_ids__(row_ids):
+        return row_ids.astype(int32) if len(row_ids) < 2 ** 31 else row_ids
+
+    # this function returns the cells of a column of a page as json values, empty numbers are empty strings
+    @staticmethod
+    def __cells__(column):
+        if is_numeric_dtype(column) and not is_bool_dtype(column):
+            return ['' if value != value else value for value in column.tolist()]
+        return column.astype(str).tolist()
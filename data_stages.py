@@ -0,0 +1,528 @@
+from csv import writer
+
+from numpy import arange
+from numpy import asarray
+from numpy import argsort
+from numpy import bincount
+from numpy import column_stack
+from numpy import concatenate
+from numpy import fill_diagonal
+from numpy import floor
+from numpy import fmax
+from numpy import fmin
+from numpy import float64
+from numpy import inf
+from numpy import int64
+from numpy import isinf
+from numpy import isnan
+from numpy import lexsort
+from numpy import minimum
+from numpy import nan
+from numpy import nanargmax
+from numpy import nanargmin
+from numpy import nanmean
+from numpy import nanquantile
+from numpy import nanstd
+from numpy import ones
+from numpy import searchsorted
+from numpy import sort
+from numpy import stack
+from numpy import unique
+from numpy import where
+from numpy import zeros
+from numpy.random import default_rng
+from pandas import read_csv
+from pandas import to_numeric
+
+from combine_csv import get_header_list
+
+# names of the row sampling strategies
+SAMPLING_STRATEGIES = ["random", "stratified", "extremes"]
+# number of quantile bins each numeric column is split into when sampling is stratified
+STRATA_PER_COLUMN = 10
+# number of rows checked at a time when finding non-dominated rows
+DOMINANCE_BLOCK_SIZE = 4096
+# number of front rows compared against a block at a time when finding non-dominated rows
+DOMINANCE_CHUNK_SIZE = 64
+# number of rows in every batch of mini-batch k-means
+KMEANS_BATCH_SIZE = 4096
+# number of batches used to fit the k-means centers
+KMEANS_ITERATIONS = 100
+# clusters found when compiling label the rows appended after it until the rows grow by this share of the rows the
+#   clusters were found from, then the clusters are found again
+CLUSTER_REFIT_SHARE = 0.25
+# number of rows read at a time when weighted sums are added to a data file
+WEIGHTED_SUM_CHUNK_SIZE = 100000
+
+
+# this function returns the positions of the named columns in a DataFrame, using the first column with each name
+# names that aren't in the DataFrame are skipped
+def find_column_positions(data_frame, column_names):
+    column_list = [str(column) for column in data_frame.columns]
+    return [column_list.index(name) for name in column_names if name in column_list]
+
+
+# this function converts columns of a DataFrame of strings into a 2d float array
+# cells that aren't numbers become nan, if no column positions are given every column is converted
+def numeric_matrix(data_frame, column_positions=None):
+    if column_positions is None:
+        column_positions = range(data_frame.shape[1])
+    columns = [to_numeric(data_frame.iloc[:, position], errors='coerce').to_numpy(dtype=float64)
+               for position in column_positions]
+    if not columns:
+        return zeros((data_frame.shape[0], 0))
+    return column_stack(columns)
+
+
+# this function picks which rows to keep so that at most max_rows rows are drawn
+# strategy is one of SAMPLING_STRATEGIES:
+#   "random" keeps a uniform random sample of rows.
+#   "stratified" splits the rows into strata by the stratify columns (quantile bins for numeric columns, the values
+#       themselves for text columns) and samples every stratum in proportion to its size.
+#   "extremes" keeps the rows holding the minimum and maximum of every numeric column and fills the rest randomly.
+# returns a sorted array of the row positions to keep
+def downsample_rows(data_frame, max_rows, strategy="random", stratify_columns=None, seed=None):
+    number_of_rows = data_frame.shape[0]
+    if number_of_rows <= max_rows:
+        return arange(number_of_rows)
+    random_generator = default_rng(seed)
+
+    if strategy == "stratified":
+        stratum_ids = __find_strata__(data_frame, stratify_columns)
+        return __sample_strata__(stratum_ids, max_rows, random_generator)
+
+    if strategy == "extremes":
+        values = numeric_matrix(data_frame)
+        # only columns with at least one number have extremes to keep
+        has_numbers = ~isnan(values).all(axis=0)
+        values = values[:, has_numbers]
+        extreme_rows = unique(concatenate([nanargmin(values, axis=0), nanargmax(values, axis=0)]))
+        if len(extreme_rows) >= max_rows:
+            return sort(random_generator.choice(extreme_rows, max_rows, replace=False))
+        is_extreme = zeros(number_of_rows, dtype=bool)
+        is_extreme[extreme_rows] = True
+        other_rows = arange(number_of_rows)[~is_extreme]
+        filler_rows = random_generator.choice(other_rows, max_rows - len(extreme_rows), replace=False)
+        return sort(concatenate([extreme_rows, filler_rows]))
+
+    return sort(random_generator.choice(number_of_rows, max_rows, replace=False))
+
+
+# this function gives every row the id of its stratum
+# numeric columns are split into quantile bins, other columns use each distinct value as a bin
+def __find_strata__(data_frame, stratify_columns):
+    number_of_rows = data_frame.shape[0]
+    if not stratify_columns:
+        return zeros(number_of_rows, dtype=int)
+    bin_columns = []
+    for position in find_column_positions(data_frame, stratify_columns):
+        values = numeric_matrix(data_frame, [position])[:, 0]
+        if isnan(values).all():
+            bin_columns.append(data_frame.iloc[:, position].factorize()[0])
+            continue
+        edges = unique(nanquantile(values, arange(1, STRATA_PER_COLUMN) / STRATA_PER_COLUMN))
+        bins = searchsorted(edges, values, side='right')
+        # empty cells get a bin of their own
+        bins[isnan(values)] = len(edges) + 1
+        bin_columns.append(bins)
+    if not bin_columns:
+        return zeros(number_of_rows, dtype=int)
+    # bins of all the columns are combined into one key, renumbered after every column to keep keys small
+    stratum_keys = zeros(number_of_rows, dtype=int64)
+    for bins in bin_columns:
+        stratum_keys = stratum_keys * (int(bins.max()) + 1) + bins
+        stratum_keys = unique(stratum_keys, return_inverse=True)[1].reshape(-1)
+    return stratum_keys
+
+
+# this function samples max_rows rows so that every stratum keeps its share of the rows
+# quotas are rounded with the largest remainder method so they add up to max_rows exactly
+def __sample_strata__(stratum_ids, max_rows, random_generator):
+    number_of_rows = len(stratum_ids)
+    stratum_sizes = bincount(stratum_ids)
+    exact_quotas = stratum_sizes * (max_rows / number_of_rows)
+    quotas = floor(exact_quotas).astype(int)
+    remaining = max_rows - quotas.sum()
+    if remaining > 0:
+        quotas[argsort(-(exact_quotas - quotas), kind='stable')[:remaining]] += 1
+
+    # shuffles the rows, groups them by stratum and keeps the first quota rows of every stratum
+    random_keys = random_generator.random(number_of_rows)
+    order = lexsort((random_keys, stratum_ids))
+    sorted_strata = stratum_ids[order]
+    stratum_starts = concatenate([[0], stratum_sizes.cumsum()[:-1]])
+    rank_in_stratum = arange(number_of_rows) - stratum_starts[sorted_strata]
+    keep = rank_in_stratum < quotas[sorted_strata]
+    return sort(order[keep])
+
+
+# this function builds the matrix of objective values of every row, turned around so that lower is always better
+# senses is a list of "min" or "max" for every objective
+def objective_matrix(data_frame, objectives, senses):
+    values = numeric_matrix(data_frame, find_column_positions(data_frame, objectives))
+    for objective_number, sense in enumerate(senses):
+        if sense == "max":
+            values[:, objective_number] = -values[:, objective_number]
+    return values
+
+
+# this function removes the points of a block that any point of the front dominates
+# the front and the block hold distinct points and every front point sorts before the block, so a front point that
+#   is no worse than a block point in every objective dominates it.
+# the front is checked in chunks, starting from its best points, and dominated points are dropped after every chunk
+#   so most points are rejected after comparing with only a few front points
+# returns the positions of the block points that are left
+def __remove_dominated__(front, block, chunk_size=DOMINANCE_CHUNK_SIZE):
+    positions = arange(len(block))
+    for start in range(0, len(front), chunk_size):
+        chunk = front[start:start + chunk_size, None, :]
+        dominated = (chunk <= block[None, positions, :]).all(axis=2).any(axis=0)
+        positions = positions[~dominated]
+        if len(positions) == 0:
+            break
+    return positions
+
+
+# this function returns a mask of the rows that no other row dominates (the first pareto front)
+# a row dominates another when it is no worse in every objective and better in at least one.
+# duplicate rows are merged first, then the rows are sorted by the sum of their objectives: a row can only be
+#   dominated by rows that come before it, so the rows are checked block by block against the front found so far
+#   and the front never has to be pruned.
+# rows with missing objective values are never on the front
+def nondominated_mask(values, block_size=DOMINANCE_BLOCK_SIZE):
+    mask = zeros(len(values), dtype=bool)
+    is_complete = ~isnan(values).any(axis=1)
+    if not is_complete.any():
+        return mask
+    complete_rows = arange(len(values))[is_complete]
+    distinct_values, inverse = unique(values[is_complete], axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = lexsort(tuple(distinct_values.T[::-1]) + (distinct_values.sum(axis=1),))
+    sorted_values = distinct_values[order]
+
+    front_positions = []
+    front = sorted_values[:0]
+    for start in range(0, len(order), block_size):
+        block = sorted_values[start:start + block_size]
+        positions = __remove_dominated__(front, block)
+        # points left in the block are only compared with each other, a point is never compared with itself
+        candidates = block[positions]
+        no_worse = (candidates[:, None, :] <= candidates[None, :, :]).all(axis=2)
+        fill_diagonal(no_worse, False)
+        positions = positions[~no_worse.any(axis=0)]
+        if len(positions):
+            front_positions.append(start + positions)
+            front = sorted_values[concatenate(front_positions)]
+
+    is_front_value = zeros(len(distinct_values), dtype=bool)
+    if front_positions:
+        is_front_value[order[concatenate(front_positions)]] = True
+    mask[complete_rows] = is_front_value[inverse]
+    return mask
+
+
+# this function gives every row the number of its pareto front, found by peeling off one front at a time
+# rows on the first front get 1, rows with missing objective values get 0
+def nondominated_ranks(values, block_size=DOMINANCE_BLOCK_SIZE):
+    ranks = zeros(len(values), dtype=int)
+    remaining_rows = arange(len(values))[~isnan(values).any(axis=1)]
+    front_number = 1
+    while len(remaining_rows):
+        on_front = nondominated_mask(values[remaining_rows], block_size)
+        ranks[remaining_rows[on_front]] = front_number
+        remaining_rows = remaining_rows[~on_front]
+        front_number += 1
+    return ranks
+
+
+# this function cuts every objective with an epsilon into boxes of that size
+# returns the box of every row, objectives without an epsilon (None or 0) keep their exact values
+def epsilon_boxes(values, epsilons):
+    epsilon_array = asarray([epsilon if epsilon else 0 for epsilon in epsilons], dtype=float64)
+    has_epsilon = epsilon_array > 0
+    return where(has_epsilon, floor(values / where(has_epsilon, epsilon_array, 1)), values)
+
+
+# this function returns a mask of the rows kept by an epsilon-box archive
+# the pareto front is found between the epsilon boxes of the rows (see epsilon_boxes) and every non-dominated
+#   box keeps one row, the one closest to the box's best corner.
+def epsilon_nondominated_mask(values, epsilons, block_size=DOMINANCE_BLOCK_SIZE):
+    boxes = epsilon_boxes(values, epsilons)
+    epsilon_array = asarray([epsilon if epsilon else 0 for epsilon in epsilons], dtype=float64)
+    # distance of every row to the best corner of its box, in units of epsilon
+    safe_epsilons = where(epsilon_array > 0, epsilon_array, 1)
+    corner_distance = where(epsilon_array > 0, (values - boxes * safe_epsilons) / safe_epsilons, 0)
+    corner_distance = (corner_distance ** 2).sum(axis=1)
+
+    # one row per box: sorts the rows by box and distance and keeps the first row of every box
+    is_complete = ~isnan(values).any(axis=1)
+    complete_rows = arange(len(values))[is_complete]
+    complete_boxes = boxes[is_complete]
+    order = lexsort((corner_distance[is_complete],) + tuple(complete_boxes.T[::-1]))
+    sorted_boxes = complete_boxes[order]
+    is_first_in_box = ones(len(order), dtype=bool)
+    is_first_in_box[1:] = (sorted_boxes[1:] != sorted_boxes[:-1]).any(axis=1)
+    box_rows = complete_rows[order[is_first_in_box]]
+
+    mask = zeros(len(values), dtype=bool)
+    mask[box_rows[nondominated_mask(boxes[box_rows], block_size)]] = True
+    return mask
+
+
+# this function returns the mean and standard deviation standardize_columns scales every column with
+# columns without any numbers get a mean of 0, constant columns get a standard deviation of 1
+def column_scales(values):
+    means = nanmean(values, axis=0)
+    deviations = nanstd(values, axis=0)
+    deviations[~(deviations > 0)] = 1
+    return where(isnan(means), 0, means), deviations
+
+
+# this function scales every column to mean 0 and standard deviation 1, missing values become 0 (the mean)
+# constant columns are only centered. if means and deviations are given, the columns are scaled with them instead
+def standardize_columns(values, means=None, deviations=None):
+    if means is None:
+        means, deviations = column_scales(values)
+    standardized = (values - means) / deviations
+    standardized[isnan(standardized)] = 0
+    return standardized
+
+
+# this function returns the position of the nearest center for every row, computed in chunks of rows
+def nearest_centers(values, centers, chunk_size=KMEANS_BATCH_SIZE):
+    labels = zeros(len(values), dtype=int)
+    center_norms = (centers ** 2).sum(axis=1)
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        # squared distance without the row norm, which is the same for every center
+        distances = center_norms[None, :] - 2 * (chunk @ centers.T)
+        labels[start:start + chunk_size] = distances.argmin(axis=1)
+    return labels
+
+
+# this function picks the starting centers with k-means++: each new center is picked with a probability
+#   proportional to the squared distance to the nearest center picked so far
+def __kmeans_plus_plus__(values, number_of_clusters, random_generator):
+    centers = [values[random_generator.integers(len(values))]]
+    closest_distances = ((values - centers[0]) ** 2).sum(axis=1)
+    for center_number in range(1, number_of_clusters):
+        total = closest_distances.sum()
+        if total > 0:
+            new_center = values[random_generator.choice(len(values), p=closest_distances / total)]
+        else:
+            new_center = values[random_generator.integers(len(values))]
+        centers.append(new_center)
+        closest_distances = minimum(closest_distances, ((values - new_center) ** 2).sum(axis=1))
+    return stack(centers).astype(float64)
+
+
+# this function clusters the rows with k-means on standardized values and returns the cluster of every row, and the
+#   clusters as a dictionary of the means and deviations the columns were scaled with and the center of every
+#   cluster, in cluster number order
+# datasets up to batch_size rows use the full k-means algorithm, larger ones use mini-batch k-means, which updates
+#   the centers from random batches of rows and then labels every row once, in chunks. the starting centers are picked
+#   with k-means++.
+# clusters are numbered from largest to smallest so the same data and seed always give the same colors
+# the clusters are None if there are no rows, see nearest_clusters
+def kmeans_clusters(values, number_of_clusters, seed=None, batch_size=KMEANS_BATCH_SIZE,
+                    iterations=KMEANS_ITERATIONS):
+    number_of_rows = len(values)
+    if number_of_rows == 0:
+        return zeros(0, dtype=int), None
+    random_generator = default_rng(seed)
+    means, deviations = column_scales(values)
+    values = standardize_columns(values, means, deviations)
+    number_of_clusters = min(number_of_clusters, number_of_rows)
+    start_sample = values[random_generator.choice(number_of_rows, min(number_of_rows, batch_size), replace=False)]
+    centers = __kmeans_plus_plus__(start_sample, number_of_clusters, random_generator)
+
+    center_counts = zeros(number_of_clusters)
+    for iteration in range(iterations):
+        if number_of_rows <= batch_size:
+            batch = values
+        else:
+            batch = values[random_generator.integers(0, number_of_rows, batch_size)]
+        batch_labels = nearest_centers(batch, centers)
+        batch_counts = bincount(batch_labels, minlength=number_of_clusters)
+        batch_sums = column_stack([bincount(batch_labels, weights=batch[:, column], minlength=number_of_clusters)
+                                   for column in range(batch.shape[1])])
+        has_rows = batch_counts > 0
+        batch_means = batch_sums[has_rows] / batch_counts[has_rows, None]
+        if number_of_rows <= batch_size:
+            # full k-means: every center moves to the mean of its rows
+            moved = abs(batch_means - centers[has_rows]).max() if has_rows.any() else 0
+            centers[has_rows] = batch_means
+            if moved < 1e-9:
+                break
+        else:
+            # mini-batch k-means: each center moves towards the batch mean by its share of all rows it has seen
+            center_counts += batch_counts
+            learning_rates = batch_counts[has_rows] / center_counts[has_rows]
+            centers[has_rows] += learning_rates[:, None] * (batch_means - centers[has_rows])
+
+    labels = nearest_centers(values, centers)
+    # renumbering the clusters from largest to smallest, ties keep the order of the centers
+    cluster_order = argsort(-bincount(labels, minlength=number_of_clusters), kind='stable')
+    new_numbers = zeros(number_of_clusters, dtype=int)
+    new_numbers[cluster_order] = arange(number_of_clusters)
+    return new_numbers[labels], {'means': means, 'deviations': deviations, 'centers': centers[cluster_order]}
+
+
+# this function returns the cluster of every row from the clusters kmeans_clusters found for other rows
+# the rows are scaled the same way those rows were, and get the number of their nearest center
+def nearest_clusters(values, clusters):
+    values = standardize_columns(values, asarray(clusters['means'], dtype=float64),
+                                 asarray(clusters['deviations'], dtype=float64))
+    return nearest_centers(values, asarray(clusters['centers'], dtype=float64))
+
+
+# this function returns the lowest and highest number of every column, ignoring missing values
+# columns without any numbers get nan for both
+def column_ranges(values):
+    lows = where(isnan(values), inf, values).min(axis=0, initial=inf)
+    highs = where(isnan(values), -inf, values).max(axis=0, initial=-inf)
+    no_numbers = isinf(lows)
+    lows[no_numbers] = nan
+    highs[no_numbers] = nan
+    return lows, highs
+
+
+# this function computes weighted sums the same way Parasol does in the browser
+# every column is scaled to 0-1 with its lowest and highest number, and the scaled values are multiplied by their
+#   weights and added up. missing values and constant columns add nothing to the sum.
+# the sums still have to be scaled to 0-1 with scale_scores once the range of every sum is known
+def weighted_sum_scores(values, weights, lows, highs):
+    spans = highs - lows
+    spans[~(spans > 0)] = inf
+    normalized = (values - lows) / spans
+    normalized[isnan(normalized)] = 0
+    return normalized @ asarray(weights, dtype=float64)
+
+
+# this function scales weighted sums to 0-1 with the lowest and highest sum, all sums are 0 if they are equal
+def scale_scores(scores, low, high):
+    if not high > low:
+        return zeros(len(scores))
+    return (scores - low) / (high - low)
+
+
+# this function adds weighted sum columns to a DataFrame of strings
+# weighted sums is a list of [sum name, variable list, weight list], every sum is added as a column named sum name
+# if a sum ranges list is given, the ranges every sum was scaled with are added to it, see extend_weighted_sums
+def add_weighted_sums(data_frame, weighted_sums, sum_ranges=None):
+    for sum_name, variable_list, weight_list in weighted_sums:
+        positions, weights = __weighted_positions__([str(c) for c in data_frame.columns], variable_list, weight_list)
+        values = numeric_matrix(data_frame, positions)
+        lows, highs = column_ranges(values)
+        scores = weighted_sum_scores(values, weights, lows, highs)
+        score_low, score_high = scores.min(initial=inf), scores.max(initial=-inf)
+        if sum_ranges is not None:
+            sum_ranges.append(__sum_range__(lows, highs, score_low, score_high))
+        scores = scale_scores(scores, score_low, score_high)
+        data_frame.insert(data_frame.shape[1], sum_name, scores.astype(str), allow_duplicates=True)
+    return data_frame
+
+
+# this function adds weighted sum columns to rows appended after the sums were worked out for the rows before them
+# the new rows are scaled with the ranges of the rows before them, from the sum ranges of add_weighted_sums or
+#   append_weighted_sums, so the sums of the rows before them stay right as long as every new value is inside the
+#   range of its column and every new sum is inside the range of the sums before. if one isn't, False is returned
+#   without adding any column, and the sums of every row have to be worked out again.
+def extend_weighted_sums(data_frame, weighted_sums, sum_ranges):
+    sum_columns = []
+    for (sum_name, variable_list, weight_list), sum_range in zip(weighted_sums, sum_ranges):
+        positions, weights = __weighted_positions__([str(c) for c in data_frame.columns], variable_list, weight_list)
+        values = numeric_matrix(data_frame, positions)
+        lows = asarray(sum_range['lows'], dtype=float64)
+        highs = asarray(sum_range['highs'], dtype=float64)
+        new_lows, new_highs = column_ranges(values)
+        # a column that had no numbers gets nan ranges, so any number added to it is outside them
+        if ((new_lows < lows) | (new_highs > highs) | (isnan(lows) & ~isnan(new_lows))).any():
+            return False
+        scores = weighted_sum_scores(values, weights, lows, highs)
+        if scores.min(initial=inf) < sum_range['score_low'] or scores.max(initial=-inf) > sum_range['score_high']:
+            return False
+        sum_columns.append([sum_name, scale_scores(scores, sum_range['score_low'], sum_range['score_high'])])
+    for sum_name, scores in sum_columns:
+        data_frame.insert(data_frame.shape[1], sum_name, scores.astype(str), allow_duplicates=True)
+    return True
+
+
+# this function returns the ranges a weighted sum was scaled with as json data
+def __sum_range__(lows, highs, score_low, score_high):
+    return {'lows': lows.tolist(), 'highs': highs.tolist(), 'score_low': float(score_low),
+            'score_high': float(score_high)}
+
+
+# this function adds weighted sum columns to a csv data file without loading the whole file, writing a new file
+# the file is read in chunks of chunk_size rows: a first pass over the weighted columns finds their ranges, a
+#   second one finds the range of every sum, and the last one writes every row with its sums added
+# if a sum ranges list is given, the ranges every sum was scaled with are added to it, see extend_weighted_sums
+def append_weighted_sums(csv_file_name, output_csv_name, weighted_sums, chunk_size=WEIGHTED_SUM_CHUNK_SIZE,
+                         sum_ranges=None):
+    header = get_header_list([csv_file_name])[0]
+    sum_columns = [__weighted_positions__(header, variable_list, weight_list)
+                   for sum_name, variable_list, weight_list in weighted_sums]
+    used_positions = sorted(set(position for positions, weights in sum_columns for position in positions))
+
+    # first pass: lowest and highest number of every weighted column
+    column_lows = {}
+    column_highs = {}
+    for chunk in __read_csv_chunks__(csv_file_name, header, chunk_size, used_positions):
+        chunk_lows, chunk_highs = column_ranges(numeric_matrix(chunk))
+        for position, low, high in zip(used_positions, chunk_lows, chunk_highs):
+            column_lows[position] = fmin(column_lows.get(position, nan), low)
+            column_highs[position] = fmax(column_highs.get(position, nan), high)
+
+    # this function works out the unscaled sums of one chunk, the chunk's columns are named by position
+    def chunk_scores(chunk):
+        chunk_columns = list(chunk.columns)
+        scores = []
+        for positions, weights in sum_columns:
+            values = numeric_matrix(chunk, [chunk_columns.index(position) for position in positions])
+            lows = asarray([column_lows[position] for position in positions], dtype=float64)
+            highs = asarray([column_highs[position] for position in positions], dtype=float64)
+            scores.append(weighted_sum_scores(values, weights, lows, highs))
+        return scores
+
+    # second pass: lowest and highest value of every sum
+    score_lows = [inf] * len(sum_columns)
+    score_highs = [-inf] * len(sum_columns)
+    for chunk in __read_csv_chunks__(csv_file_name, header, chunk_size, used_positions):
+        for sum_number, scores in enumerate(chunk_scores(chunk)):
+            score_lows[sum_number] = min(score_lows[sum_number], scores.min(initial=inf))
+            score_highs[sum_number] = max(score_highs[sum_number], scores.max(initial=-inf))
+    if sum_ranges is not None:
+        for (positions, weights), score_low, score_high in zip(sum_columns, score_lows, score_highs):
+            lows = asarray([column_lows.get(position, nan) for position in positions], dtype=float64)
+            highs = asarray([column_highs.get(position, nan) for position in positions], dtype=float64)
+            sum_ranges.append(__sum_range__(lows, highs, score_low, score_high))
+
+    # last pass: writing every row with its scaled sums
+    with open(output_csv_name, 'w', newline='') as output_file:
+        output_writer = writer(output_file, lineterminator='\n')
+        output_writer.writerow(header + [sum_name for sum_name, variable_list, weight_list in weighted_sums])
+        for chunk in __read_csv_chunks__(csv_file_name, header, chunk_size):
+            for sum_number, scores in enumerate(chunk_scores(chunk)):
+                scores = scale_scores(scores, score_lows[sum_number], score_highs[sum_number])
+                chunk.insert(chunk.shape[1], 'sum ' + str(sum_number), scores.astype(str))
+            chunk.to_csv(output_file, index=False, header=False, lineterminator='\n')
+
+
+# this function returns the positions of the weighted variables in a header list and their weights
+# variables that aren't in the header are skipped, like variables without a weight are in the browser
+def __weighted_positions__(header, variable_list, weight_list):
+    positions = []
+    weights = []
+    for variable, weight in zip(variable_list, weight_list):
+        if variable in header:
+            positions.append(header.index(variable))
+            weights.append(weight)
+    return positions, weights
+
+
+# this function reads a csv data file in chunks of strings, with the columns named by their position
+# if column positions are given, only those columns are read
+def __read_csv_chunks__(csv_file_name, header, chunk_size, column_positions=None):
+    return read_csv(csv_file_name, header=None, skiprows=1, dtype=str, keep_default_na=False,
+                    names=list(range(len(header))), usecols=column_positions, chunksize=chunk_size)
@@ -0,0 +1,243 @@
+from csv import reader
+from io import StringIO
+from json import dumps
+from os import stat
+from threading import Event
+from threading import RLock
+from threading import Thread
+
+from combine_csv import find_column_positions
+from combine_csv import read_header
+from combine_csv import select_columns
+
+# seconds between checks of the watched files for new rows
+DEFAULT_TAIL_INTERVAL = 0.5
+# most bytes read from one file in a single check, the rest is read on the next check
+MAX_TAIL_READ_BYTES = 16 << 20
+
+# javascript that adds rows pushed by the local server to a parasol application
+# new lines are drawn on top of the existing ones, charts are only redrawn completely when a new row is outside
+#   the range of an axis or the lines are curved
+APPEND_ROWS_SCRIPT = """
+function parasolDrawRows(pc, rows, start) {
+  var config = pc.state;
+  if ((config.bundleDimension !== null && config.bundlingStrength > 0) || config.smoothness > 0) { return false; }
+  var keys = Object.keys(config.dimensions);
+  for (var r = 0; r < rows.length; r++) {
+    for (var k = 0; k < keys.length; k++) {
+      var dimension = config.dimensions[keys[k]];
+      var value = rows[r][keys[k]];
+      var domain = dimension.yscale.domain();
+      if (dimension.type === 'number') {
+        if (value !== '' && (+value < Math.min(domain[0], domain[1]) || +value > Math.max(domain[0], domain[1]))) {
+          return false;
+        }
+      } else if (domain.indexOf(value) === -1) {
+        return false;
+      }
+    }
+  }
+  var ctx = pc.ctx.foreground;
+  var color = typeof config.color === 'function' ? config.color : function() { return config.color; };
+  rows.forEach(function(d, i) {
+    ctx.strokeStyle = color(d, start + i);
+    ctx.beginPath();
+    keys.map(function(p) { return [pc.xscale(p), config.dimensions[p].yscale(d[p])]; })
+      .sort(function(a, b) { return a[0] - b[0]; })
+      .forEach(function(point, j) { j === 0 ? ctx.moveTo(point[0], point[1]) : ctx.lineTo(point[0], point[1]); });
+    ctx.stroke();
+  });
+  return true;
+}
+
+function parasolAppendRows(ps, message, grid) {
+  var data = ps.state.data;
+  var start = data.length;
+  var added = message.rows.map(function(row, i) {
+    var d = {};
+    for (var c = 0; c < message.columns.length; c++) {
+      d[message.columns[c]] = row[c] === undefined ? '' : row[c];
+    }
+    d.id = String(start + i);
+    return d;
+  });
+  for (var i = 0; i < added.length; i++) { data.push(added[i]); }
+  ps.charts.forEach(function(pc) {
+    if (pc.state.data !== data) { pc.data(data); }
+    if (!parasolDrawRows(pc, added, start)) {
+      pc.autoscale();
+      pc.render().updateAxes(0);
+    }
+  });
+  if (grid) { ps.gridUpdate({data: data}); }
+}
+"""
+
+
+# this class reads the rows appended to a csv file since the last time it was read
+# the byte offset of the end of the last complete line is kept, so every read only touches the new bytes
+#   and the work doesn't grow with the size of the file
+# reading starts from the end of the file, or from offset if it is given, which must be the start of a line
+class CsvTail:
+    def __init__(self, file_name, column_list=None, offset=None):
+        self.file_name = file_name
+        self.column_list = column_list
+        self.header = []
+        self.column_positions = None
+        self.offset = 0
+        self.rows_read = 0
+        self.truncated = False
+        self.__skip_rows = 0
+        self.seek_end()
+        if offset is not None:
+            self.offset = offset
+            self.__skip_rows = 0
+
+    # this function moves to the end of the file, so only rows appended from now on are read
+    # a last line without a line ending is skipped once it is finished, since it was already read as a row
+    def seek_end(self):
+        with open(self.file_name, 'rb') as file_in:
+            header_line = file_in.readline()
+            self.header = read_header(reader(StringIO(header_line.decode('utf-8'), newline='')))
+            self.column_positions = find_column_positions(self.header, self.column_list)
+            file_size = stat(self.file_name).st_size
+            self.offset = max(self.__find_line_start__(file_in, file_size), len(header_line))
+            self.__skip_rows = 1 if self.offset < file_size else 0
+        self.truncated = False
+
+    # this function returns the offset just after the last line ending before the end offset
+    @staticmethod
+    def __find_line_start__(file_in, end_offset):
+        position = end_offset
+        while position > 0:
+            block_start = max(0, position - 4096)
+            file_in.seek(block_start)
+            block = file_in.read(position - block_start)
+            line_end = block.rfind(b'\n')
+            if line_end >= 0:
+                return block_start + line_end + 1
+            position = block_start
+        return 0
+
+    # this function returns the rows appended since the last read, cut to the kept columns
+    # if the file got smaller it was rewritten, truncated is set and no rows are returned
+    def read_new_rows(self):
+        file_size = stat(self.file_name).st_size
+        if file_size < self.offset:
+            self.truncated = True
+            return []
+        if file_size == self.offset:
+            return []
+        with open(self.file_name, 'rb') as file_in:
+            file_in.seek(self.offset)
+            new_bytes = file_in.read(min(file_size - self.offset, MAX_TAIL_READ_BYTES))
+        # only complete lines are read, a line that is still being written is left for the next read
+        line_end = new_bytes.rfind(b'\n')
+        if line_end < 0:
+            return []
+        self.offset += line_end + 1
+        rows = [row for row in reader(StringIO(new_bytes[:line_end + 1].decode('utf-8'), newline='')) if row]
+        if self.__skip_rows:
+            rows = rows[self.__skip_rows:]
+            self.__skip_rows = 0
+        row_width = len(self.header)
+        new_rows = []
+        for row in rows:
+            if len(row) < row_width:
+                row.extend([''] * (row_width - len(row)))
+            new_rows.append(select_columns(row[:row_width], self.column_positions))
+        self.rows_read += len(new_rows)
+        return new_rows
+
+
+# this function returns the number of data rows in a csv file
+def count_csv_rows(file_name):
+    with open(file_name, 'r', newline='') as csv_file:
+        csv_reader = reader(csv_file)
+        next(csv_reader, None)
+        return sum(1 for row in csv_reader if row)
+
+
+# this class checks the data files of a parasol application for appended rows on a background thread and
+#   publishes them to the open pages as "append" events
+# rows of several files are merged in the order they were appended, the same as combine_csv, and a merged row is
+#   only published once every file has its part of it. rows of a file that was shorter than the others when
+#   compiling were already shown padded, so they are skipped.
+# if a file gets smaller, on_reset is called so the whole application can be compiled again
+class TailWatcher:
+    def __init__(self, file_names, column_lists, publish, interval=DEFAULT_TAIL_INTERVAL, on_reset=None):
+        self.file_names = file_names
+        self.column_lists = column_lists
+        self.interval = interval
+        self.rows_published = 0
+        self.__publish = publish
+        self.__on_reset = on_reset
+        self.__lock = RLock()
+        self.__stopped = Event()
+        self.__thread = None
+        self.resync()
+
+    # this function starts watching from the current end of every file
+    def resync(self):
+        with self.__lock:
+            self.__tails = [CsvTail(file_name, column_list)
+                            for file_name, column_list in zip(self.file_names, self.column_lists)]
+            self.__columns = [name for tail in self.__tails for name in select_columns(tail.header,
+                                                                                         tail.column_positions)]
+            self.__pending = [[] for tail in self.__tails]
+            if len(self.__tails) > 1:
+                self.__row_counts = [count_csv_rows(file_name) for file_name in self.file_names]
+            else:
+                self.__row_counts = [0]
+            self.__merged_count = max(self.__row_counts)
+
+    # this function reads the new rows of every file and publishes the merged rows that are complete
+    # returns the number of rows published
+    def poll(self):
+        with self.__lock:
+            for tail_number, tail in enumerate(self.__tails):
+                new_rows = tail.read_new_rows()
+                if tail.truncated:
+                    if self.__on_reset is not None:
+                        self.__on_reset()
+                    return 0
+                # rows the file was missing when compiling were padded, so they are skipped
+                skipped = max(0, min(len(new_rows), self.__merged_count - self.__row_counts[tail_number]))
+                self.__row_counts[tail_number] += len(new_rows)
+                self.__pending[tail_number].extend(new_rows[skipped:])
+            rows_ready = min(len(pending) for pending in self.__pending)
+            if rows_ready == 0:
+                return 0
+            merged_rows = [[cell for pending in self.__pending for cell in pending[row_number]]
+                           for row_number in range(rows_ready)]
+            self.__pending = [pending[rows_ready:] for pending in self.__pending]
+            self.__merged_count += rows_ready
+            self.rows_published += rows_ready
+            self.__publish("append", dumps({'columns': self.__columns, 'rows': merged_rows},
+                                           separators=(',', ':')))
+            return rows_ready
+
+    # this function stops polling until resume() is called, an update in progress is waited for
+    def pause(self):
+        self.__lock.acquire()
+
+    # this function starts polling again from the current end of every file
+    def resume(self):
+        try:
+            self.resync()
+        finally:
+            self.__lock.release()
+
+    # this function polls the files on a background thread until stop() is called
+    def start(self):
+        def watch():
+            while not self.__stopped.wait(self.interval):
+                self.poll()
+        self.__thread = Thread(target=watch, daemon=True)
+        self.__thread.start()
+
+    # this function stops the background thread
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
@@ -0,0 +1,571 @@
+from collections import OrderedDict
+from email.utils import formatdate
+from gzip import compress
+from hashlib import sha256
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from io import BytesIO
+from json import dumps
+from json import loads
+from mmap import ACCESS_READ
+from mmap import mmap
+from os import fstat
+from os import stat
+from os.path import exists
+from os.path import isdir
+from os.path import splitext
+from queue import Empty
+from queue import Queue
+from threading import Lock
+from threading import Thread
+from time import time
+from urllib.parse import parse_qs
+from urllib.parse import unquote
+
+# file extensions that are sent gzip compressed when the browser accepts it
+COMPRESSIBLE_EXTENSIONS = ['.html', '.htm', '.css', '.js', '.json', '.csv', '.txt', '.svg', '.bin', '.map']
+# files smaller than this many bytes are always sent as they are
+MINIMUM_COMPRESS_SIZE = 1024
+# gzip compression level used for compressed variants
+COMPRESS_LEVEL = 6
+# path of the server-sent events stream that tells open pages to reload
+EVENTS_PATH = "/__parasol__/events"
+# path the paged grid asks for rows of the data at
+ROWS_PATH = "/__parasol__/rows"
+# path the page posts its brushes and marked rows to
+SELECTION_PATH = "/__parasol__/selection"
+# largest selection the page can post, in bytes
+MAX_SELECTION_BYTES = 64 << 20
+# seconds between keep-alive comments on an idle event stream
+EVENTS_PING_SECONDS = 15
+
+
+# this class keeps the gzip compressed variant of every file that has been requested
+# variants are keyed by path, size and modification time, so a file that changes is compressed again
+#   and the stale variant is dropped
+# if max bytes is set, the variants used least recently are dropped once they hold more than max bytes together, and
+#   a variant bigger than max bytes is never kept. the counts of hits, misses and dropped variants are kept in stats.
+class CompressedFileCache:
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.__variants = OrderedDict()
+        self.__total_bytes = 0
+        self.__counts = {'hits': 0, 'misses': 0, 'evictions': 0, 'evicted_bytes': 0}
+        self.__lock = Lock()
+
+    # this function returns the compressed bytes of a file, compressing it if there is no current variant
+    # a sibling file with a .gz extension that is newer than the file is used instead of compressing
+    # the file is memory mapped to be compressed, so it isn't read into memory next to its compressed variant
+    def get(self, file_path, file_stat):
+        variant_key = (file_stat.st_size, file_stat.st_mtime_ns)
+        with self.__lock:
+            cached = self.__variants.get(file_path)
+            if cached is not None and cached[0] == variant_key:
+                self.__variants.move_to_end(file_path)
+                self.__counts['hits'] += 1
+                return cached[1]
+            self.__counts['misses'] += 1
+        gzip_path = file_path + '.gz'
+        if exists(gzip_path) and stat(gzip_path).st_mtime_ns >= file_stat.st_mtime_ns:
+            with open(gzip_path, 'rb') as gzip_file:
+                compressed = gzip_file.read()
+        else:
+            with open(file_path, 'rb') as file_in:
+                if file_stat.st_size == 0:
+                    compressed = compress(b'', COMPRESS_LEVEL)
+                else:
+                    with mmap(file_in.fileno(), 0, access=ACCESS_READ) as mapped_file:
+                        compressed = compress(mapped_file, COMPRESS_LEVEL)
+        with self.__lock:
+            self.__store__(file_path, variant_key, compressed)
+        return compressed
+
+    # this function keeps a variant, dropping the variants used least recently if the cache is too big
+    def __store__(self, file_path, variant_key, compressed):
+        stale = self.__variants.pop(file_path, None)
+        if stale is not None:
+            self.__total_bytes -= len(stale[1])
+        if self.max_bytes is not None and len(compressed) > self.max_bytes:
+            return
+        self.__variants[file_path] = (variant_key, compressed)
+        self.__total_bytes += len(compressed)
+        while self.max_bytes is not None and self.__total_bytes > self.max_bytes:
+            evicted = self.__variants.popitem(last=False)[1]
+            self.__total_bytes -= len(evicted[1])
+            self.__counts['evictions'] += 1
+            self.__counts['evicted_bytes'] += len(evicted[1])
+
+    # this function returns the counts of the cache, with the number of variants and the bytes they hold
+    def stats(self):
+        with self.__lock:
+            stats = dict(self.__counts)
+            stats.update({'variants': len(self.__variants), 'bytes': self.__total_bytes, 'max_bytes': self.max_bytes})
+        return stats
+
+    # this function compresses a list of files ahead of the first request for them
+    def precompress(self, file_paths):
+        for file_path in file_paths:
+            if exists(file_path) and not isdir(file_path):
+                self.get(file_path, stat(file_path))
+
+
+# this class keeps files that are served from memory instead of from disk, like data given to addPlot as a DataFrame
+# every file keeps its entity tag, and its gzip compressed variant once it has been asked for
+class MemoryFileStore:
+    def __init__(self):
+        self.__files = {}
+        self.__lock = Lock()
+
+    # this function adds or replaces a file, a file set again with the same bytes keeps its compressed variant
+    def set(self, file_name, file_bytes):
+        entity_tag = '"' + sha256(file_bytes).hexdigest()[:32] + '"'
+        with self.__lock:
+            current_entry = self.__files.get(file_name)
+            if current_entry is not None and current_entry['tag'] == entity_tag:
+                return
+            self.__files[file_name] = {'bytes': file_bytes, 'tag': entity_tag, 'gzip': None, 'time': time()}
+
+    # this function returns a file's entry (bytes, tag, gzip and time), or None if there is no such file
+    def get(self, file_name):
+        with self.__lock:
+            return self.__files.get(file_name)
+
+    # this function returns the gzip compressed bytes of a file, compressing them on the first call
+    def get_compressed(self, file_name):
+        memory_file = self.get(file_name)
+        if memory_file['gzip'] is None:
+            memory_file['gzip'] = compress(memory_file['bytes'], COMPRESS_LEVEL)
+        return memory_file['gzip']
+
+    # this function removes a file so its memory can be released
+    def remove(self, file_name):
+        with self.__lock:
+            self.__files.pop(file_name, None)
+
+    # this function removes every file
+    def clear(self):
+        with self.__lock:
+            self.__files.clear()
+
+    # this function returns the names of the files
+    def file_names(self):
+        with self.__lock:
+            return list(self.__files)
+
+
+# this class passes events from the python session to every page connected to the event stream
+# every connection gets its own queue, publishing puts the event on every queue
+class EventBroker:
+    def __init__(self):
+        self.__queues = []
+        self.__lock = Lock()
+
+    # this function returns a new queue that receives every event published from now on
+    def subscribe(self):
+        event_queue = Queue()
+        with self.__lock:
+            self.__queues.append(event_queue)
+        return event_queue
+
+    # this function stops sending events to a queue
+    def unsubscribe(self, event_queue):
+        with self.__lock:
+            if event_queue in self.__queues:
+                self.__queues.remove(event_queue)
+
+    # this function sends an event to every connected page, an event name of None closes every stream
+    def publish(self, event_name, event_data=""):
+        with self.__lock:
+            for event_queue in self.__queues:
+                event_queue.put((event_name, event_data))
+
+    # this function returns the number of connected pages
+    def connection_count(self):
+        with self.__lock:
+            return len(self.__queues)
+
+
+# this class serves the files of a Parasol application over HTTP/1.1
+# connections are kept alive between requests, text assets are sent gzip compressed when the browser accepts it,
+#   every response has an ETag so reloads are answered with 304 Not Modified, and single byte ranges are supported
+class ParasolRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    compressed_files = CompressedFileCache()
+
+    # this function answers GET requests, the event stream path is kept open to send events to the page
+    def do_GET(self):
+        if self.path.split('?')[0] == EVENTS_PATH and hasattr(self.server, 'events'):
+            self.__stream_events__()
+            return
+        if self.path.split('?')[0] == ROWS_PATH and getattr(self.server, 'row_pager', None) is not None:
+            self.__send_rows__()
+            return
+        SimpleHTTPRequestHandler.do_GET(self)
+
+    # this function answers POST requests, the page posts its selection to the selection path and the rows the paged
+    #   grid shows to the rows path
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        if path == SELECTION_PATH and getattr(self.server, 'selection', None) is not None:
+            update = self.server.selection.update
+        elif path == ROWS_PATH and getattr(self.server, 'row_pager', None) is not None:
+            update = None
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+        try:
+            body_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            body_length = -1
+        if body_length < 0 or body_length > MAX_SELECTION_BYTES:
+            self.send_error(HTTPStatus.BAD_REQUEST, "Bad selection size")
+            return
+        try:
+            message = loads(self.rfile.read(body_length))
+            if update is not None:
+                update(message)
+            else:
+                if type(message) is not dict:
+                    raise ValueError("the rows must be posted as {\"rows\": base64 text}")
+                row_filter = self.server.row_pager.add_encoded_filter(message.get('rows'))
+        except ValueError as error:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(error))
+            return
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "Data file not found")
+            return
+        if update is not None:
+            self.send_response(HTTPStatus.NO_CONTENT)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = dumps(row_filter, separators=(',', ':')).encode('utf-8')
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # this function sends a page of rows of the data as json, for the paged grid
+    # the query has the start row and count, and can have a sort column, descending=1 and the token of a row filter
+    #   posted to the rows path
+    def __send_rows__(self):
+        query = parse_qs(self.path.split('?', 1)[1] if '?' in self.path else '')
+        try:
+            start = int(query.get('start', ['0'])[0])
+            count = int(query.get('count', ['100'])[0])
+            sort_column = query.get('sort', [None])[0]
+            descending = query.get('descending', ['0'])[0] in ['1', 'true']
+            row_filter = query.get('filter', [None])[0]
+            page = self.server.row_pager.page(start, count, sort_column, descending, row_filter)
+        except ValueError as error:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(error))
+            return
+        except LookupError:
+            self.send_error(HTTPStatus.NOT_FOUND, "Row filter not found")
+            return
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "Data file not found")
+            return
+        body = dumps(page, separators=(',', ':')).encode('utf-8')
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-cache")
+        if self.__accepts_gzip__() and len(body) >= MINIMUM_COMPRESS_SIZE:
+            body = compress(body, COMPRESS_LEVEL)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # this function sends server-sent events to the page until the connection closes or the server stops
+    def __stream_events__(self):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        event_queue = self.server.events.subscribe()
+        try:
+            self.wfile.write(b": connected\n\n")
+            self.wfile.flush()
+            while True:
+                try:
+                    event_name, event_data = event_queue.get(timeout=EVENTS_PING_SECONDS)
+                except Empty:
+                    # a comment line keeps idle connections from timing out
+                    self.wfile.write(b": ping\n\n")
+                    self.wfile.flush()
+                    continue
+                if event_name is None:
+                    break
+                message = "event: " + event_name + "\n"
+                for data_line in str(event_data).split("\n"):
+                    message += "data: " + data_line + "\n"
+                self.wfile.write((message + "\n").encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.events.unsubscribe(event_queue)
+
+    # this function sends the response headers and returns a file object for the body, or None if there is no body
+    def send_head(self):
+        memory_files = getattr(self.server, 'memory_files', None)
+        if memory_files is not None:
+            memory_file_name = unquote(self.path.split('?')[0].split('#')[0]).lstrip('/')
+            if memory_files.get(memory_file_name) is not None:
+                return self.__send_memory_head__(memory_files, memory_file_name)
+        file_path = self.translate_path(self.path)
+        if isdir(file_path) or not exists(file_path):
+            # directory listings, redirects and missing files are answered the usual way
+            return SimpleHTTPRequestHandler.send_head(self)
+        try:
+            file_in = open(file_path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        file_stat = fstat(file_in.fileno())
+        content_type = self.guess_type(file_path)
+        entity_tag = '"' + format(file_stat.st_mtime_ns, 'x') + '-' + format(file_stat.st_size, 'x') + '"'
+
+        use_gzip = self.__accepts_gzip__() and self.headers.get('Range') is None and \
+            splitext(file_path)[1].lower() in COMPRESSIBLE_EXTENSIONS and file_stat.st_size >= MINIMUM_COMPRESS_SIZE
+        if use_gzip:
+            # the compressed variant is a different representation, so it gets its own entity tag
+            entity_tag = entity_tag[:-1] + '-gzip"'
+
+        # answering a conditional request for a file the browser already has
+        if self.__entity_tag_matches__(entity_tag):
+            file_in.close()
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.__send_cache_headers__(entity_tag, file_stat.st_mtime)
+            self.end_headers()
+            return None
+
+        if use_gzip:
+            file_in.close()
+            compressed = self.compressed_files.get(file_path, file_stat)
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(compressed)))
+            self.__send_cache_headers__(entity_tag, file_stat.st_mtime)
+            self.end_headers()
+            return BytesIO(compressed)
+
+        byte_range = self.__parse_range__(file_stat.st_size)
+        if byte_range == 0:
+            file_in.close()
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", "bytes */" + str(file_stat.st_size))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        if byte_range is not None:
+            start, end = byte_range
+            file_in.seek(start)
+            body = file_in.read(end - start + 1)
+            file_in.close()
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Range", "bytes " + str(start) + "-" + str(end) + "/" + str(file_stat.st_size))
+            self.send_header("Content-Length", str(len(body)))
+            self.__send_cache_headers__(entity_tag, file_stat.st_mtime)
+            self.end_headers()
+            return BytesIO(body)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(file_stat.st_size))
+        self.__send_cache_headers__(entity_tag, file_stat.st_mtime)
+        self.end_headers()
+        return file_in
+
+    # this function sends the response headers for a file kept in memory and returns its body
+    # memory files are answered the same way as files on disk, with gzip, entity tags and byte ranges
+    def __send_memory_head__(self, memory_files, file_name):
+        memory_file = memory_files.get(file_name)
+        file_bytes = memory_file['bytes']
+        content_type = self.guess_type(file_name)
+        entity_tag = memory_file['tag']
+        use_gzip = self.__accepts_gzip__() and self.headers.get('Range') is None and \
+            splitext(file_name)[1].lower() in COMPRESSIBLE_EXTENSIONS and len(file_bytes) >= MINIMUM_COMPRESS_SIZE
+        if use_gzip:
+            entity_tag = entity_tag[:-1] + '-gzip"'
+
+        if self.__entity_tag_matches__(entity_tag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.__send_cache_headers__(entity_tag, memory_file['time'])
+            self.end_headers()
+            return None
+
+        if use_gzip:
+            file_bytes = memory_files.get_compressed(file_name)
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            byte_range = self.__parse_range__(len(file_bytes))
+            if byte_range == 0:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", "bytes */" + str(len(file_bytes)))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            if byte_range is not None:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", "bytes " + str(start) + "-" + str(end) + "/" + str(len(file_bytes)))
+                file_bytes = file_bytes[start:end + 1]
+            else:
+                self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(file_bytes)))
+        self.__send_cache_headers__(entity_tag, memory_file['time'])
+        self.end_headers()
+        return BytesIO(file_bytes)
+
+    # this function sends the headers every file response has
+    # no-cache makes the browser check the entity tag on every load, which is answered with 304 if nothing changed
+    def __send_cache_headers__(self, entity_tag, modified_time):
+        self.send_header("ETag", entity_tag)
+        self.send_header("Last-Modified", formatdate(modified_time, usegmt=True))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+
+    # this function checks if the browser accepts gzip compressed responses
+    def __accepts_gzip__(self):
+        for encoding in self.headers.get('Accept-Encoding', '').split(','):
+            encoding_parts = encoding.strip().split(';')
+            if encoding_parts[0].strip().lower() == 'gzip':
+                return not any(part.strip().replace(' ', '') in ['q=0', 'q=0.0'] for part in encoding_parts[1:])
+        return False
+
+    # this function checks an If-None-Match header against the entity tag of the file
+    def __entity_tag_matches__(self, entity_tag):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is None:
+            return False
+        for requested_tag in if_none_match.split(','):
+            requested_tag = requested_tag.strip()
+            if requested_tag.startswith('W/'):
+                requested_tag = requested_tag[2:]
+            if requested_tag == '*' or requested_tag == entity_tag:
+                return True
+        return False
+
+    # this function reads a Range header with a single byte range
+    # returns (first byte, last byte), None to send the whole file, or 0 if the range can't be satisfied
+    def __parse_range__(self, file_size):
+        range_header = self.headers.get('Range')
+        if range_header is None or not range_header.startswith('bytes=') or ',' in range_header:
+            return None
+        first_text, separator, last_text = range_header[len('bytes='):].strip().partition('-')
+        try:
+            if first_text == '':
+                # a suffix range asks for the last bytes of the file
+                suffix_length = int(last_text)
+                if suffix_length <= 0:
+                    return 0
+                return max(file_size - suffix_length, 0), file_size - 1
+            first_byte = int(first_text)
+            last_byte = int(last_text) if last_text != '' else file_size - 1
+        except ValueError:
+            return None
+        if first_byte >= file_size or last_byte < first_byte:
+            return 0
+        return first_byte, min(last_byte, file_size - 1)
+
+
+# this class is a local server that handles every connection on its own thread
+# events sends messages to every page connected to the event stream, memory files are served before files on disk
+# row pager answers the paged grid's requests for rows, there is no rows path without one
+# selection keeps the selection the page posts, there is no selection path without one
+class ParasolHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, request_handler_class, memory_files=None, row_pager=None, selection=None):
+        ThreadingHTTPServer.__init__(self, server_address, request_handler_class)
+        self.events = EventBroker()
+        self.memory_files = memory_files if memory_files is not None else MemoryFileStore()
+        self.row_pager = row_pager
+        self.selection = selection
+
+
+# this class is the handle to a local server running on a background thread, returned by PyParasol.show()
+# recompile is called by update() and returns 0 if compiling failed, data file name returns the name of the data
+#   file the page loads
+class ParasolServerHandle:
+    def __init__(self, server, recompile, html_file_name, data_file_name):
+        self.server = server
+        self.port = server.server_address[1]
+        self.url = "http://localhost:" + str(self.port) + "/" + html_file_name
+        self.__recompile = recompile
+        self.__html_file_name = html_file_name
+        self.__data_file_name = data_file_name
+        self.__watchers = []
+        self.__thread = Thread(target=server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    # this function recompiles the application and tells every open page to load the new data
+    # if the html itself changed, the pages are told to reload completely instead
+    # file watchers are paused while compiling and start again from the end of the files afterwards
+    # returns 1 if compiling worked, 0 if it failed
+    def update(self):
+        for watcher in self.__watchers:
+            watcher.pause()
+        try:
+            html_hash = self.__hash_file__(self.__html_file_name)
+            if self.__recompile() == 0:
+                return 0
+            if self.__hash_file__(self.__html_file_name) != html_hash:
+                self.server.events.publish("refresh", self.__html_file_name)
+            else:
+                self.server.events.publish("reload", self.__data_file_name())
+            return 1
+        finally:
+            for watcher in self.__watchers:
+                watcher.resume()
+
+    # this function starts a watcher (anything with start, stop, pause and resume) that is stopped with the server
+    def add_watcher(self, watcher):
+        self.__watchers.append(watcher)
+        watcher.start()
+
+    # this function says if the server is still running
+    def is_running(self):
+        return self.__thread.is_alive()
+
+    # this function closes every event stream and stops the server
+    def stop(self):
+        for watcher in self.__watchers:
+            watcher.stop()
+        self.server.events.publish(None)
+        self.server.shutdown()
+        self.server.server_close()
+        self.__thread.join()
+
+    # this function returns the sha256 of a file's contents, or None if it doesn't exist
+    @staticmethod
+    def __hash_file__(file_name):
+        if not exists(file_name):
+            return None
+        with open(file_name, 'rb') as file_in:
+            return sha256(file_in.read()).hexdigest()
+
+
+# this function makes a local server for the files in the current directory at the given port
+# files listed in precompress file names are gzip compressed before the first request for them
+# memory files is a MemoryFileStore of files served from memory, it can be changed while the server is running
+# row pager is a data_grid.RowPager that answers the paged grid, selection is a selection.SelectionStore that keeps
+#   the selection the page posts
+def make_server(port=8000, precompress_file_names=None, memory_files=None, row_pager=None, selection=None):
+    if precompress_file_names:
+        ParasolRequestHandler.compressed_files.precompress(precompress_file_names)
+    return ParasolHTTPServer(("", port), ParasolRequestHandler, memory_files, row_pager, selection)
@@ -0,0 +1,58 @@
+from os import stat
+from os.path import abspath
+from os.path import normpath
+from threading import Lock
+
+from columnar_data import read_data_csv
+
+
+# this class keeps data files parsed into DataFrames, so parasol applications that use the same file only parse it
+#   once. a file is parsed again if its size or modification time changed since it was parsed.
+# the DataFrames are shared by everything that uses the cache, so they must not be changed
+class ParsedDataCache:
+    def __init__(self):
+        self.parses = 0
+        self.hits = 0
+        self.__entries = {}
+        self.__lock = Lock()
+
+    # this function returns the cache without its lock, so it can be pickled for a worker process that can't be forked
+    def __getstate__(self):
+        state = dict(vars(self))
+        del state['_ParsedDataCache__lock']
+        return state
+
+    # this function gives a cache that was unpickled a lock of its own
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self.__lock = Lock()
+
+    # this function returns the DataFrame of a data file, parsing it if it isn't in the cache or has changed
+    def get(self, file_name):
+        file_path = normpath(abspath(file_name))
+        file_stat = stat(file_path)
+        signature = [file_stat.st_size, file_stat.st_mtime_ns]
+        with self.__lock:
+            entry = self.__entries.get(file_path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            data_frame = read_data_csv(file_path)
+            self.__entries[file_path] = [signature, data_frame]
+            self.parses += 1
+            return data_frame
+
+    # this function parses every data file in a list that isn't in the cache yet
+    def load(self, file_names):
+        for file_name in set(normpath(abspath(file_name)) for file_name in file_names):
+            self.get(file_name)
+
+    # this function returns the paths of the data files in the cache
+    def file_names(self):
+        with self.__lock:
+            return list(self.__entries)
+
+    # this function removes every data file from the cache
+    def clear(self):
+        with self.__lock:
+            self.__entries = {}
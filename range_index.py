@@ -0,0 +1,166 @@
+from numpy import arange
+from numpy import argsort
+from numpy import asarray
+from numpy import concatenate
+from numpy import empty
+from numpy import flatnonzero
+from numpy import float64
+from numpy import int32
+from numpy import int64
+from numpy import ones
+from numpy import searchsorted
+from numpy import sort
+
+# rows appended to an index are kept unsorted until there are this many of them, or a sixteenth of the rows, then
+#   they are merged into the sorted columns
+DELTA_MERGE_ROWS = 65536
+# a query scans every row instead of using the sorted columns when the most selective range holds more than this
+#   share of the rows, since picking values of scattered rows is slower than reading them all in order
+SCAN_SHARE = 0.2
+
+
+# this class answers range queries over several numeric columns, like the brushes of a parallel coordinates plot
+# every column is kept sorted with the row ids in that order, so the rows inside a range are a slice found with two
+#   binary searches. a query over several columns starts from the column whose range holds the fewest rows, and only
+#   checks the values of those rows in the other columns.
+# rows can be appended, they are kept apart and scanned until there are enough of them to merge into the sorted
+#   columns. columns are identified by any hashable key, empty values (nan) are never inside a range.
+class RangeIndex:
+    def __init__(self, number_of_rows=0):
+        self.number_of_rows = number_of_rows
+        # rows before this one are in the sorted columns, rows after it have been appended since the last merge
+        self.__sorted_rows = number_of_rows
+        self.__values = {}
+        self.__sorted_values = {}
+        self.__row_orders = {}
+
+    # this function adds a column to the index and sorts it
+    # values has a number (or nan) for every row of the index
+    def add_column(self, key, values):
+        values = asarray(values, dtype=float64)
+        if len(values) != self.number_of_rows:
+            raise ValueError("column has " + str(len(values)) + " values, the index has " +
+                             str(self.number_of_rows) + " rows")
+        self.__values[key] = values
+        self.__sort_column__(key)
+
+    # this function says if a column is in the index
+    def has_column(self, key):
+        return key in self.__values
+
+    # this function returns the keys of the columns in the index
+    def column_keys(self):
+        return list(self.__values)
+
+    # this function returns the values of a column for every row of the index, in row order
+    def column_values(self, key):
+        return self.__values[key]
+
+    # this function removes every column from the index
+    def clear(self):
+        self.__values = {}
+        self.__sorted_values = {}
+        self.__row_orders = {}
+
+    # this function appends rows to the index, columns maps every key of the index to the values of the new rows
+    def append(self, columns):
+        if set(columns) != set(self.__values):
+            raise ValueError("appended rows need a value for every column of the index")
+        new_values = {key: asarray(values, dtype=float64) for key, values in columns.items()}
+        number_of_new_rows = len(next(iter(new_values.values()))) if new_values else 0
+        if any(len(values) != number_of_new_rows for values in new_values.values()):
+            raise ValueError("appended columns have different numbers of rows")
+        for key, values in new_values.items():
+            self.__values[key] = concatenate([self.__values[key], values])
+        self.number_of_rows += number_of_new_rows
+        if not self.__values:
+            self.__sorted_rows = self.number_of_rows
+        elif self.number_of_rows - self.__sorted_rows >= max(DELTA_MERGE_ROWS, self.__sorted_rows // 16):
+            self.__merge_appended_rows__()
+
+    # this function returns the sorted ids of the rows inside every range
+    # ranges maps column keys to [low, high], both ends are inside the range
+    def query(self, ranges):
+        slices = self.__find_slices__(ranges)
+        if not slices:
+            return arange(self.number_of_rows, dtype=int64)
+        fewest_key = min(slices, key=lambda key: slices[key][1] - slices[key][0])
+        start, end = slices[fewest_key]
+        if end - start > SCAN_SHARE * self.__sorted_rows:
+            row_ids = self.__scan__(ranges, 0, self.__sorted_rows)
+        else:
+            row_ids = self.__row_orders[fewest_key][start:end].astype(int64)
+            for key, (low, high) in ranges.items():
+                if key == fewest_key:
+                    continue
+                values = self.__values[key][row_ids]
+                row_ids = row_ids[(values >= low) & (values <= high)]
+            row_ids = sort(row_ids)
+        if self.number_of_rows > self.__sorted_rows:
+            row_ids = concatenate([row_ids, self.__scan__(ranges, self.__sorted_rows, self.number_of_rows)])
+        return row_ids
+
+    # this function returns the number of rows inside every range
+    # a single range is counted from its slice without looking at the rows
+    def count(self, ranges):
+        slices = self.__find_slices__(ranges)
+        if len(slices) != 1:
+            return len(self.query(ranges))
+        start, end = next(iter(slices.values()))
+        if self.number_of_rows > self.__sorted_rows:
+            return end - start + len(self.__scan__(ranges, self.__sorted_rows, self.number_of_rows))
+        return end - start
+
+    # this function returns the start and end of the slice of every range in its sorted column
+    def __find_slices__(self, ranges):
+        slices = {}
+        for key, (low, high) in ranges.items():
+            if key not in self.__values:
+                raise ValueError("column " + str(key) + " isn't in the index")
+            sorted_values = self.__sorted_values[key]
+            start = int(searchsorted(sorted_values, low, side='left'))
+            # a range with its low end above its high end holds no rows
+            slices[key] = [start, max(start, int(searchsorted(sorted_values, high, side='right')))]
+        return slices
+
+    # this function returns the ids of the rows from start to end that are inside every range, reading every value
+    def __scan__(self, ranges, start, end):
+        mask = None
+        for key, (low, high) in ranges.items():
+            values = self.__values[key][start:end]
+            inside = (values >= low) & (values <= high)
+            mask = inside if mask is None else mask & inside
+        return flatnonzero(mask).astype(int64) + start
+
+    # this function sorts a column of the rows that have been merged
+    # row ids are kept as 32 bit integers when they fit, nan values sort last so no range reaches them
+    def __sort_column__(self, key):
+        values = self.__values[key][:self.__sorted_rows]
+        row_order = argsort(values, kind='stable')
+        if self.__sorted_rows < 2 ** 31:
+            row_order = row_order.astype(int32)
+        self.__row_orders[key] = row_order
+        self.__sorted_values[key] = values[row_order]
+
+    # this function merges the appended rows into the sorted columns
+    # the appended rows are sorted on their own and put in place with a binary search, the merged rows aren't sorted
+    #   again
+    def __merge_appended_rows__(self):
+        start = self.__sorted_rows
+        for key, values in self.__values.items():
+            appended_order = argsort(values[start:], kind='stable') + start
+            appended_values = values[appended_order]
+            positions = searchsorted(self.__sorted_values[key], appended_values, side='right')
+            merged_values = empty(self.number_of_rows, dtype=float64)
+            row_order = empty(self.number_of_rows, dtype=int32 if self.number_of_rows < 2 ** 31 else int64)
+            # every appended row lands after the merged rows before it and the appended rows before it
+            appended_slots = positions + arange(len(positions))
+            is_merged = ones(self.number_of_rows, dtype=bool)
+            is_merged[appended_slots] = False
+            merged_values[appended_slots] = appended_values
+            row_order[appended_slots] = appended_order
+            merged_values[is_merged] = self.__sorted_values[key]
+            row_order[is_merged] = self.__row_orders[key]
+            self.__sorted_values[key] = merged_values
+            self.__row_orders[key] = row_order
+        self.__sorted_rows = self.number_of_rows
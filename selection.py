@@ -0,0 +1,248 @@
+from threading import Lock
+from traceback import print_exc
+
+from numpy import array_equal
+from numpy import asarray
+from numpy import float64
+from numpy import int64
+from numpy import union1d
+from numpy import unique
+from numpy import zeros
+from pandas import to_numeric
+
+from data_stages import find_column_positions
+from range_index import RangeIndex
+
+# the selections that can be asked for, the same as the selections of resetSelections on the page
+SELECTION_KINDS = ['brushed', 'marked', 'both']
+
+# javascript that posts the brushes and marked rows of a parasol application to the local server when they change
+# numeric axes are sent as the range of values inside the brush, text axes as the list of values inside it
+# marked rows are sent by id, the row number in the page's data
+SELECTION_SCRIPT = """
+function parasolPostSelection(ps, selectionPath) {
+  var timer = null;
+  function chartBrushes(pc) {
+    var brushes = {};
+    var extents = pc.brushExtents();
+    Object.keys(extents).forEach(function(dimension) {
+      var raw = extents[dimension].selection.raw;
+      var yscale = pc.dimensions()[dimension].yscale;
+      if (typeof yscale.invert === 'function') {
+        var ends = [+yscale.invert(raw[0]), +yscale.invert(raw[1])];
+        brushes[dimension] = {range: [Math.min(ends[0], ends[1]), Math.max(ends[0], ends[1])]};
+      } else {
+        brushes[dimension] = {values: yscale.domain().filter(function(value) {
+          var y = yscale(value);
+          return raw[0] <= y && y <= raw[1];
+        })};
+      }
+    });
+    return brushes;
+  }
+  function post() {
+    timer = null;
+    var message = {
+      brushes: ps.charts.map(chartBrushes).filter(function(brushes) { return Object.keys(brushes).length > 0; }),
+      marked: (ps.state.marked || []).map(function(d) { return +d.id; })
+    };
+    fetch(selectionPath, {method: 'POST', headers: {'Content-Type': 'application/json'},
+                          body: JSON.stringify(message)});
+  }
+  function changed() {
+    if (timer !== null) { clearTimeout(timer); }
+    timer = setTimeout(post, 150);
+  }
+  ps.charts.forEach(function(pc) {
+    pc.on('brushend.selection', changed);
+    pc.on('mark.selection', changed);
+  });
+  // resetting the brushes or marks doesn't send an event
+  var resetSelections = ps.resetSelections;
+  ps.resetSelections = function() {
+    var result = resetSelections.apply(ps, arguments);
+    changed();
+    return result;
+  };
+}
+"""
+
+
+# this function joins the brushes of every chart into one range for every brushed numeric column and one list of
+#   values for every brushed text column, since a row is only brushed if it is inside every brush
+# brushes of a chart map column names to either {"range": [low, high]} for numeric axes or {"values": [...]} for
+#   text axes. returns dictionaries of column positions to ranges and to sets of values, and the names of brushed
+#   columns that aren't in the data, like the cluster and weighted sum columns worked out in the page
+def join_brushes(data_frame, chart_brushes_list):
+    ranges = {}
+    value_sets = {}
+    missing_columns = []
+    for chart_brushes in chart_brushes_list:
+        for column_name, brush in chart_brushes.items():
+            positions = find_column_positions(data_frame, [column_name])
+            if not positions:
+                if column_name not in missing_columns:
+                    missing_columns.append(column_name)
+                continue
+            position = positions[0]
+            if 'range' in brush:
+                low, high = brush['range']
+                if position in ranges:
+                    low, high = max(low, ranges[position][0]), min(high, ranges[position][1])
+                ranges[position] = [low, high]
+            else:
+                values = set(str(value) for value in brush['values'])
+                value_sets[position] = values if position not in value_sets else value_sets[position] & values
+    return ranges, value_sets, missing_columns
+
+
+# this class keeps the last selection posted by the page and works out which rows of the full dataset it selects
+# data is a function returning the full data as a DataFrame and the row positions of the rows on the page in it, or
+#   None if the page has every row. brushes select rows out of the full data, so rows sampled out of the page are
+#   selected too, while marked rows are rows of the page.
+# brushed numeric columns are added to a range index the first time they are brushed, so later brushes only look at
+#   the rows inside the narrowest brush instead of every row. when the data grows by rows added at its end, like a
+#   tailed data file read again, the new rows are appended to the index instead of sorting every row again.
+# callbacks are called with the parasol application's selection whenever the page posts a new one
+class SelectionStore:
+    def __init__(self, data):
+        self.__data = data
+        self.__brushes = []
+        self.__marked = zeros(0, dtype=int64)
+        self.__callbacks = []
+        self.__data_frame = None
+        self.__view_rows = None
+        self.__range_index = RangeIndex()
+        self.__selected_rows = {}
+        self.__lock = Lock()
+
+    # this function returns the store without its lock, callbacks and indexed data, so it can be pickled for a worker
+    #   process that can't be forked. a worker only compiles, so the page never posts a selection to it.
+    def __getstate__(self):
+        state = dict(vars(self))
+        del state['_SelectionStore__lock']
+        state['_SelectionStore__callbacks'] = []
+        state['_SelectionStore__data_frame'] = None
+        state['_SelectionStore__view_rows'] = None
+        state['_SelectionStore__range_index'] = RangeIndex()
+        state['_SelectionStore__selected_rows'] = {}
+        return state
+
+    # this function gives a store that was unpickled a lock of its own
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self.__lock = Lock()
+
+    # this function keeps a selection posted by the page, a dictionary with a list of the brushes of every chart
+    #   that has some and a list of the ids of the marked rows, then calls the callbacks
+    def update(self, message):
+        if type(message) is not dict:
+            raise ValueError("a selection must be an object")
+        brushes = message.get('brushes', [])
+        marked = message.get('marked', [])
+        if type(brushes) is not list or any(type(chart_brushes) is not dict for chart_brushes in brushes):
+            raise ValueError("brushes must be a list of objects")
+        for chart_brushes in brushes:
+            for brush in chart_brushes.values():
+                if type(brush) is not dict:
+                    raise ValueError("a brush must be an object")
+                if 'range' in brush:
+                    if type(brush['range']) is not list or len(brush['range']) != 2 or \
+                            any(type(value) not in [int, float] for value in brush['range']):
+                        raise ValueError("a brush range must be two numbers")
+                elif type(brush.get('values')) is not list:
+                    raise ValueError("a brush needs a range or a list of values")
+        if type(marked) is not list or any(type(row_id) is not int for row_id in marked):
+            raise ValueError("marked must be a list of row ids")
+        marked = asarray(marked, dtype=int64)
+        with self.__lock:
+            self.__brushes = brushes
+            self.__marked = marked
+            self.__selected_rows = {}
+            callbacks = list(self.__callbacks)
+        # a callback that fails doesn't stop the others, or the server answering the page
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                print_exc()
+
+    # this function adds a function that is called with no arguments every time the page posts a selection
+    def add_callback(self, callback):
+        with self.__lock:
+            self.__callbacks.append(callback)
+
+    # this function returns the full data and the sorted row positions of a selection in it
+    # kind is one of SELECTION_KINDS, "both" is every row that is brushed or marked
+    # brushes on columns that aren't in the data can't be worked out in Python and raise a ValueError naming them
+    def selected_rows(self, kind="brushed"):
+        if kind not in SELECTION_KINDS:
+            raise ValueError("kind must be one of " + ", ".join(SELECTION_KINDS))
+        with self.__lock:
+            data_frame, view_rows = self.__data()
+            if data_frame is not self.__data_frame:
+                if not self.__append_rows__(data_frame):
+                    self.__range_index = RangeIndex(data_frame.shape[0])
+                self.__data_frame = data_frame
+                self.__view_rows = view_rows
+                self.__selected_rows = {}
+            if kind not in self.__selected_rows:
+                if kind == "brushed":
+                    self.__selected_rows[kind] = self.__brushed_rows__()
+                elif kind == "marked":
+                    self.__selected_rows[kind] = self.__marked_rows__()
+                else:
+                    self.__selected_rows[kind] = union1d(self.__brushed_rows__(), self.__marked_rows__())
+            return data_frame, self.__selected_rows[kind]
+
+    # this function returns the row positions inside the brushes of every chart, no rows if nothing is brushed
+    def __brushed_rows__(self):
+        if not self.__brushes:
+            return zeros(0, dtype=int64)
+        ranges, value_sets, missing_columns = join_brushes(self.__data_frame, self.__brushes)
+        if missing_columns:
+            raise ValueError("the brushes on " + ", ".join(missing_columns) + " can't be worked out, since " +
+                             ("it isn't a column" if len(missing_columns) == 1 else "they aren't columns") +
+                             " of the data")
+        for position in ranges:
+            if not self.__range_index.has_column(position):
+                self.__range_index.add_column(position, self.__column_values__(self.__data_frame, position))
+        row_ids = self.__range_index.query(ranges)
+        for position, values in value_sets.items():
+            row_ids = row_ids[self.__data_frame.iloc[row_ids, position].astype(str).isin(values).to_numpy()]
+        return row_ids
+
+    # this function appends the rows added at the end of the data to the range index, and says if it could
+    # the data must have the same columns and start with the rows that are already indexed, checked on the indexed
+    #   columns, which is cheaper than sorting them again
+    def __append_rows__(self, data_frame):
+        old_data_frame = self.__data_frame
+        if old_data_frame is None or list(data_frame.columns) != list(old_data_frame.columns):
+            return False
+        number_of_rows = self.__range_index.number_of_rows
+        if data_frame.shape[0] <= number_of_rows:
+            return False
+        new_columns = {}
+        for position in self.__range_index.column_keys():
+            values = self.__column_values__(data_frame, position)
+            if not array_equal(values[:number_of_rows], self.__range_index.column_values(position), equal_nan=True):
+                return False
+            new_columns[position] = values[number_of_rows:]
+        if new_columns:
+            self.__range_index.append(new_columns)
+        else:
+            self.__range_index = RangeIndex(data_frame.shape[0])
+        return True
+
+    # this function returns the numbers of a column of the data, nan for cells that aren't numbers
+    @staticmethod
+    def __column_values__(data_frame, position):
+        return to_numeric(data_frame.iloc[:, position], errors='coerce').to_numpy(dtype=float64)
+
+    # this function returns the row positions of the marked rows in the full data
+    def __marked_rows__(self):
+        number_of_page_rows = self.__data_frame.shape[0] if self.__view_rows is None else len(self.__view_rows)
+        marked = self.__marked[(self.__marked >= 0) & (self.__marked < number_of_page_rows)]
+        if self.__view_rows is not None:
+            marked = asarray(self.__view_rows)[marked]
+        return unique(marked).astype(int64)